@@ -0,0 +1,183 @@
+"""
+Microbenchmark da extração de campos dos termos de concessão e devolução.
+
+Compara extract_concessao_data / extract_devolucao_data com a implementação
+anterior (re.search sem compilar e fatiamento text[match.end():] por periférico),
+conferindo antes que as duas devolvem exatamente o mesmo dicionário.
+
+Uso (a partir de back/):
+    python -m benchmarks.bench_extracao_campos
+"""
+import re
+import timeit
+
+from utils.extract_con import extract_concessao_data
+from utils.extract_dev import extract_devolucao_data
+from utils.extract_sign import validar_assinatura
+
+TEXTO_CONCESSAO = (
+    "TERMO DE CONCESSÃO DE USO DE EQUIPAMENTO Eu, Joao da Silva, matricula F1000001, "
+    "declaro estar recebendo para o uso um NOTEBOOK; modelo: LATITUDE 5420; marca: DELL; "
+    "nº de série: ABC1000001 NF nº 123456 NÚMERO DO ATIVO 998877 "
+    "NÚMERO DO CHAMADO REQ0012345 HOSTNAME NAKSP1000001 MEMÓRIA: 16GB DDR4 "
+    "DISCO RÍGIDO: SSD 512GB Monitor (Marca/Modelo: DELL P2419H Nro Série: MON1000001) Sim "
+    "Mouse Sim Teclado Sim Headset Não Kit boas-vindas Sim Webcam Não Hub USB Sim "
+    "Suporte Ergonômico Não Cabo de Segurança Sim Maleta/Mochila para Notebook Sim "
+    "Dock Station Não Lacre de Segurança Sim "
+    "Cabo RCA / Cabo paralelo para unidade externa Não Bateria Extra Não "
+    "Carregador Extra Sim Cabo de força do monitor Sim Fonte Sim Adaptador HDMI Não "
+    "Assinatura CPF 123.456.789-00 "
+)
+TEXTO_DEVOLUCAO = (
+    "TERMO DE DEVOLUÇÃO DE EQUIPAMENTO Eu, Maria Souza matricula F1000001, declaro ter "
+    "devolvido o equipamento tipo: NOTEBOOK; modelo: LATITUDE 5420; marca: DELL; "
+    "nº de série: XYZ1000001 Monitor (Marca/Modelo: - Nro Série: -) Sim Não "
+    "Mouse Sim Sim Teclado Sim Não Headset Não Não Kit boas-vindas Sim Sim Webcam Não Não "
+    "Hub USB Sim Sim Suporte Ergonômico Não Não Cabo de Segurança Sim Sim "
+    "Maleta/Mochila para Notebook Sim Sim Dock Station Não Não Lacre de Segurança Sim Sim "
+    "Cabo RCA / Cabo paralelo para unidade externa Não Não Bateria Extra Não Não "
+    "Carregador Extra Sim Sim Cabo de Força do Monitor Sim Sim Fonte Sim Sim "
+    "Adaptador HDMI Não Não Assinatura RG 12345678 "
+)
+# Páginas de anexo depois do termo, como nos PDFs reais
+ANEXO = "Cláusulas gerais de uso e conservação do equipamento. " * 150
+
+# (coluna, rótulo no termo de concessão, rótulo no termo de devolução)
+ITENS = [
+    ("MONITOR", "Monitor", "Monitor"),
+    ("MOUSE", "Mouse", "Mouse"),
+    ("TECLADO", "Teclado", "Teclado"),
+    ("HEADSET", "Headset", "Headset"),
+    ("KIT BOAS-VINDAS", "Kit boas-vindas", "Kit boas-vindas"),
+    ("WEBCAM", "Webcam", "Webcam"),
+    ("HUB USB", "Hub USB", "Hub USB"),
+    ("SUPORTE ERGONÔMICO", "Suporte Ergonômico", "Suporte Ergonômico"),
+    ("CABO DE SEGURANÇA", "Cabo de Segurança", "Cabo de Segurança"),
+    ("MOCHILA", "Maleta/Mochila para Notebook", "Maleta/Mochila para Notebook"),
+    ("DOCK STATION", "Dock Station", "Dock Station"),
+    ("LACRE DE SEGURANÇA", "Lacre de Segurança", "Lacre de Segurança"),
+    ("CABO RCA", "Cabo RCA / Cabo paralelo para unidade externa",
+     "Cabo RCA / Cabo paralelo para unidade externa"),
+    ("BATERIA EXTRA", "Bateria Extra", "Bateria Extra"),
+    ("CARREGADOR EXTRA", "Carregador Extra", "Carregador Extra"),
+    ("CABO DE FORÇA DO MONITOR", "Cabo de força do monitor", "Cabo de Força do Monitor"),
+    ("FONTE", "Fonte", "Fonte"),
+    ("ADAPTADOR HDMI", "Adaptador HDMI", "Adaptador HDMI"),
+]
+ESPECIAIS = {"HUB USB", "CABO DE FORÇA DO MONITOR", "FONTE"}
+
+
+# --- Implementação anterior, mantida só como referência de resultado e tempo ---
+def _primeiro_termo_legado(item_name: str, text: str) -> str:
+    match = re.search(re.escape(item_name), text, re.I)
+    if not match:
+        return "----------"
+    termo = re.search(r"(Sim|Não)", text[match.end():], re.I)
+    return termo.group(1).strip() if termo else "----------"
+
+
+def _valor_especial_legado(item_name: str, text: str) -> str:
+    match = re.search(re.escape(item_name), text, re.I)
+    if not match:
+        return "----------"
+    termo = re.search(r"(\S+)", text[match.end():])
+    if termo:
+        valor = termo.group(1).strip()
+        if valor.lower() in ["sim", "não", "nao"]:
+            return "Sim" if valor.lower() == "sim" else "Não"
+    return "----------"
+
+
+def _segundo_termo_legado(item_name: str, text: str) -> str:
+    match = re.search(re.escape(item_name), text, re.I)
+    if not match:
+        return "----------"
+    termos = re.findall(r"(Sim|Não)", text[match.end():], re.I)
+    return termos[1].strip() if len(termos) >= 2 else "---------"
+
+
+def _monitor_legado(text: str):
+    m = re.search(
+        r"Monitor\s*\(Marca\/Modelo:\s*([^\)]*?)\s*Nro Série\s*:\s*([A-Za-z0-9\-]+)\)",
+        text, re.I,
+    )
+    modelo = m.group(1).strip() if m else ""
+    serial = m.group(2).strip() if m else ""
+    return (
+        "----------" if not modelo or modelo == "-" else modelo,
+        "----------" if not serial or serial == "-" else serial,
+    )
+
+
+def _grupo_legado(padrao: str, text: str) -> str:
+    m = re.search(padrao, text, re.I)
+    return m.group(1).strip() if m else ""
+
+
+def concessao_legado(text: str) -> dict:
+    modelo_monitor, serial_monitor = _monitor_legado(text)
+    memoria = re.search(r"MEMÓRIA\s*:\s*([\d]+\s*[Gg][Bb](?:\s*DDR[234])?)", text, re.I | re.S)
+    discos = re.findall(r"DISCO RÍGIDO\s*:\s*([A-Za-z0-9.\s-]*[\d]+\s*[Gg][Bb])", text, re.I)
+    return {
+        "ASSINADO": validar_assinatura(text),
+        "TIPO": _grupo_legado(r"um[^\w]+(\S[\w\s-]+)", text),
+        "MODELO": _grupo_legado(r"modelo[^\w]+(\S[\w\s-]+)", text),
+        "MARCA": _grupo_legado(r"marca[^\w]+(\S[\w\s-]+)", text),
+        "SERIAL": _grupo_legado(r"nº de série\s*[:\-\s]*([A-Za-z0-9\-]+)", text),
+        "MODELO MONITOR": modelo_monitor,
+        "SERIAL MONITOR": serial_monitor,
+        "PATRIMÔNIO": _grupo_legado(r"NÚMERO DO ATIVO\s*(\d+)", text),
+        "NF": _grupo_legado(r"NF\s*nº?\s*(\d+)", text),
+        "CHAMADO": _grupo_legado(r"NÚMERO DO CHAMADO\s*([A-Z0-9]+)", text),
+        "HOSTNAME": _grupo_legado(r"HOSTNAME\s*([A-Z0-9]+)", text),
+        "RAM": memoria.group(1).strip() if memoria else "",
+        "MEMÓRIA": ", ".join(discos) if discos else "----------",
+        **{
+            coluna: (_valor_especial_legado if coluna in ESPECIAIS else _primeiro_termo_legado)(
+                rotulo, text
+            )
+            for coluna, rotulo, _ in ITENS
+        },
+    }
+
+
+def devolucao_legado(text: str) -> dict:
+    modelo_monitor, serial_monitor = _monitor_legado(text)
+    serial = re.search(r"nº de série\s*[:\-\s]*([A-Za-z0-9]+)", text, re.I)
+    return {
+        "ASSINADO": validar_assinatura(text),
+        "TIPO": _grupo_legado(r"tipo[^\w]+([A-Za-z0-9\s\-]+)", text),
+        "MODELO": _grupo_legado(r"modelo[^\w]+([A-Za-z0-9\s\-]+)", text),
+        "MARCA": _grupo_legado(r"marca[^\w]+([A-Za-z0-9\s\-]+)", text),
+        "SERIAL": serial.group(1).replace(" ", "").strip() if serial else "",
+        "MODELO MONITOR": modelo_monitor,
+        "SERIAL MONITOR": serial_monitor,
+        **{coluna: _segundo_termo_legado(rotulo, text) for coluna, _, rotulo in ITENS},
+    }
+
+
+def medir(funcao, texto: str, repeticoes: int = 7, numero: int = 200) -> float:
+    return min(timeit.repeat(lambda: funcao(texto), number=numero, repeat=repeticoes)) / numero
+
+
+def main():
+    casos = [
+        ("concessao", extract_concessao_data, concessao_legado, TEXTO_CONCESSAO + ANEXO),
+        ("devolucao", extract_devolucao_data, devolucao_legado, TEXTO_DEVOLUCAO + ANEXO),
+    ]
+    for nome, atual, legado, texto in casos:
+        esperado = legado(texto)
+        registro = atual(texto)
+        obtido = {coluna: registro[coluna] for coluna in esperado}
+        assert obtido == esperado, f"{nome}: resultado diferente da implementação anterior"
+
+        t_legado = medir(legado, texto)
+        t_atual = medir(atual, texto)
+        print(
+            f"{nome:<10} anterior {t_legado * 1e6:8.1f} us   atual {t_atual * 1e6:8.1f} us"
+            f"   {t_legado / t_atual:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark do pipeline de auditoria sobre um corpus sintético de PDFs.
+
+Mede cada etapa separadamente, na ordem em que o pipeline as executa:
+    extracao_texto   carregar_documento (abrir o PDF e juntar o texto das páginas)
+    classificacao    classificar (segmentar o texto em termos)
+    renomear         nome_destino_pdf (nome, matrícula e serial do arquivo de destino)
+    extracao_campos  extrair_registros (campos de cada termo)
+    validacao        motivo_reprovacao, registro a registro
+    validacao_lote   validar_termos_df sobre todos os registros de uma vez
+    escrita_excel    escrever_excel (planilha formatada do /download) com as COLUNAS
+    escrita_continua escrever_excel_continuo (exportação da linha de comando)
+
+O resultado sai em JSON (stdout ou --saida) para ser guardado e comparado entre
+commits com --comparar.
+
+Uso (a partir de back/):
+    python -m benchmarks.bench_pipeline --concessao 200 --devolucao 200 --saida base.json
+    python -m benchmarks.bench_pipeline --concessao 200 --devolucao 200 --comparar base.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus_sintetico import TIPOS, adicionar_argumentos, gerar_corpus
+from utils.colunas import COLUNAS
+from utils.format_excel import escrever_excel, escrever_excel_continuo
+from utils.extract_text import carregar_documento
+from utils.process_pdf import classificar, extrair_registros, tem_termo
+from utils.renomear_excel import nome_destino_pdf
+from utils.validar_termo import motivo_reprovacao, validar_termos_df
+
+ETAPAS = (
+    "extracao_texto", "classificacao", "renomear", "extracao_campos",
+    "validacao", "validacao_lote", "escrita_excel", "escrita_continua",
+)
+# Etapas cronometradas uma vez sobre todos os registros; a vazão conta registros
+ETAPAS_EM_LOTE = {"validacao_lote", "escrita_excel", "escrita_continua"}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _cronometrar(amostras: list, funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    amostras.append(time.perf_counter() - inicio)
+    return resultado
+
+
+def executar_rodada(caminhos: list, pasta_saida: str, max_paginas: int = None) -> dict:
+    """Uma passada por todas as etapas; devolve as amostras (segundos) de cada etapa."""
+    amostras = {etapa: [] for etapa in ETAPAS}
+    registros = []
+
+    for caminho in caminhos:
+        documento = _cronometrar(
+            amostras["extracao_texto"], carregar_documento, caminho, None, max_paginas, tem_termo
+        )
+        termos = _cronometrar(amostras["classificacao"], classificar, documento)
+        nome = _cronometrar(amostras["renomear"], nome_destino_pdf, documento)
+        for dados in _cronometrar(amostras["extracao_campos"], extrair_registros, documento, termos):
+            dados["NOME"] = nome
+            registros.append(dados)
+
+    for dados in registros:
+        dados["MOTIVO"] = _cronometrar(amostras["validacao"], motivo_reprovacao, dados)
+        dados["STATUS TERMO"] = "ERRO" if dados["MOTIVO"] else "OK"
+
+    import pandas as pd
+    df = pd.DataFrame(registros)
+    _cronometrar(amostras["validacao_lote"], validar_termos_df, df)
+
+    # Linhas na ordem de COLUNAS, como o ResultStore as devolve
+    linhas = [[dados.get(c) for c in COLUNAS] for dados in registros]
+    path = os.path.join(pasta_saida, "resultado.xlsx")
+    _cronometrar(amostras["escrita_excel"], escrever_excel, path, COLUNAS, linhas)
+    _cronometrar(amostras["escrita_continua"], escrever_excel_continuo, path, COLUNAS, iter(linhas))
+    return {"amostras": amostras, "registros": len(registros)}
+
+
+def _resumo(totais: list, amostras: list, itens: int) -> dict:
+    total = min(totais)
+    ordenadas = sorted(amostras)
+
+    def percentil(p: float) -> float:
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000
+
+    return {
+        "total_s": round(total, 6),
+        "totais_s": [round(t, 6) for t in totais],
+        "itens": itens,
+        "itens_por_s": round(itens / total, 1) if total > 0 else None,
+        "media_ms": round(statistics.fmean(ordenadas) * 1000, 4),
+        "p50_ms": round(percentil(0.50), 4),
+        "p95_ms": round(percentil(0.95), 4),
+        "max_ms": round(ordenadas[-1] * 1000, 4),
+    }
+
+
+def executar(quantidades: dict, paginas_anexo: int, formato: str, repeticoes: int,
+             pasta: str = None, max_paginas: int = None) -> dict:
+    with tempfile.TemporaryDirectory() as temporaria:
+        pasta_corpus = pasta or os.path.join(temporaria, "corpus")
+        inicio = time.perf_counter()
+        gerados = gerar_corpus(pasta_corpus, quantidades, paginas_anexo, formato)
+        tempo_corpus = time.perf_counter() - inicio
+        caminhos = [caminho for _, caminho in gerados]
+
+        rodadas = [
+            executar_rodada(caminhos, temporaria, max_paginas) for _ in range(repeticoes)
+        ]
+
+        etapas = {}
+        for etapa in ETAPAS:
+            totais = [sum(r["amostras"][etapa]) for r in rodadas]
+            todas = [s for r in rodadas for s in r["amostras"][etapa]]
+            if etapa in ETAPAS_EM_LOTE:
+                itens = rodadas[0]["registros"]
+            else:
+                itens = len(rodadas[0]["amostras"][etapa])
+            etapas[etapa] = _resumo(totais, todas, itens)
+
+        return {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "corpus": {
+                **{tipo: quantidades.get(tipo, 0) for tipo in TIPOS},
+                "paginas_anexo": paginas_anexo,
+                "formato": formato,
+                "documentos": len(caminhos),
+                "bytes": sum(os.path.getsize(c) for c in caminhos),
+                "geracao_s": round(tempo_corpus, 3),
+            },
+            "repeticoes": repeticoes,
+            "max_paginas": max_paginas,
+            "registros": rodadas[0]["registros"],
+            "etapas": etapas,
+        }
+
+
+def comparar(atual: dict, anterior: dict) -> list:
+    linhas = [f"{'etapa':<16}{'anterior (s)':>14}{'atual (s)':>12}{'variação':>10}"]
+    for etapa in ETAPAS:
+        antes = anterior.get("etapas", {}).get(etapa, {}).get("total_s")
+        agora = atual["etapas"][etapa]["total_s"]
+        if not antes:
+            linhas.append(f"{etapa:<16}{'-':>14}{agora:>12.4f}{'-':>10}")
+            continue
+        linhas.append(f"{etapa:<16}{antes:>14.4f}{agora:>12.4f}{(agora / antes - 1) * 100:>+9.1f}%")
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por etapa do pipeline de auditoria")
+    adicionar_argumentos(parser)
+    parser.add_argument("--repeticoes", type=int, default=3,
+                        help="passadas completas pelo corpus; o total de cada etapa é o menor")
+    parser.add_argument("--max-paginas", type=int, default=None,
+                        help="lê só as primeiras páginas, como AUDITORIA_MAX_PAGINAS (perde o que vem depois)")
+    parser.add_argument("--pasta", help="mantém o corpus gerado nesta pasta")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo em vez do stdout")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    resultado = executar(
+        {tipo: getattr(args, tipo) for tipo in TIPOS},
+        args.paginas_anexo, args.formato, max(1, args.repeticoes), args.pasta, args.max_paginas,
+    )
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    # Resumo legível vai para o stderr, para não misturar com o JSON
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            linhas = comparar(resultado, json.load(f))
+    else:
+        linhas = [
+            f"{etapa:<16}{dados['total_s']:>10.4f} s{dados['itens_por_s'] or 0:>12.1f} itens/s"
+            for etapa, dados in resultado["etapas"].items()
+        ]
+    print("\n".join(linhas), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Gera PDFs sintéticos de termos (concessão, devolução, misto, RAT e pacotes com
+vários termos num PDF só) com a mesma
+redação que os padrões de process_pdf, extract_con, extract_dev e renomear_excel
+esperam. Cada documento tem serial, matrícula e patrimônio próprios, para que os
+nomes de destino não colidam, e pode vir seguido de páginas de anexo.
+
+Uso (a partir de back/):
+    python -m benchmarks.corpus_sintetico pasta_saida --concessao 50 --devolucao 50
+"""
+import argparse
+import os
+
+import fitz
+
+TIPOS = ("concessao", "devolucao", "misto", "rat", "pacote")
+# Termos em cada PDF do tipo pacote (concessão, devolução e RAT alternados)
+TERMOS_POR_PACOTE = 30
+FORMATOS = ("a4", "letter", "legal")
+
+MODELOS = [("NOTEBOOK", "LATITUDE 5420", "DELL"), ("DESKTOP", "OPTIPLEX 7070", "DELL"),
+           ("NOTEBOOK", "THINKPAD E14", "LENOVO"), ("MINIDESK", "PRODESK 400", "HP")]
+NOMES = ["Joao da Silva", "Maria Souza", "Ana Pereira", "Carlos Lima", "Paula Alves"]
+
+CLAUSULA_ANEXO = (
+    "Cláusulas gerais de uso e conservação do equipamento. O colaborador se compromete "
+    "a zelar pelo bem recebido e comunicar qualquer dano ao suporte técnico. "
+)
+
+
+def _ativo(i: int):
+    tipo, modelo, marca = MODELOS[i % len(MODELOS)]
+    return {
+        "nome": NOMES[i % len(NOMES)],
+        "matricula": f"F{1000000 + i}",
+        "tipo": tipo,
+        "modelo": modelo,
+        "marca": marca,
+        "serial": f"SN{i:08d}",
+        "serial_monitor": f"MON{i:07d}",
+        "patrimonio": f"{900000 + i}",
+        "nf": f"{100000 + i}",
+        "chamado": f"REQ{1000000 + i}",
+        "hostname": f"NAKSP{1000000 + i}",
+    }
+
+
+def texto_concessao(i: int) -> str:
+    a = _ativo(i)
+    return (
+        f"TERMO DE CONCESSÃO DE USO DE EQUIPAMENTO Eu, {a['nome']}, matricula {a['matricula']}, "
+        f"declaro estar recebendo para o uso um {a['tipo']}; modelo: {a['modelo']}; "
+        f"marca: {a['marca']}; nº de série: {a['serial']} NF nº {a['nf']} "
+        f"NÚMERO DO ATIVO {a['patrimonio']} NÚMERO DO CHAMADO {a['chamado']} "
+        f"HOSTNAME {a['hostname']} MEMÓRIA: 16GB DDR4 DISCO RÍGIDO: SSD 512GB "
+        f"Monitor (Marca/Modelo: DELL P2419H Nro Série: {a['serial_monitor']}) Sim "
+        "Mouse Sim Teclado Sim Headset Não Kit boas-vindas Sim Webcam Não Hub USB Sim "
+        "Suporte Ergonômico Não Cabo de Segurança Sim Maleta/Mochila para Notebook Sim "
+        "Dock Station Não Lacre de Segurança Sim "
+        "Cabo RCA / Cabo paralelo para unidade externa Não Bateria Extra Não "
+        "Carregador Extra Sim Cabo de força do monitor Sim Fonte Sim Adaptador HDMI Não "
+        "Assinatura CPF 123.456.789-00 "
+    )
+
+
+def texto_devolucao(i: int) -> str:
+    a = _ativo(i)
+    return (
+        f"TERMO DE DEVOLUÇÃO DE EQUIPAMENTO Eu, {a['nome']} matricula {a['matricula']}, "
+        f"declaro ter devolvido o equipamento tipo: {a['tipo']}; modelo: {a['modelo']}; "
+        f"marca: {a['marca']}; nº de série: {a['serial']} "
+        f"Monitor (Marca/Modelo: DELL P2419H Nro Série: {a['serial_monitor']}) Sim Sim "
+        "Mouse Sim Sim Teclado Sim Não Headset Não Não Kit boas-vindas Sim Sim "
+        "Webcam Não Não Hub USB Sim Sim Suporte Ergonômico Não Não "
+        "Cabo de Segurança Sim Sim Maleta/Mochila para Notebook Sim Sim "
+        "Dock Station Não Não Lacre de Segurança Sim Sim "
+        "Cabo RCA / Cabo paralelo para unidade externa Não Não Bateria Extra Não Não "
+        "Carregador Extra Sim Sim Cabo de Força do Monitor Sim Sim Fonte Sim Sim "
+        "Adaptador HDMI Não Não Assinatura RG 12345678 "
+    )
+
+
+def texto_rat(i: int) -> str:
+    a = _ativo(i)
+    return (
+        f"RELATÓRIO DE ATIVAÇÃO TÉCNICA Chamado {a['chamado']} Equipamento {a['modelo']} "
+        f"Série {a['serial']} Técnico responsável: {a['nome']} Atividade concluída. "
+        "Assinatura do técnico "
+    )
+
+
+def paginas_documento(tipo: str, i: int, paginas_anexo: int = 0) -> list:
+    """Texto de cada página do documento `i` do tipo pedido."""
+    if tipo == "concessao":
+        paginas = [texto_concessao(i)]
+    elif tipo == "devolucao":
+        paginas = [texto_devolucao(i)]
+    elif tipo == "misto":
+        # Mesmo ativo na concessão e na devolução, como numa troca de equipamento
+        paginas = [texto_concessao(i), texto_devolucao(i)]
+    elif tipo == "rat":
+        paginas = [texto_rat(i)]
+    elif tipo == "pacote":
+        # Vários termos digitalizados juntos; cada um com um ativo próprio
+        geradores = (texto_concessao, texto_devolucao, texto_rat)
+        paginas = [
+            geradores[n % 3](100000 * (i + 1) + n) for n in range(TERMOS_POR_PACOTE)
+        ]
+    else:
+        raise ValueError(f"Tipo de documento desconhecido: {tipo}")
+    return paginas + [CLAUSULA_ANEXO * 12] * paginas_anexo
+
+
+def gravar_pdf(path: str, paginas: list, formato: str = "a4"):
+    largura, altura = fitz.paper_size(formato)
+    doc = fitz.open()
+    for texto in paginas:
+        pagina = doc.new_page(width=largura, height=altura)
+        pagina.insert_textbox(fitz.Rect(40, 40, largura - 40, altura - 40), texto, fontsize=9)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def gerar_corpus(pasta: str, quantidades: dict, paginas_anexo: int = 0,
+                 formato: str = "a4") -> list:
+    """
+    Grava os PDFs em `pasta` e devolve [(tipo, caminho)]. `quantidades` mapeia cada
+    tipo de TIPOS para o número de documentos.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    gerados = []
+    i = 0
+    for tipo in TIPOS:
+        for _ in range(quantidades.get(tipo, 0)):
+            caminho = os.path.join(pasta, f"{tipo}_{i:06d}.pdf")
+            gravar_pdf(caminho, paginas_documento(tipo, i, paginas_anexo), formato)
+            gerados.append((tipo, caminho))
+            i += 1
+    return gerados
+
+
+def adicionar_argumentos(parser: argparse.ArgumentParser):
+    for tipo, padrao in zip(TIPOS, (20, 20, 10, 10, 0)):
+        parser.add_argument(f"--{tipo}", type=int, default=padrao,
+                            help=f"quantidade de PDFs do tipo {tipo} (padrão {padrao})")
+    parser.add_argument("--paginas-anexo", type=int, default=0,
+                        help="páginas de anexo depois do termo em cada PDF")
+    parser.add_argument("--formato", choices=FORMATOS, default="a4", help="tamanho da página")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pasta", help="pasta onde os PDFs serão gravados")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+    gerados = gerar_corpus(
+        args.pasta, {tipo: getattr(args, tipo) for tipo in TIPOS},
+        args.paginas_anexo, args.formato,
+    )
+    print(f"{len(gerados)} PDFs gravados em {args.pasta}")
+
+
+if __name__ == "__main__":
+    main()
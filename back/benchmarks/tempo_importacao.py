@@ -0,0 +1,72 @@
+"""
+Orçamento de tempo de importação do servidor.
+
+Importa `main` num interpretador novo com `python -X importtime`, soma o tempo
+cumulativo dos módulos de primeiro nível e falha (código 1) se o total passar do
+orçamento ou se alguma dependência pesada (pandas, numpy, openpyxl, PyMuPDF) for
+carregada na partida: elas só devem ser importadas no primeiro uso.
+
+Uso (a partir de back/):
+    python -m benchmarks.tempo_importacao
+    python -m benchmarks.tempo_importacao --orcamento-ms 600 --modulo main --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PESADOS = ("pandas", "numpy", "openpyxl", "fitz", "pymupdf")
+
+
+def medir(modulo: str) -> list:
+    """[(módulo, próprio_us, cumulativo_us, profundidade)] na ordem do -X importtime."""
+    pasta = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=pasta,
+    )
+    if saida.returncode != 0:
+        raise RuntimeError(f"falha ao importar {modulo}:\n{saida.stderr}")
+
+    medidas = []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, cumulativo, nome = linha[len("import time:"):].split("|")
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        medidas.append((nome.strip(), int(proprio), int(cumulativo), profundidade))
+    return medidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação")
+    parser.add_argument("--modulo", default="main", help="módulo importado (padrão: main)")
+    parser.add_argument("--orcamento-ms", type=float, default=800.0,
+                        help="tempo total máximo de importação em ms")
+    parser.add_argument("--top", type=int, default=10, help="módulos mais lentos exibidos")
+    args = parser.parse_args()
+
+    medidas = medir(args.modulo)
+    # Os módulos de profundidade 0 já contam o tempo de tudo o que importam
+    total_ms = sum(cumulativo for _, _, cumulativo, p in medidas if p == 0) / 1000
+    carregados = {nome.split(".")[0] for nome, _, _, _ in medidas}
+    pesados = sorted(carregados.intersection(PESADOS))
+
+    print(f"{'módulo':<40}{'cumulativo (ms)':>16}")
+    topo = sorted((m for m in medidas if m[3] <= 1), key=lambda m: m[2], reverse=True)
+    for nome, _, cumulativo, _ in topo[:args.top]:
+        print(f"{nome:<40}{cumulativo / 1000:>16.1f}")
+    print(f"\ntotal: {total_ms:.1f} ms (orçamento {args.orcamento_ms:.0f} ms)")
+
+    falhas = []
+    if total_ms > args.orcamento_ms:
+        falhas.append(f"importação acima do orçamento: {total_ms:.1f} ms")
+    if pesados:
+        falhas.append(f"dependências pesadas carregadas na partida: {', '.join(pesados)}")
+    for falha in falhas:
+        print(falha, file=sys.stderr)
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
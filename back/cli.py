@@ -0,0 +1,237 @@
+"""
+Auditoria em lote pela linha de comando, sem o servidor web.
+
+Percorre as pastas recursivamente e passa cada PDF pelo mesmo pipeline dos
+endpoints (extrair → mover para a pasta de destino com o nome final → validar)
+num pool de processos. Os registros vão para o ResultStore, com o índice de
+conflitos, e podem ser exportados ao fim em CSV ou XLSX. O banco padrão é o
+mesmo do servidor, que pode estar rodando: os lotes da linha de comando aparecem
+em /exportar e /stats.
+
+Como os PDFs processados saem das pastas de origem, rodar de novo sobre a mesma
+árvore depois de uma interrupção continua de onde parou.
+
+Com --revalidar, o histórico do banco inteiro é revalidado com as regras atuais
+(regras.json) a partir dos campos gravados, sem abrir PDFs; sem pastas, só isso.
+
+Uso (a partir de back/):
+    python cli.py /arquivo/2024 --workers 8
+    python cli.py /arquivo/2023 /arquivo/2024 --destino /arquivo/auditados --saida noite.csv
+    python cli.py --revalidar
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from utils.colunas import COLUNAS
+from utils.exportacao import gerar_csv
+from utils.format_excel import escrever_excel_continuo
+from utils.gravacao import GravadorResultados
+from utils.metricas import RelatorioTempos, cronometrar
+from utils.pipeline import (
+    PoolsProcessamento, obter_inventario, obter_regras, processar_arquivo, workers_padrao,
+)
+from utils.resultados import ResultStore
+from utils.revalidacao import revalidar
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# PDFs enviados ao pool por worker: mantém todos ocupados sem enfileirar a árvore inteira
+EM_VOO_POR_WORKER = 4
+INTERVALO_PROGRESSO = 5.0
+
+
+def listar_pdfs(raizes: list, ignorar: str):
+    """Caminhos dos PDFs sob `raizes`, em ordem, sem descer em `ignorar` (o destino)."""
+    ignorar = os.path.abspath(ignorar)
+    for raiz in raizes:
+        for pasta, subpastas, arquivos in os.walk(raiz):
+            subpastas[:] = sorted(
+                s for s in subpastas if os.path.abspath(os.path.join(pasta, s)) != ignorar
+            )
+            for nome in sorted(arquivos):
+                if nome.lower().endswith(".pdf"):
+                    yield os.path.join(pasta, nome)
+
+
+class Estatisticas:
+    def __init__(self):
+        self.relatorio = RelatorioTempos()
+        self.arquivos = 0
+        self.falhas = 0
+        self.registros = 0
+        self.reprovados = 0
+        self.bytes = 0
+        self.cache_hits = 0
+
+    def linha(self) -> str:
+        duracao = max(time.monotonic() - self.relatorio.inicio, 1e-9)
+        return (
+            f"{self.arquivos} arquivos ({self.falhas} com erro), {self.registros} registros "
+            f"({self.reprovados} reprovados) em {duracao:.1f} s: "
+            f"{self.arquivos / duracao:.1f} arquivos/s, {self.bytes / duracao / 1e6:.2f} MB/s"
+        )
+
+
+def auditar(caminhos, destino: str, cache_path: str, workers: int,
+            gravador: GravadorResultados, lote: str) -> Estatisticas:
+    """
+    Processa os caminhos no pool e grava cada arquivo assim que termina, neste
+    processo (único escritor). Os que voltam pedindo OCR seguem para o pool de OCR.
+    Um worker que morre só conta como erro dos arquivos que estavam no pool, que é
+    recriado. Um lote que já existe no store continua a numeração dos arquivos.
+    """
+    workers = workers or workers_padrao()
+    pools = PoolsProcessamento(workers)
+    limite = workers * EM_VOO_POR_WORKER
+    stats = Estatisticas()
+    caminhos = iter(caminhos)
+    futuros = {}
+    proximo = gravador.store.proximo_arquivo(lote)
+    ultimo_aviso = time.monotonic()
+
+    def enviar():
+        nonlocal proximo
+        while len(futuros) < limite:
+            caminho = next(caminhos, None)
+            if caminho is None:
+                return
+            futuro, executor = pools.submeter(
+                "pdf", processar_arquivo, caminho, destino, cache_path
+            )
+            futuros[futuro] = (proximo, caminho, time.time(), {}, "pdf", executor)
+            proximo += 1
+
+    try:
+        enviar()
+        while futuros:
+            concluidos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                idx, caminho, enviado, tempos_anteriores, qual, executor = futuros.pop(futuro)
+                erro = pools.erro(qual, executor, futuro.exception())
+                if erro is not None:
+                    stats.arquivos += 1
+                    stats.falhas += 1
+                    print(f"Erro em {caminho}: {erro}", file=sys.stderr)
+                    continue
+                resultado = futuro.result()
+                tempos = resultado["tempos"]
+                tempos["espera_fila"] = max(0.0, resultado["inicio"] - enviado)
+                for etapa, segundos in tempos_anteriores.items():
+                    tempos[etapa] = tempos.get(etapa, 0.0) + segundos
+                if resultado.get("precisa_ocr"):
+                    ocr, executor = pools.submeter(
+                        "ocr", processar_arquivo, resultado["caminho"], destino, cache_path,
+                        resultado["sha256"], True,
+                    )
+                    futuros[ocr] = (idx, caminho, time.time(), tempos, "ocr", executor)
+                    continue
+
+                registros = resultado["registros"]
+                with cronometrar(tempos, "gravacao"):
+                    gravador.gravar(lote, idx, registros)
+                stats.relatorio.adicionar(tempos)
+                stats.arquivos += 1
+                stats.registros += len(registros)
+                stats.reprovados += sum(1 for r in registros if r.get("STATUS TERMO") != "OK")
+                stats.bytes += resultado["bytes"]
+                stats.cache_hits += resultado["cache"] == "hit"
+
+            enviar()
+            if time.monotonic() - ultimo_aviso >= INTERVALO_PROGRESSO:
+                ultimo_aviso = time.monotonic()
+                print(stats.linha(), file=sys.stderr)
+    finally:
+        pools.encerrar()
+    return stats
+
+
+def exportar(store: ResultStore, lote: str, path: str):
+    """Registros do lote em CSV ou XLSX, conforme a extensão de `path`."""
+    linhas = store.consultar(lote=lote)
+    if path.lower().endswith(".xlsx"):
+        escrever_excel_continuo(path, COLUNAS, linhas)
+        return
+    with open(path, "wb") as f:
+        for bloco in gerar_csv(COLUNAS, linhas):
+            f.write(bloco)
+
+
+def revalidar_historico(store: ResultStore):
+    resultado = revalidar(store, obter_regras(), obter_inventario())
+    print(
+        f"revalidação com as regras {resultado['versao']}: {resultado['alterados']} de "
+        f"{resultado['registros']} registros mudaram em {resultado['segundos']:.1f} s",
+        file=sys.stderr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoria de termos em lote, sem o servidor web")
+    parser.add_argument("pastas", nargs="*", help="pastas percorridas recursivamente")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos do pool (padrão: AUDITORIA_WORKERS ou núcleos)")
+    parser.add_argument("--destino", default=os.path.join(BASE_DIR, "termos auditados"),
+                        help="pasta para onde os PDFs são movidos, já renomeados")
+    parser.add_argument("--banco", default=os.path.join(BASE_DIR, "resultados.db"),
+                        help="ResultStore onde os registros são gravados")
+    parser.add_argument("--cache", default=os.path.join(BASE_DIR, "cache.db"),
+                        help="cache de extração por SHA-256")
+    parser.add_argument("--sem-cache", action="store_true", help="não usa o cache de extração")
+    parser.add_argument("--lote", default=None, help="identificador do lote (padrão: aleatório)")
+    parser.add_argument("--saida", help="exporta os registros do lote para este .csv ou .xlsx")
+    parser.add_argument("--revalidar", action="store_true",
+                        help="revalida todo o histórico do banco com as regras atuais")
+    args = parser.parse_args()
+
+    if not args.pastas:
+        if not args.revalidar:
+            parser.error("informe as pastas ou --revalidar")
+        revalidar_historico(ResultStore(args.banco, COLUNAS))
+        return
+
+    for pasta in args.pastas:
+        if not os.path.isdir(pasta):
+            parser.error(f"o diretório '{pasta}' não existe")
+    os.makedirs(args.destino, exist_ok=True)
+    lote = args.lote or uuid.uuid4().hex
+
+    store = ResultStore(args.banco, COLUNAS)
+    gravador = GravadorResultados(store)
+    gravador.carregar()
+
+    print(f"Lote {lote}", file=sys.stderr)
+    try:
+        stats = auditar(
+            listar_pdfs(args.pastas, args.destino), args.destino,
+            None if args.sem_cache else args.cache, args.workers, gravador, lote,
+        )
+    except KeyboardInterrupt:
+        print("Interrompido; os arquivos já concluídos estão gravados.", file=sys.stderr)
+        sys.exit(130)
+
+    print(stats.linha(), file=sys.stderr)
+    print(f"cache: {stats.cache_hits} de {stats.arquivos} arquivos", file=sys.stderr)
+    etapas = stats.relatorio.resumo()["etapas"]
+    for etapa, dados in sorted(etapas.items(), key=lambda item: -item[1]["total"]):
+        print(f"  {etapa:<16}{dados['total']:>10.3f} s{dados['media'] * 1000:>10.2f} ms/arquivo",
+              file=sys.stderr)
+    contagens = gravador.contagens(lote)
+    print(
+        f"conflitos: {contagens['duplicados']} duplicados, "
+        f"{contagens['devolucoesSemConcessao']} devoluções sem concessão, {contagens['pares']} pares",
+        file=sys.stderr,
+    )
+
+    if args.revalidar:
+        revalidar_historico(store)
+    if args.saida:
+        exportar(store, lote, args.saida)
+        print(f"Registros exportados para {args.saida}", file=sys.stderr)
+    sys.exit(1 if stats.falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,77 @@
 import os
+import time
 import uuid
-import pandas as pd
 import asyncio
 
-from fastapi import FastAPI, UploadFile, File, WebSocket, Body
+from contextlib import aclosing, asynccontextmanager
+from datetime import date, datetime
+
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import List
-from utils.format_excel import format_excel
-from utils.process_pdf import process_pdf
-from utils.renomear_excel import renomear_pdf
-from utils.validar_termo import validar_termo
-
-app = FastAPI()
+from utils.colunas import COLUNAS
+from utils.compactados import (
+    ERROS_COMPACTADO, eh_compactado, extrair_pdfs, listar_pdfs, referencia, separar,
+)
+from utils.coordenacao import TravaLider, identificador_processo, processo_vivo
+from utils.exportacao import FORMATOS, gerar_csv, gerar_xlsx
+from utils.format_excel import escrever_excel_continuo
+from utils.gravacao import GravadorResultados
+from utils.jobs import JobStore, novo_chart_data
+from utils.metricas import MetricasAuditoria, RelatorioTempos, cronometrar
+from utils.pipeline import (
+    PROCESSOS_WEB, PoolsProcessamento, obter_inventario, obter_regras, processar_arquivo,
+)
+from utils.progresso import TODOS, HubProgresso, RastreadorProgresso
+from utils.renomear_excel import localizar_movido, mover_sem_colisao
+from utils.resultados import DIMENSOES, ResultStore
+from utils.revalidacao import CHAVE_VERSAO, revalidar
+from utils.spool import gravar_upload
+from utils.vigia import ManifestoPastas, VigiaPastas
+
+pools = None
+jobs_ativos = {}
+tarefa_vigia = None
+tarefa_coordenacao = None
+tarefa_revalidacao = None
+metricas = MetricasAuditoria(jobs_ativos)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global pools, tarefa_coordenacao
+    os.makedirs(PASTA_TERMO, exist_ok=True)
+    os.makedirs(PASTA_SPOOL, exist_ok=True)
+    os.makedirs(PASTA_COMPACTADOS, exist_ok=True)
+    pools = PoolsProcessamento()
+
+    # Primeira execução com o store: traz a planilha antiga para não perder o histórico
+    if result_store.vazio() and os.path.exists(SAIDA_XLSX):
+        await asyncio.to_thread(result_store.importar_excel, SAIDA_XLSX)
+    await asyncio.to_thread(gravador.carregar)
+
+    # Retoma os jobs interrompidos e assume a vigia de pastas já no primeiro ciclo
+    tarefa_coordenacao = asyncio.create_task(coordenar())
+
+    yield
+
+    for tarefa in (tarefa_coordenacao, tarefa_vigia, tarefa_revalidacao):
+        if tarefa:
+            tarefa.cancel()
+            await asyncio.gather(tarefa, return_exceptions=True)
+    trava_vigia.liberar()
+    tarefas = list(jobs_ativos.values())
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    # Os jobs interrompidos voltam para a fila; outro processo (ou o próximo início) continua
+    await asyncio.to_thread(job_store.liberar, PROCESSO)
+    pools.encerrar()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,172 +82,461 @@ app.add_middleware(
 )
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SAIDA_XLSX = os.path.join(BASE_DIR, "resultado.xlsx")
-PASTA_TERMO = os.path.join(BASE_DIR, "termos auditados")  # nova pasta
-os.makedirs(PASTA_TERMO, exist_ok=True)  # garante que exista
-
-COLUNAS = [
-    "NOME",
-    "TERMO",
-    "STATUS TERMO",
-    "ASSINADO",
-    "TIPO",
-    "MODELO",
-    "MARCA",
-    "SERIAL",
-    "MONITOR",
-    "MODELO MONITOR",
-    "SERIAL MONITOR",
-    "PATRIMÔNIO",
-    "NF",
-    "CHAMADO",
-    "HOSTNAME",
-    "RAM",
-    "MEMÓRIA",
-    "MOUSE",
-    "TECLADO",
-    "HEADSET",
-    "KIT BOAS-VINDAS",
-    "WEBCAM",
-    "HUB USB",
-    "SUPORTE ERGONÔMICO",
-    "CABO DE SEGURANÇA",
-    "MOCHILA",
-    "DOCK STATION",
-    "LACRE DE SEGURANÇA",
-    "CABO RCA",
-    "BATERIA EXTRA",
-    "CARREGADOR EXTRA",
-    "CABO DE FORÇA DO MONITOR",
-    "FONTE",
-    "ADAPTADOR HDMI",
-]
-
-
-def ensure_excel_exists():
-    if not os.path.exists(SAIDA_XLSX):
-        df = pd.DataFrame(columns=COLUNAS)
-        df.to_excel(SAIDA_XLSX, index=False)
-        format_excel(SAIDA_XLSX)
-
-
-def append_row_to_excel(dados: dict):
-    ensure_excel_exists()
-    try:
-        df = pd.read_excel(SAIDA_XLSX)
-        df = pd.concat([df, pd.DataFrame([dados])], ignore_index=True)
-        df.to_excel(SAIDA_XLSX, index=False)
-        format_excel(SAIDA_XLSX)
-
-    except Exception as e:
-        print(f"Erro ao escrever no Excel: {e}")
-
-
-connected_clients = []
+SAIDA_XLSX = os.path.join(BASE_DIR, "resultado.xlsx")  # exportação, gerada sob demanda
+PASTA_TERMO = os.path.join(BASE_DIR, "termos auditados")  # nova pasta, criada na partida
+PASTA_SPOOL = os.path.join(BASE_DIR, "spool")  # uploads em andamento
+PASTA_COMPACTADOS = os.path.join(PASTA_TERMO, "compactados")  # ZIP/TAR já processados
+job_store = JobStore(os.path.join(BASE_DIR, "auditoria.db"))
+result_store = ResultStore(os.path.join(BASE_DIR, "resultados.db"), COLUNAS)
+gravador = GravadorResultados(result_store)
+CACHE_DB = os.path.join(BASE_DIR, "cache.db")
+# Pastas de entrada vigiadas desde a partida (separadas por os.pathsep)
+PASTAS_ENTRADA = [p for p in os.environ.get("AUDITORIA_PASTAS_ENTRADA", "").split(os.pathsep) if p]
+manifesto_pastas = ManifestoPastas(os.path.join(BASE_DIR, "auditoria.db"))
+
+# --- Vários processos ---
+# `uvicorn main:app --workers N` (com WEB_CONCURRENCY=N, que também divide os núcleos
+# entre os pools) sobe N processos sobre os mesmos bancos: os jobs são uma fila no
+# JobStore, cada um executado por um processo só e retomado por outro se o dono parar
+# de renovar; todos gravam no mesmo ResultStore; só um processo vigia as pastas.
+PROCESSO = identificador_processo()
+VALIDADE_JOB = float(os.environ.get("AUDITORIA_JOB_VALIDADE", "30"))
+trava_vigia = TravaLider(os.path.join(BASE_DIR, "vigia.lock"))
+
+
+hub_progresso = HubProgresso()
 
 
 @app.websocket("/ws/progresso")
-async def websocket_progresso(ws: WebSocket):
+async def websocket_progresso(ws: WebSocket, job: str = None):
+    # Sem `job` o cliente recebe o progresso de todos os lotes
     await ws.accept()
-    connected_clients.append(ws)
+    canal = job or TODOS
+    fila = hub_progresso.assinar(canal)
+    remoto = asyncio.create_task(acompanhar_job_remoto(job)) if job and PROCESSOS_WEB > 1 else None
     try:
-        while True:
-            await asyncio.sleep(1)
+        while (evento := await fila.get()) is not None:
+            await ws.send_json(evento)
+        await ws.close()
     except Exception:
-        connected_clients.remove(ws)
+        pass
+    finally:
+        if remoto:
+            remoto.cancel()
+        hub_progresso.cancelar(canal, fila)
+
+
+async def acompanhar_job_remoto(job_id: str):
+    """
+    Com vários processos, o job assinado pode estar rodando em outro: repassa aos
+    assinantes deste processo o progresso lido do JobStore até o job terminar.
+    """
+    anterior = None
+    while True:
+        await asyncio.sleep(1)
+        if job_id in jobs_ativos:
+            continue
+        evento = await asyncio.to_thread(job_store.progresso, job_id)
+        if evento is None or evento == anterior:
+            continue
+        anterior = evento
+        final = evento["status"] not in ("pendente", "executando")
+        hub_progresso.publicar(
+            job_id, {**evento, "arquivosPorSegundo": None, "eta": None}, final=final
+        )
+        if final:
+            return
+
+
+TIPOS_MAP = {
+    "CONCESSÃO": "concessao",
+    "DEVOLUÇÃO": "devolucao",
+    "RAT": "rat",
+    "DESCONHECIDO": "desconhecido",
+}
+
+
+async def executar_pipeline(entradas):
+    """
+    Distribui os PDFs (lista de (nome, caminho), (nome, caminho, sha256) ou
+    (nome, caminho, sha256, registro_job), ver processar_arquivo) entre
+    os processos do pool e devolve (índice, resultado, erro) em ordem de conclusão.
+    `entradas` também pode ser um iterador assíncrono (membros de um compactado
+    saindo do spool): cada entrada vai ao pool assim que chega, e o índice é a
+    ordem de chegada. Um caminho que é uma exceção (compactado ilegível) volta como
+    erro daquela entrada, sem passar pelo pool.
+    Os que voltam pedindo OCR seguem para o pool de OCR e só são devolvidos depois.
+    """
+    loop = asyncio.get_running_loop()
+    futuros = {}
+    pendentes = set()
+
+    def submeter(qual: str, *args, **kwargs):
+        futuro, executor = pools.submeter(qual, processar_arquivo, *args, **kwargs)
+        return asyncio.wrap_future(futuro), executor
+
+    def enviar(idx: int, path, extra: list):
+        sha256, registro_job = (*extra, None, None)[:2]
+        if isinstance(path, Exception):
+            futuro, executor = loop.create_future(), None
+            futuro.set_exception(path)
+        else:
+            futuro, executor = submeter(
+                "pdf", path, PASTA_TERMO, CACHE_DB, sha256, registro_job=registro_job,
+            )
+        futuros[futuro] = (idx, time.time(), {}, registro_job, "pdf", executor)
+        pendentes.add(futuro)
+        metricas.fila.inc()
+
+    fonte = proxima = None
+    if isinstance(entradas, list):
+        for idx, (_, path, *extra) in enumerate(entradas):
+            enviar(idx, path, extra)
+    else:
+        fonte = aiter(entradas)
+        proxima = asyncio.ensure_future(anext(fonte, None))
+        recebidas = 0
+    try:
+        while pendentes or proxima:
+            concluidos, _ = await asyncio.wait(
+                pendentes | {proxima} if proxima else pendentes,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if proxima in concluidos:
+                concluidos.discard(proxima)
+                entrada = proxima.result()
+                proxima = None
+                if entrada is not None:
+                    _, path, *extra = entrada
+                    enviar(recebidas, path, extra)
+                    recebidas += 1
+                    proxima = asyncio.ensure_future(anext(fonte, None))
+            for futuro in concluidos:
+                pendentes.discard(futuro)
+                metricas.fila.dec()
+                idx, enviado, tempos_anteriores, registro_job, qual, executor = futuros.pop(futuro)
+                # Um worker morto volta como erro dos arquivos em andamento no pool
+                erro = pools.erro(qual, executor, futuro.exception())
+                resultado = None if erro else futuro.result()
+                if resultado:
+                    # Tempo entre o envio ao pool e o início no worker
+                    resultado["tempos"]["espera_fila"] = max(0.0, resultado["inicio"] - enviado)
+                    for etapa, segundos in tempos_anteriores.items():
+                        resultado["tempos"][etapa] = resultado["tempos"].get(etapa, 0.0) + segundos
+                if resultado and resultado.get("precisa_ocr"):
+                    ocr, executor = submeter(
+                        "ocr", resultado["caminho"], PASTA_TERMO, CACHE_DB,
+                        resultado["sha256"], True, registro_job,
+                    )
+                    futuros[ocr] = (
+                        idx, time.time(), resultado["tempos"], registro_job, "ocr", executor,
+                    )
+                    pendentes.add(ocr)
+                    metricas.fila.inc()
+                    continue
+                metricas.registrar_arquivo(resultado, erro)
+                yield idx, resultado, erro
+    finally:
+        metricas.fila.dec(len(pendentes))
+        for futuro in pendentes:
+            futuro.cancel()
+        if proxima:
+            proxima.cancel()
+            await asyncio.gather(proxima, return_exceptions=True)
+        if fonte is not None:
+            # Fecha a origem (compactados abertos, temporários do spool) se o lote parou antes
+            await fonte.aclose()
+
+
+async def gravar_resultados(lote: str, arquivo: int, resultado: dict):
+    """
+    Grava os registros de um arquivo somando o tempo em "gravacao". Roda numa thread,
+    não no event loop: a espera pela transação exclusiva (outro processo gravando)
+    não trava as requisições. Lotes simultâneos gravam em série pela trava do store.
+    """
+    tempos = resultado["tempos"]
+    with cronometrar(tempos, "gravacao"):
+        await asyncio.to_thread(gravador.gravar, lote, arquivo, resultado["registros"])
+    metricas.etapas.observar(tempos["gravacao"], "gravacao")
+
+
+def resumir_arquivo(nome: str, resultado: dict, erro: Exception):
+    """Monta as linhas de `resultados` e o incremento de chartData de um arquivo."""
+    chart = novo_chart_data()
+    if erro is not None:
+        chart["erro"] += 1
+        return [{"NOME": nome, "status": "erro", "erro": str(erro)}], chart
 
+    resultados = []
+    for dados in resultado["registros"]:
+        status = "ok" if dados["STATUS TERMO"] == "OK" else "erro"
+        resultados.append(
+            {
+                "NOME": dados["NOME"],
+                "status": status,
+                "tipo": dados.get("TIPO", "desconhecido"),
+                "conflito": dados.get("CONFLITO", ""),
+            }
+        )
 
-async def broadcast_progress(progress: int):
-    for ws in connected_clients:
-        try:
-            await ws.send_json({"progress": progress})
-        except Exception:
-            connected_clients.remove(ws)
+        # Atualiza estatísticas gerais
+        chart[status] += 1
 
+        # Atualiza estatísticas por tipo de documento
+        tipo_documento = TIPOS_MAP.get(dados.get("TERMO", "").upper(), "desconhecido")
+        chart[tipo_documento] += 1
 
-@app.post("/upload")
-async def upload_pdfs(pdfs: List[UploadFile] = File(...)):
-    ensure_excel_exists()
-    resultados = []
-    chart_data = {
-        "ok": 0,
-        "erro": 0,
-        "concessao": 0,
-        "devolucao": 0,
-        "rat": 0,
-        "desconhecido": 0,
-    }
-    total = len(pdfs)
+    return resultados, chart
 
-    TIPOS_MAP = {
-        "CONCESSÃO": "concessao",
-        "DEVOLUÇÃO": "devolucao",
-        "RAT": "rat",
-        "DESCONHECIDO": "desconhecido",
+
+async def processar_lote(job_id: str, origem, entradas: list) -> dict:
+    """
+    Processa o lote inteiro dentro da requisição. Registros, estatísticas e
+    progresso são gravados só aqui, por um único escritor. `origem` é um iterador
+    assíncrono de (nome, caminho, sha256); cada entrada recebida é acrescentada a
+    `entradas`, e o total do progresso cresce junto.
+    """
+    resultados = []
+    chart_data = novo_chart_data()
+    cache = {"hits": 0, "misses": 0}
+    progresso = RastreadorProgresso(job_id, 0)
+    relatorio = RelatorioTempos()
+
+    async def receber():
+        async for entrada in origem:
+            entradas.append(entrada)
+            progresso.total += 1
+            yield entrada
+
+    async for idx, resultado, erro in executar_pipeline(receber()):
+        if resultado:
+            cache["hits" if resultado["cache"] == "hit" else "misses"] += 1
+            await gravar_resultados(job_id, idx, resultado)
+            relatorio.adicionar(resultado["tempos"])
+        resultados_arquivo, chart = resumir_arquivo(entradas[idx][0], resultado, erro)
+        resultados.extend(resultados_arquivo)
+        for chave, valor in chart.items():
+            chart_data[chave] += valor
+
+        progresso.arquivo_concluido(chart, len(resultado["registros"]) if resultado else 0)
+        hub_progresso.publicar(job_id, progresso.evento())
+
+    hub_progresso.publicar(job_id, progresso.evento(), final=True)
+    chart_data.update(await asyncio.to_thread(gravador.contagens, job_id))
+    return {
+        "jobId": job_id,
+        "resultados": resultados,
+        "excelUrl": url_planilha(job_id),
+        "chartData": chart_data,
+        "cache": cache,
+        "tempos": relatorio.resumo(),
     }
 
-    for idx, pdf in enumerate(pdfs):
-        temp_path = f"temp_{uuid.uuid4().hex}_{pdf.filename}"
-        contents = await pdf.read()
-        with open(temp_path, "wb") as f:
-            f.write(contents)
 
-        try:
-            novo_caminho = renomear_pdf(temp_path)
-            novo_caminho_final = os.path.join(
-                PASTA_TERMO, os.path.basename(novo_caminho)
-            )
-            os.replace(novo_caminho, novo_caminho_final)
-            novo_caminho = novo_caminho_final
-
-            registros = process_pdf(novo_caminho)
-            for dados in registros:
-                dados["NOME"] = os.path.basename(novo_caminho)
-
-                # Define status do termo
-                if validar_termo(dados):
-                    dados["STATUS TERMO"] = "OK"
-                    status = "ok"
-                else:
-                    dados["STATUS TERMO"] = "ERRO"
-                    status = "erro"
-
-                append_row_to_excel(dados)
-
-                resultados.append(
-                    {
-                        "NOME": os.path.basename(novo_caminho),
-                        "status": status,
-                        "tipo": dados.get("TIPO", "desconhecido"),
-                    }
-                )
+async def executar_job(job_id: str):
+    """
+    Processa os arquivos pendentes de um job persistido. Cada arquivo concluído é
+    gravado no ResultStore e depois no JobStore, e só então marcado como exportado.
+    Regravar no ResultStore um arquivo que já tinha chegado lá não duplica linhas,
+    então uma queda entre as etapas só faz o arquivo ser gravado de novo.
+    """
+    # Registros de arquivos concluídos antes de uma queda que não chegaram ao store
+    for ordem, registros in await asyncio.to_thread(job_store.nao_exportados, job_id):
+        await asyncio.to_thread(gravador.gravar, job_id, ordem, registros)
+        await asyncio.to_thread(job_store.marcar_exportados, job_id, [ordem])
 
-                # Atualiza estatísticas gerais
-                if status == "erro":
-                    chart_data["erro"] += 1
-                else:
-                    chart_data["ok"] += 1
+    pendentes = await asyncio.to_thread(job_store.arquivos_pendentes, job_id)
+    total = (await asyncio.to_thread(job_store.obter, job_id))["total"]
+    progresso = RastreadorProgresso(job_id, total, feitos=total - len(pendentes))
+    await asyncio.to_thread(job_store.atualizar_status, job_id, "executando")
 
-                # Atualiza estatísticas por tipo de documento
-                tipo_documento = TIPOS_MAP.get(
-                    dados.get("TERMO", "").upper(), "desconhecido"
+    try:
+        recebidas = []
+        compactados_com_erro = set()
+        entradas = entradas_job(job_id, pendentes, recebidas)
+        async with aclosing(executar_pipeline(entradas)) as arquivos:
+            async for idx, resultado, erro in arquivos:
+                ordem, nome, temp_path, compactado = recebidas[idx]
+                if temp_path and os.path.exists(temp_path):
+                    # Membro de compactado que falhou antes de sair do spool
+                    os.remove(temp_path)
+                if erro and compactado:
+                    compactados_com_erro.add(compactado)
+                registros = resultado["registros"] if resultado else []
+                if resultado:
+                    await gravar_resultados(job_id, ordem, resultado)
+                resultados_arquivo, chart = resumir_arquivo(nome, resultado, erro)
+                await asyncio.to_thread(
+                    job_store.registrar_arquivo,
+                    job_id, ordem, "erro" if erro else "concluido",
+                    registros, resultados_arquivo, chart,
+                    resultado["cache"] if resultado else None,
+                    resultado["tempos"] if resultado else None,
                 )
-                chart_data[tipo_documento] += 1
-
+                await asyncio.to_thread(job_store.marcar_exportados, job_id, [ordem])
+
+                progresso.arquivo_concluido(chart, len(registros))
+                hub_progresso.publicar(job_id, progresso.evento())
+
+                if await asyncio.to_thread(job_store.status, job_id) == "cancelado":
+                    # DELETE recebido por outro processo do servidor
+                    return
+
+        await asyncio.to_thread(job_store.atualizar_status, job_id, "concluido")
+        # Compactados lidos por inteiro saem da pasta, como os PDFs processados;
+        # com algum membro em erro, ficam onde estão
+        for compactado in {c for *_, c in recebidas if c} - compactados_com_erro:
+            try:
+                await asyncio.to_thread(
+                    mover_sem_colisao, compactado, PASTA_COMPACTADOS, os.path.basename(compactado)
+                )
+            except OSError as e:
+                print(f"Erro ao mover o compactado {compactado}: {e}")
+    except asyncio.CancelledError:
+        # Cancelado pelo DELETE (status já gravado) ou pela parada do servidor,
+        # caso em que o job continua "executando" e é retomado no próximo início
+        raise
+    except Exception as e:
+        print(f"Erro no job {job_id}: {e}")
+        await asyncio.to_thread(job_store.atualizar_status, job_id, "erro")
+    finally:
+        hub_progresso.publicar(job_id, progresso.evento(), final=True)
+        jobs_ativos.pop(job_id, None)
+
+
+async def entradas_job(job_id: str, pendentes: list, recebidas: list):
+    """
+    Entradas do executar_pipeline para os arquivos pendentes de um job. Os PDFs
+    soltos vão primeiro; os membros de cada compactado são lidos numa passada só,
+    direto para o spool, e seguem para o pool à medida que saem. `recebidas` recebe
+    (ordem, nome, temporário, compactado) na ordem em que as entradas saem daqui.
+    Um PDF solto que o worker já tinha movido quando o servidor parou é procurado
+    na pasta de destino pelo SHA-256 anotado no job e processado de lá.
+    """
+    compactados = {}
+    for ordem, nome, caminho, sha256, destino in pendentes:
+        membro = separar(caminho)
+        if membro:
+            compactados.setdefault(membro[0], {})[membro[1]] = (ordem, nome)
+            continue
+        movido = None
+        if destino and not os.path.exists(caminho):
+            movido = await asyncio.to_thread(localizar_movido, PASTA_TERMO, destino, sha256)
+        if movido:
+            caminho = movido
+        else:
+            # O arquivo ainda está na origem: o SHA-256 é recalculado
+            sha256 = None
+        recebidas.append((ordem, nome, None, None))
+        yield nome, caminho, sha256, (job_store.path, job_id, ordem)
+
+    for compactado, membros in compactados.items():
+        erro = ValueError("PDF não encontrado no compactado")
+        try:
+            lidos = iterar_em_thread(extrair_pdfs(compactado, PASTA_SPOOL, set(membros)))
+            async for membro, temp_path, sha256 in lidos:
+                if membro not in membros:
+                    # Nome repetido dentro do compactado: só o primeiro conta
+                    os.remove(temp_path)
+                    continue
+                ordem, nome = membros.pop(membro)
+                recebidas.append((ordem, nome, temp_path, compactado))
+                yield nome, temp_path, sha256
+        except ERROS_COMPACTADO as e:
+            erro = ValueError(f"Compactado ilegível: {e}")
+        # O que não saiu do compactado (sumiu, corrompeu) fica como erro no job
+        for ordem, nome in membros.values():
+            recebidas.append((ordem, nome, None, compactado))
+            yield nome, erro
+
+
+async def iniciar_job(job_id: str, anterior: tuple = None):
+    # Só executa quem conseguir reivindicar o job (pode haver outros processos)
+    if await asyncio.to_thread(job_store.reivindicar, job_id, PROCESSO, anterior):
+        jobs_ativos[job_id] = asyncio.create_task(executar_job(job_id))
+
+
+async def coordenar():
+    """
+    Ciclo de coordenação entre processos, a cada terço da validade: renova os jobs
+    deste processo, adota os pendentes sem dono ou cujo dono parou (o que inclui os
+    interrompidos por uma parada do servidor) e tenta assumir a vigia de pastas. O
+    líder também revalida o histórico quando as regras mudaram desde a última vez.
+    As transações do JobStore rodam em threads: com outros processos disputando o
+    banco, a espera pelo lock do SQLite não trava o event loop.
+    """
+    global tarefa_revalidacao
+    while True:
+        try:
+            await asyncio.to_thread(job_store.renovar, PROCESSO, list(jobs_ativos))
+            limite = time.time() - VALIDADE_JOB
+            for job_id, dono, visto_em in await asyncio.to_thread(job_store.ativos):
+                if job_id in jobs_ativos:
+                    continue
+                if dono is None or (visto_em or 0) < limite or not processo_vivo(dono, PROCESSO):
+                    await iniciar_job(job_id, (dono, visto_em))
+            if trava_vigia.tentar():
+                # Pastas da variável de ambiente e as adicionadas por /vigiar em qualquer processo
+                for pasta in PASTAS_ENTRADA + await asyncio.to_thread(manifesto_pastas.pastas):
+                    vigiar_pasta(pasta)
+                if (not trava_revalidacao.locked()
+                        and await asyncio.to_thread(result_store.ler_meta, CHAVE_VERSAO)
+                        != obter_regras().identificador):
+                    tarefa_revalidacao = asyncio.create_task(revalidar_historico())
         except Exception as e:
-            resultados.append({"NOME": pdf.filename, "status": "erro", "erro": str(e)})
-            chart_data["erro"] += 1
-        finally:
-            if os.path.exists(temp_path) and temp_path != novo_caminho:
+            print(f"Erro na coordenação entre processos: {e}")
+        await asyncio.sleep(VALIDADE_JOB / 3)
+
+
+@app.post("/upload")
+async def upload_pdfs(
+    pdfs: List[UploadFile] = File(...), job_id: str = Form(None)
+):
+    # O cliente pode gerar o job_id para assinar /ws/progresso?job=... antes do envio
+    job_id = job_id or uuid.uuid4().hex
+    entradas = []
+    try:
+        return await processar_lote(job_id, entradas_upload(pdfs), entradas)
+    finally:
+        for _, temp_path, _ in entradas:
+            if isinstance(temp_path, str) and os.path.exists(temp_path):
                 os.remove(temp_path)
 
-        await broadcast_progress(int((idx + 1) / total * 100))
 
-    return {
-        "resultados": resultados,
-        "excelUrl": f"/download/{os.path.basename(SAIDA_XLSX)}",
-        "chartData": chart_data,
-    }
+async def iterar_em_thread(gerador):
+    """Consome um gerador bloqueante (leitura de compactado) numa thread, item a item."""
+    try:
+        while (item := await asyncio.to_thread(next, gerador, None)) is not None:
+            yield item
+    finally:
+        try:
+            gerador.close()
+        except ValueError:
+            # Cancelado com a thread ainda lendo um membro; o gerador acaba sozinho
+            pass
+
+
+async def entradas_upload(pdfs: list):
+    """
+    (nome, caminho, sha256) de cada PDF enviado à medida que chega ao spool. De um
+    compactado (ZIP/TAR), cada PDF de dentro vira uma entrada "compactado/membro",
+    lida direto do upload, sem extrair o compactado inteiro antes.
+    """
+    for pdf in pdfs:
+        nome = pdf.filename or "arquivo.pdf"
+        if not eh_compactado(nome):
+            temp_path, sha256 = await gravar_upload(pdf, PASTA_SPOOL)
+            yield nome, temp_path, sha256
+            continue
+        try:
+            membros = extrair_pdfs(pdf.file, PASTA_SPOOL)
+            async for membro, temp_path, sha256 in iterar_em_thread(membros):
+                yield f"{nome}/{membro}", temp_path, sha256
+        except ERROS_COMPACTADO as e:
+            # Os membros já lidos seguem no lote; o compactado aparece como erro
+            yield nome, ValueError(f"Compactado ilegível: {e}"), None
+        finally:
+            await pdf.close()
 
 
 @app.post("/processar-pasta")
@@ -196,86 +544,258 @@ async def processar_pasta(diretorio: str = Body(..., embed=True)):
     if not os.path.isdir(diretorio):
         return {"erro": f"O diretório '{diretorio}' não existe."}
 
-    arquivos_pdf = [f for f in os.listdir(diretorio) if f.lower().endswith(".pdf")]
-    if not arquivos_pdf:
+    nomes = os.listdir(diretorio)
+    entradas = [(nome, os.path.join(diretorio, nome)) for nome in nomes if nome.lower().endswith(".pdf")]
+    # Cada PDF de um compactado entra no job como referência; ele só é lido na execução
+    for nome in sorted(n for n in nomes if eh_compactado(n)):
+        caminho = os.path.join(diretorio, nome)
+        try:
+            membros = await asyncio.to_thread(listar_pdfs, caminho)
+        except ERROS_COMPACTADO as e:
+            print(f"Erro ao ler o compactado {caminho}: {e}")
+            continue
+        entradas.extend((f"{nome}/{membro}", referencia(caminho, membro)) for membro in membros)
+    if not entradas:
         return {"erro": "Nenhum PDF encontrado no diretório."}
 
-    resultados = []
-    chart_data = {
-        "ok": 0,
-        "erro": 0,
-        "concessao": 0,
-        "devolucao": 0,
-        "rat": 0,
-        "desconhecido": 0,
-    }
+    job_id = await asyncio.to_thread(job_store.criar, entradas, diretorio)
+    await iniciar_job(job_id)
+    return {"jobId": job_id, "status": "pendente", "total": len(entradas)}
 
-    TIPOS_MAP = {
-        "CONCESSÃO": "concessao",
-        "DEVOLUÇÃO": "devolucao",
-        "RAT": "rat",
-        "DESCONHECIDO": "desconhecido",
-    }
 
-    total = len(arquivos_pdf)
+# --- Vigia de pastas de entrada ---
+async def ingerir_detectados(pasta: str, caminhos: list):
+    """PDFs novos ou alterados numa pasta vigiada viram um job persistido."""
+    job_id = await asyncio.to_thread(
+        job_store.criar, [(os.path.basename(c), c) for c in caminhos], pasta
+    )
+    await iniciar_job(job_id)
 
-    for idx, nome in enumerate(arquivos_pdf):
-        path = os.path.join(diretorio, nome)
-        try:
-            novo_caminho = renomear_pdf(path)
-            novo_caminho_final = os.path.join(
-                PASTA_TERMO, os.path.basename(novo_caminho)
-            )
-            os.replace(novo_caminho, novo_caminho_final)
-            novo_caminho = novo_caminho_final
-
-            registros = process_pdf(novo_caminho)
-            for dados in registros:
-                dados["NOME"] = os.path.basename(novo_caminho)
-
-                if validar_termo(dados):
-                    dados["STATUS TERMO"] = "OK"
-                    status = "ok"
-                else:
-                    dados["STATUS TERMO"] = "ERRO"
-                    status = "erro"
-
-                append_row_to_excel(dados)
-
-                resultados.append(
-                    {
-                        "NOME": os.path.basename(novo_caminho),
-                        "status": status,
-                        "tipo": dados.get("TIPO", "desconhecido"),
-                    }
-                )
 
-                if status == "erro":
-                    chart_data["erro"] += 1
-                else:
-                    chart_data["ok"] += 1
+vigia = VigiaPastas(
+    manifesto_pastas,
+    ingerir_detectados,
+    intervalo=float(os.environ.get("AUDITORIA_VIGIA_INTERVALO", "2")),
+    estabilidade=float(os.environ.get("AUDITORIA_VIGIA_ESTABILIDADE", "3")),
+)
 
-                tipo_documento = TIPOS_MAP.get(
-                    dados.get("TERMO", "").upper(), "desconhecido"
-                )
-                chart_data[tipo_documento] += 1
 
-        except Exception as e:
-            resultados.append({"NOME": nome, "status": "erro", "erro": str(e)})
-            chart_data["erro"] += 1
+def vigiar_pasta(pasta: str):
+    global tarefa_vigia
+    if not trava_vigia.lider:
+        # Outro processo vigia; ele lê a pasta do manifesto no próximo ciclo
+        return
+    vigia.adicionar(pasta)
+    if tarefa_vigia is None or tarefa_vigia.done():
+        tarefa_vigia = asyncio.create_task(vigia.executar())
 
-        await broadcast_progress(int((idx + 1) / total * 100))
 
+@app.post("/vigiar")
+async def adicionar_pasta_vigiada(diretorio: str = Body(..., embed=True)):
+    if not os.path.isdir(diretorio):
+        return {"erro": f"O diretório '{diretorio}' não existe."}
+    diretorio = os.path.abspath(diretorio)
+    await asyncio.to_thread(manifesto_pastas.adicionar_pasta, diretorio)
+    vigiar_pasta(diretorio)
+    return pastas_vigiadas()
+
+
+@app.get("/vigiar")
+def pastas_vigiadas():
+    if not trava_vigia.lider:
+        pastas = [os.path.abspath(p) for p in PASTAS_ENTRADA] + manifesto_pastas.pastas()
+        return {"pastas": list(dict.fromkeys(pastas)), "modo": "outro processo", "aguardando": None}
+    return {"pastas": vigia.pastas, "modo": vigia.modo, "aguardando": len(vigia.candidatos)}
+
+
+@app.get("/jobs/{job_id}")
+async def status_job(job_id: str):
+    job = await asyncio.to_thread(job_store.obter, job_id)
+    if not job:
+        return {"erro": "Job não encontrado."}
+    job["excelUrl"] = url_planilha(job_id)
+    # Conflitos mudam quando chegam registros de outros lotes (ou processos); vêm
+    # sempre do índice, lido sob a mesma trava das gravações
+    job["chartData"].update(await asyncio.to_thread(gravador.contagens, job_id))
+    return job
+
+
+@app.delete("/jobs/{job_id}")
+async def cancelar_job(job_id: str):
+    job = await asyncio.to_thread(job_store.obter, job_id)
+    if not job:
+        return {"erro": "Job não encontrado."}
+
+    if job["status"] in ("pendente", "executando"):
+        await asyncio.to_thread(job_store.atualizar_status, job_id, "cancelado")
+
+    tarefa = jobs_ativos.get(job_id)
+    if tarefa:
+        tarefa.cancel()
+        await asyncio.gather(tarefa, return_exceptions=True)
+
+    return {"jobId": job_id, "status": await asyncio.to_thread(job_store.status, job_id)}
+
+
+def url_planilha(lote: str) -> str:
+    """Download da planilha só do lote: o histórico inteiro fica para /exportar."""
+    return f"/download/{os.path.basename(SAIDA_XLSX)}?lote={lote}"
+
+
+def exportar_excel(path: str, lote: str = None):
+    # Linhas consumidas do store à medida que são escritas, sem montar uma lista
+    inicio = time.perf_counter()
+    escrever_excel_continuo(path, COLUNAS, result_store.consultar(lote))
+    metricas.exportacoes.observar(time.perf_counter() - inicio, "download")
+
+
+# --- Métricas (formato texto do Prometheus) ---
+@app.get("/metrics")
+def exportar_metricas():
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+
+# --- Estatísticas históricas (agregados do store) ---
+@app.get("/stats")
+def estatisticas(
+    inicio: str = None,
+    fim: str = None,
+    dimensoes: List[str] = Query(None),
+    limite: int = 20,
+):
+    """
+    Contagens de registros por dia, lote, TERMO, marca, modelo e motivo de reprovação,
+    lidas dos agregados mantidos a cada gravação: o custo não cresce com o histórico.
+    """
+    dimensoes = [d.strip() for valor in dimensoes or [] for d in valor.split(",") if d.strip()]
+    invalidas = [d for d in dimensoes if d not in DIMENSOES]
+    if invalidas:
+        return {"erro": f"Dimensões inválidas: {', '.join(invalidas)}. Use: {', '.join(DIMENSOES)}."}
+    for data in (inicio, fim):
+        try:
+            if data:
+                date.fromisoformat(data)
+        except ValueError:
+            return {"erro": f"Data '{data}' inválida. Use AAAA-MM-DD."}
+
+    stats = result_store.estatisticas(inicio, fim, dimensoes, max(1, limite))
+    # Mesmo formato do chartData do upload, somando o período inteiro
+    chart_data = novo_chart_data()
+    chart_data["ok"] = stats["total"]["ok"]
+    chart_data["erro"] = stats["total"]["erro"]
+    termos = result_store.estatisticas(inicio, fim, ["termo"], len(TIPOS_MAP) + 10)["por"]["termo"]
+    for termo in termos:
+        chart_data[TIPOS_MAP.get(termo["valor"].upper(), "desconhecido")] += termo["total"]
+    return {"inicio": inicio, "fim": fim, "chartData": chart_data, **stats}
+
+
+# --- Regras de validação ---
+trava_revalidacao = asyncio.Lock()
+
+
+async def revalidar_historico() -> dict:
+    """Revalida o histórico com as regras atuais numa thread, uma revalidação por vez."""
+    async with trava_revalidacao:
+        resultado = await asyncio.to_thread(
+            revalidar, result_store, obter_regras(), obter_inventario()
+        )
+    print(
+        f"Histórico revalidado com as regras {resultado['versao']}: "
+        f"{resultado['alterados']} de {resultado['registros']} registros mudaram"
+    )
+    return resultado
+
+
+@app.get("/regras")
+def regras_em_uso():
+    """Regras em uso e a versão aplicada ao histórico gravado."""
+    regras = obter_regras()
+    historico = result_store.ler_meta(CHAVE_VERSAO)
     return {
-        "resultados": resultados,
-        "excelUrl": f"/download/{os.path.basename(SAIDA_XLSX)}",
-        "chartData": chart_data,
+        "regras": regras.resumo(),
+        "historico": historico,
+        "historicoAtualizado": historico == regras.identificador,
     }
 
 
+@app.post("/revalidar")
+async def revalidar_registros():
+    """
+    Reaplica as regras atuais a todos os registros gravados, a partir dos campos já
+    extraídos (sem abrir PDFs), e devolve quantos mudaram de STATUS TERMO ou MOTIVO.
+    """
+    if trava_revalidacao.locked():
+        return {"erro": "Já existe uma revalidação em andamento."}
+    return await revalidar_historico()
+
+
+# --- Exportação filtrada ---
+@app.get("/exportar")
+def exportar(
+    formato: str = "xlsx",
+    lote: str = None,
+    inicio: str = None,
+    fim: str = None,
+    status: List[str] = Query(None),
+    termo: List[str] = Query(None),
+    marca: List[str] = Query(None),
+    colunas: List[str] = Query(None),
+):
+    # Filtros e colunas aceitam o parâmetro repetido ou valores separados por vírgula
+    def lista(valores):
+        return [v.strip() for valor in valores or [] for v in valor.split(",") if v.strip()]
+
+    if formato not in FORMATOS:
+        return {"erro": f"Formato '{formato}' inválido. Use: {', '.join(FORMATOS)}."}
+    colunas = lista(colunas) or COLUNAS
+    invalidas = [c for c in colunas if c not in COLUNAS]
+    if invalidas:
+        return {"erro": f"Colunas inválidas: {', '.join(invalidas)}."}
+    for data in (inicio, fim):
+        try:
+            if data:
+                datetime.fromisoformat(data)
+        except ValueError:
+            return {"erro": f"Data '{data}' inválida. Use AAAA-MM-DD."}
+
+    linhas = result_store.consultar(
+        lote=lote, inicio=inicio, fim=fim,
+        status=lista(status), termo=lista(termo), marca=lista(marca), colunas=colunas,
+    )
+    if formato == "csv":
+        conteudo = gerar_csv(colunas, linhas)
+    else:
+        conteudo = gerar_xlsx(colunas, linhas, PASTA_SPOOL)
+
+    def medir_envio():
+        inicio = time.perf_counter()
+        try:
+            yield from conteudo
+        finally:
+            metricas.exportacoes.observar(time.perf_counter() - inicio, formato)
+
+    nome = f"resultado_{lote}.{formato}" if lote else f"resultado.{formato}"
+    return StreamingResponse(
+        medir_envio(),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
+
+
 # --- Download Excel ---
 @app.get("/download/{filename}")
-def download_file(filename: str):
+async def download_file(filename: str, lote: str = None):
+    # A planilha de resultado é gerada do store a cada download (todos os lotes ou um)
+    if filename == os.path.basename(SAIDA_XLSX):
+        path = os.path.join(PASTA_SPOOL, f"export_{uuid.uuid4().hex}.xlsx")
+        await asyncio.to_thread(exportar_excel, path, lote)
+        return FileResponse(
+            path,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            filename=filename,
+            background=BackgroundTask(os.remove, path),
+        )
+
     path = os.path.join(BASE_DIR, filename)
     if os.path.exists(path):
         return FileResponse(
@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import time
+
+
+class ResultCache:
+    """
+    Cache persistente dos registros extraídos de cada PDF, indexado pelo SHA-256
+    do conteúdo e pela versão dos extratores. Guarda também o nome de destino
+    calculado na renomeação. Quando o tamanho total passa de `limite_bytes`, as
+    entradas usadas há mais tempo são descartadas (LRU). O total fica numa linha da
+    tabela `cache_total`, mantida por gatilhos na mesma transação de cada escrita,
+    de qualquer processo: conferir o limite não relê a tabela.
+    """
+
+    def __init__(self, path: str, versao: str, limite_bytes: int):
+        self.versao = versao
+        self.limite_bytes = limite_bytes
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                sha256 TEXT NOT NULL,
+                versao TEXT NOT NULL,
+                nome_destino TEXT NOT NULL,
+                registros TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                acessado_em REAL NOT NULL,
+                PRIMARY KEY (sha256, versao)
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_acessado_em ON cache (acessado_em);
+            CREATE TABLE IF NOT EXISTS cache_total (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                total INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS cache_total_insert AFTER INSERT ON cache BEGIN
+                UPDATE cache_total SET total = total + NEW.tamanho WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cache_total_update AFTER UPDATE OF tamanho ON cache BEGIN
+                UPDATE cache_total SET total = total + NEW.tamanho - OLD.tamanho WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cache_total_delete AFTER DELETE ON cache BEGIN
+                UPDATE cache_total SET total = total - OLD.tamanho WHERE id = 0;
+            END;
+            """
+        )
+        # Banco anterior ao total: soma a tabela uma única vez. Numa transação
+        # exclusiva, para processos que sobem juntos não somarem em dobro
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO cache_total (id, total) "
+            "SELECT 0, COALESCE(SUM(tamanho), 0) FROM cache"
+        )
+        self.conn.commit()
+
+    def obter(self, sha256: str):
+        linha = self.conn.execute(
+            "SELECT nome_destino, registros FROM cache WHERE sha256 = ? AND versao = ?",
+            (sha256, self.versao),
+        ).fetchone()
+        if not linha:
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE cache SET acessado_em = ? WHERE sha256 = ? AND versao = ?",
+                (time.time(), sha256, self.versao),
+            )
+        nome_destino, registros = linha
+        return {"nome_destino": nome_destino, "registros": json.loads(registros)}
+
+    def gravar(self, sha256: str, nome_destino: str, registros: list):
+        registros_json = json.dumps(registros)
+        tamanho = len(registros_json) + len(nome_destino)
+        with self.conn:
+            # UPSERT, não REPLACE: o REPLACE apaga sem disparar o gatilho de DELETE
+            self.conn.execute(
+                "INSERT INTO cache VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (sha256, versao) DO UPDATE SET nome_destino = excluded.nome_destino, "
+                "registros = excluded.registros, tamanho = excluded.tamanho, "
+                "acessado_em = excluded.acessado_em",
+                (sha256, self.versao, nome_destino, registros_json, tamanho, time.time()),
+            )
+            self._despejar()
+
+    def _despejar(self):
+        (total,) = self.conn.execute("SELECT total FROM cache_total WHERE id = 0").fetchone()
+        if total <= self.limite_bytes:
+            return
+        cur = self.conn.execute(
+            "SELECT sha256, versao, tamanho FROM cache ORDER BY acessado_em"
+        )
+        remover = []
+        for sha256, versao, tamanho in cur:
+            if total <= self.limite_bytes:
+                break
+            remover.append((sha256, versao))
+            total -= tamanho
+        self.conn.executemany(
+            "DELETE FROM cache WHERE sha256 = ? AND versao = ?", remover
+        )
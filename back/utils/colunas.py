@@ -0,0 +1,43 @@
+# --- Colunas da planilha de auditoria, na ordem em que são gravadas ---
+COLUNAS = [
+    "NOME",
+    "TERMO",
+    "STATUS TERMO",
+    "MOTIVO",
+    "CONFLITO",
+    "PAR",
+    "ASSINADO",
+    "MATRÍCULA",
+    "TIPO",
+    "MODELO",
+    "MARCA",
+    "SERIAL",
+    "MONITOR",
+    "MODELO MONITOR",
+    "SERIAL MONITOR",
+    "PATRIMÔNIO",
+    "NF",
+    "CHAMADO",
+    "HOSTNAME",
+    "RAM",
+    "MEMÓRIA",
+    "MOUSE",
+    "TECLADO",
+    "HEADSET",
+    "KIT BOAS-VINDAS",
+    "WEBCAM",
+    "HUB USB",
+    "SUPORTE ERGONÔMICO",
+    "CABO DE SEGURANÇA",
+    "MOCHILA",
+    "DOCK STATION",
+    "LACRE DE SEGURANÇA",
+    "CABO RCA",
+    "BATERIA EXTRA",
+    "CARREGADOR EXTRA",
+    "CABO DE FORÇA DO MONITOR",
+    "FONTE",
+    "ADAPTADOR HDMI",
+    # Páginas depois de AUDITORIA_MAX_PAGINAS que ficaram sem leitura (0 = PDF inteiro)
+    "PÁGINAS NÃO LIDAS",
+]
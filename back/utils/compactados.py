@@ -0,0 +1,93 @@
+import functools
+import hashlib
+import os
+import tarfile
+import uuid
+import zipfile
+from utils.extract_text import TAMANHO_BLOCO
+
+EXTENSOES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# Maior membro aceito: um compactado malformado ou malicioso não enche o spool
+LIMITE_MEMBRO = int(os.environ.get("AUDITORIA_MAX_MEMBRO_MB", "200")) * 1024 * 1024
+# Membro de um compactado num job persistido: "<caminho do compactado>!/<membro>"
+SEPARADOR = "!/"
+# Erros de um compactado ilegível (corrompido, truncado, sumiu da pasta)
+ERROS_COMPACTADO = (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError, ValueError)
+
+
+def eh_compactado(nome: str) -> bool:
+    return nome.lower().endswith(EXTENSOES)
+
+
+def referencia(compactado: str, membro: str) -> str:
+    return f"{compactado}{SEPARADOR}{membro}"
+
+
+def separar(caminho: str):
+    """(compactado, membro) de uma referência, ou None para um caminho comum."""
+    compactado, _, membro = caminho.partition(SEPARADOR)
+    if membro and eh_compactado(compactado):
+        return compactado, membro
+    return None
+
+
+def _membros(fonte):
+    """
+    (nome, tamanho, abrir) de cada PDF do compactado, na ordem em que estão gravados.
+    `fonte` é um caminho ou um arquivo aberto com seek (o upload já no spool do
+    Starlette). O ZIP é lido pelo diretório central; o TAR, em modo de fluxo, numa
+    única passada: cada `abrir()` só vale até o próximo membro.
+    """
+    if zipfile.is_zipfile(fonte):
+        with zipfile.ZipFile(fonte) as z:
+            for info in z.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    yield info.filename, info.file_size, functools.partial(z.open, info)
+        return
+
+    if hasattr(fonte, "seek"):
+        fonte.seek(0)
+        tar = tarfile.open(fileobj=fonte, mode="r|*")
+    else:
+        tar = tarfile.open(fonte, mode="r|*")
+    with tar:
+        for info in tar:
+            # Links e dispositivos ficam de fora: só arquivos regulares
+            if info.isfile() and info.name.lower().endswith(".pdf"):
+                yield info.name, info.size, functools.partial(tar.extractfile, info)
+
+
+def listar_pdfs(fonte) -> list:
+    """Membros PDF aceitos, sem gravar nada (o TAR compactado é descomprimido, não extraído)."""
+    return [nome for nome, tamanho, _ in _membros(fonte) if tamanho <= LIMITE_MEMBRO]
+
+
+def extrair_pdfs(fonte, pasta: str, nomes: set = None):
+    """
+    Gera (membro, caminho, sha256) para cada PDF do compactado, gravando um membro
+    de cada vez na pasta de spool em blocos e calculando o SHA-256 no caminho. O
+    compactado nunca é extraído inteiro: quem consome pode mandar cada membro ao
+    pipeline enquanto o seguinte é lido. `nomes` limita aos membros pedidos (o que
+    falta de um job retomado); membros acima de LIMITE_MEMBRO são ignorados.
+    """
+    for nome, tamanho, abrir in _membros(fonte):
+        if (nomes is not None and nome not in nomes) or tamanho > LIMITE_MEMBRO:
+            continue
+        # O nome do membro só entra no fim do arquivo temporário: caminhos dentro do
+        # compactado ("../x.pdf") nunca escolhem onde gravar
+        caminho = os.path.join(pasta, f"temp_{uuid.uuid4().hex}_{os.path.basename(nome)}")
+        h = hashlib.sha256()
+        gravados = 0
+        try:
+            with abrir() as origem, open(caminho, "wb") as f:
+                while bloco := origem.read(TAMANHO_BLOCO):
+                    gravados += len(bloco)
+                    if gravados > LIMITE_MEMBRO:
+                        raise ValueError(f"{nome} passa de {LIMITE_MEMBRO} bytes")
+                    h.update(bloco)
+                    f.write(bloco)
+        except BaseException:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            raise
+        yield nome, caminho, h.hexdigest()
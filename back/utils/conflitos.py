@@ -0,0 +1,199 @@
+import re
+
+# Campos que identificam o ativo; um mesmo valor em duas concessões ativas é conflito
+CHAVES = ("SERIAL", "PATRIMÔNIO", "HOSTNAME", "SERIAL MONITOR")
+
+CONFLITO_DEVOLUCAO_SEM_CONCESSAO = "Devolução sem concessão"
+
+# Valores de preenchimento que não identificam nada ("----------", "0000", "XXXX")
+PAT_VAZIO = re.compile(r"[-0X\s]*")
+
+
+def _chave(valor) -> str:
+    if valor is None:
+        return ""
+    valor = str(valor).strip().upper()
+    return "" if PAT_VAZIO.fullmatch(valor) else valor
+
+
+class IndiceConflitos:
+    """
+    Índice em memória dos termos auditados, atualizado registro a registro (O(1) por
+    registro). Cada registro é identificado por (lote, arquivo, posicao), a mesma
+    chave única do ResultStore. Detecta:
+      - o mesmo SERIAL, PATRIMÔNIO, HOSTNAME ou SERIAL MONITOR em duas concessões ativas;
+      - devoluções sem concessão correspondente (pelo SERIAL);
+      - pares concessão/devolução, que deixam a concessão inativa.
+    A ordem de chegada não importa: uma concessão que chega depois da sua devolução
+    forma o par na hora. `adicionar` devolve os registros cujos achados mudaram,
+    para quem grava atualizar linhas já gravadas.
+    O mesmo documento auditado de novo (mesmo `sha256` do PDF e mesma posição nele)
+    substitui o registro anterior, que sai do índice: não é duplicado de si mesmo.
+    Registros sem `sha256` (planilha antiga importada) nunca substituem nem são
+    substituídos: o NOME não basta, porque outra pasta de destino pode repeti-lo.
+    """
+
+    def __init__(self):
+        # chave -> valor -> {id: None} das concessões ativas (dict mantém a ordem)
+        self.ativas = {chave: {} for chave in CHAVES}
+        # SERIAL -> {id: None} das devoluções ainda sem concessão
+        self.devolucoes_sem_par = {}
+        # id -> estado do registro
+        self.registros = {}
+        self.por_lote = {}
+        # (sha256, posicao) -> id do registro em vigor daquele documento
+        self.por_documento = {}
+
+    def __contains__(self, id_registro) -> bool:
+        return id_registro in self.registros
+
+    def adicionar(self, id_registro: tuple, dados: dict) -> set:
+        if id_registro in self.registros:
+            return set()
+        termo = dados.get("TERMO")
+        estado = {
+            "termo": termo,
+            "nome": dados.get("NOME") or "",
+            "chaves": {chave: _chave(dados.get(chave)) for chave in CHAVES},
+            "duplicado": set(),
+            "par": None,
+        }
+        self.registros[id_registro] = estado
+        self.por_lote.setdefault(id_registro[0], []).append(id_registro)
+
+        alterados = set()
+        if dados.get("sha256"):
+            documento = (dados["sha256"], id_registro[2])
+            anterior = self.por_documento.get(documento)
+            self.por_documento[documento] = id_registro
+            if anterior is not None:
+                alterados = self._retirar(anterior)
+
+        if termo == "CONCESSÃO":
+            return alterados | self._concessao(id_registro, estado)
+        if termo == "DEVOLUÇÃO":
+            return alterados | self._devolucao(id_registro, estado)
+        return alterados
+
+    def _retirar(self, id_registro) -> set:
+        """
+        Tira do índice um registro substituído por uma nova auditoria do mesmo
+        documento. O par que ele tinha volta a procurar par (ou fica ativo/sem par).
+        """
+        estado = self.registros[id_registro]
+        estado["retirado"] = True
+        alterados = {id_registro} | self._desativar(id_registro)
+        devolucoes = self.devolucoes_sem_par.get(estado["chaves"]["SERIAL"])
+        if devolucoes and id_registro in devolucoes:
+            del devolucoes[id_registro]
+            if not devolucoes:
+                del self.devolucoes_sem_par[estado["chaves"]["SERIAL"]]
+
+        id_par = estado["par"]
+        if id_par is not None:
+            estado["par"] = None
+            par = self.registros[id_par]
+            par["par"] = None
+            if par["termo"] == "CONCESSÃO":
+                alterados |= self._concessao(id_par, par)
+            else:
+                alterados |= self._devolucao(id_par, par)
+        return alterados
+
+    def _concessao(self, id_registro, estado) -> set:
+        alterados = {id_registro}
+        serial = estado["chaves"]["SERIAL"]
+        devolucoes = self.devolucoes_sem_par.get(serial)
+        if devolucoes:
+            # Devolução que chegou antes: forma o par e a concessão já nasce inativa
+            id_devolucao = next(iter(devolucoes))
+            self._parear(id_registro, id_devolucao)
+            return alterados | {id_devolucao}
+
+        for chave, valor in estado["chaves"].items():
+            if not valor:
+                continue
+            ids = self.ativas[chave].setdefault(valor, {})
+            ids[id_registro] = None
+            if len(ids) > 1:
+                for outro in ids:
+                    self.registros[outro]["duplicado"].add(chave)
+                alterados.update(ids)
+        return alterados
+
+    def _devolucao(self, id_registro, estado) -> set:
+        serial = estado["chaves"]["SERIAL"]
+        if not serial:
+            return {id_registro}
+
+        concessoes = self.ativas["SERIAL"].get(serial)
+        if not concessoes:
+            self.devolucoes_sem_par.setdefault(serial, {})[id_registro] = None
+            return {id_registro}
+
+        # A concessão ativa mais antiga com o mesmo serial é a devolvida
+        id_concessao = next(iter(concessoes))
+        alterados = {id_registro} | self._desativar(id_concessao)
+        self._parear(id_concessao, id_registro)
+        return alterados
+
+    def _desativar(self, id_concessao) -> set:
+        """Tira a concessão das ativas; devolve ela e quem deixou de estar duplicado."""
+        alterados = {id_concessao}
+        concessao = self.registros[id_concessao]
+        for chave, valor in concessao["chaves"].items():
+            ids = self.ativas[chave].get(valor)
+            if not ids or id_concessao not in ids:
+                continue
+            del ids[id_concessao]
+            concessao["duplicado"].discard(chave)
+            if len(ids) == 1:
+                # O que sobrou não está mais duplicado nesta chave
+                restante = next(iter(ids))
+                self.registros[restante]["duplicado"].discard(chave)
+                alterados.add(restante)
+            elif not ids:
+                del self.ativas[chave][valor]
+        return alterados
+
+    def _parear(self, id_concessao, id_devolucao):
+        self.registros[id_concessao]["par"] = id_devolucao
+        self.registros[id_devolucao]["par"] = id_concessao
+        serial = self.registros[id_devolucao]["chaves"]["SERIAL"]
+        devolucoes = self.devolucoes_sem_par.get(serial)
+        if devolucoes and id_devolucao in devolucoes:
+            del devolucoes[id_devolucao]
+            if not devolucoes:
+                del self.devolucoes_sem_par[serial]
+
+    def achados(self, id_registro: tuple) -> dict:
+        """Colunas CONFLITO e PAR do registro."""
+        estado = self.registros.get(id_registro)
+        if estado is None or estado.get("retirado"):
+            return {"CONFLITO": "", "PAR": ""}
+
+        conflito = ""
+        if estado["duplicado"]:
+            conflito = "Duplicado: " + ", ".join(c for c in CHAVES if c in estado["duplicado"])
+        elif (
+            estado["termo"] == "DEVOLUÇÃO"
+            and estado["par"] is None
+            and estado["chaves"]["SERIAL"]
+        ):
+            conflito = CONFLITO_DEVOLUCAO_SEM_CONCESSAO
+
+        par = self.registros[estado["par"]]["nome"] if estado["par"] else ""
+        return {"CONFLITO": conflito, "PAR": par}
+
+    def contagens(self, lote: str) -> dict:
+        """Contagens do lote para o chartData."""
+        contagem = {"duplicados": 0, "devolucoesSemConcessao": 0, "pares": 0}
+        for id_registro in self.por_lote.get(lote, ()):
+            achados = self.achados(id_registro)
+            if achados["CONFLITO"] == CONFLITO_DEVOLUCAO_SEM_CONCESSAO:
+                contagem["devolucoesSemConcessao"] += 1
+            elif achados["CONFLITO"]:
+                contagem["duplicados"] += 1
+            if achados["PAR"]:
+                contagem["pares"] += 1
+        return contagem
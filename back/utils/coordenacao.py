@@ -0,0 +1,75 @@
+import os
+import socket
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def identificador_processo() -> str:
+    """host:pid:sufixo; o sufixo distingue um processo novo que reaproveitou o PID."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def processo_vivo(dono: str, eu: str) -> bool:
+    """
+    Se o processo `dono` (um identificador_processo) ainda pode estar rodando. Só dá
+    False quando há certeza de que morreu: mesmo host e PID inexistente, ou o nosso
+    PID com outro sufixo (reinício do container). De outro host, só a validade diz.
+    """
+    if dono == eu:
+        return True
+    try:
+        host, pid, _ = dono.rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return True
+    if host != socket.gethostname():
+        return True
+    if pid == os.getpid():
+        return False
+    if os.name == "nt":
+        # No Windows o sinal 0 não é uma sonda
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class TravaLider:
+    """
+    Elege um único processo para tarefas que não podem rodar em dobro (a vigia de
+    pastas) com flock num arquivo: o sistema libera a trava quando o processo morre,
+    e outro processo a pega na tentativa seguinte. Sem fcntl, o processo é sempre o líder.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.arquivo = None
+
+    @property
+    def lider(self) -> bool:
+        return fcntl is None or self.arquivo is not None
+
+    def tentar(self) -> bool:
+        if self.lider:
+            return True
+        arquivo = open(self.path, "a")
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        self.arquivo = arquivo
+        return True
+
+    def liberar(self):
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
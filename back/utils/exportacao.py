@@ -0,0 +1,49 @@
+import csv
+import io
+import os
+import uuid
+
+from utils.format_excel import escrever_excel_continuo
+
+LINHAS_POR_BLOCO = 1000
+TAMANHO_BLOCO = 1024 * 1024
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def gerar_csv(colunas: list, linhas):
+    """
+    Emite o CSV em blocos de LINHAS_POR_BLOCO linhas à medida que a consulta avança.
+    Separador ";" e BOM UTF-8, para o Excel em português abrir com acentos e colunas certos.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    buffer.write("\ufeff")
+    writer.writerow(colunas)
+    for n, linha in enumerate(linhas, start=1):
+        writer.writerow(linha)
+        if n % LINHAS_POR_BLOCO == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def gerar_xlsx(colunas: list, linhas, pasta: str):
+    """
+    O XLSX é um zip e só fica válido no save, então a planilha é montada em modo
+    write-only num arquivo temporário (sem guardar as linhas em memória) e enviada
+    em blocos; o temporário é removido ao fim do envio ou se o cliente desistir.
+    """
+    path = os.path.join(pasta, f"export_{uuid.uuid4().hex}.xlsx")
+    try:
+        escrever_excel_continuo(path, colunas, linhas)
+        with open(path, "rb") as f:
+            while bloco := f.read(TAMANHO_BLOCO):
+                yield bloco
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
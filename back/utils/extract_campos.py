@@ -0,0 +1,106 @@
+import re
+
+SEM_VALOR = "----------"
+
+PAT_SIM_NAO = re.compile(r"(Sim|Não)", re.I)
+PAT_PALAVRA = re.compile(r"(\S+)")
+
+
+def texto_minusculo(text: str):
+    """
+    Cópia do texto em minúsculas com as mesmas posições do original, ou None quando
+    lower() e a comparação do re.I divergem (ex.: "ı" e "ſ" casam com "i" e "s").
+    """
+    minusculo = text.lower()
+    if len(minusculo) != len(text) or "\u0131" in text or "\u017f" in text:
+        return None
+    return minusculo
+
+
+class TabelaItens:
+    """
+    Tabela de periféricos compilada uma vez. A primeira ocorrência de cada rótulo é
+    localizada sobre uma única cópia do texto em minúsculas, e os valores (Sim/Não)
+    são lidos a partir da posição do rótulo, sem copiar o restante do texto.
+    """
+
+    def __init__(self, itens: list):
+        # itens: lista de (coluna, rótulo, leitor)
+        self.itens = itens
+        rotulos = []
+        for _, rotulo, _ in itens:
+            if rotulo.lower() not in rotulos:
+                rotulos.append(rotulo.lower())
+        # Rótulos mais longos primeiro; na mesma posição só o primeiro que casa é reportado
+        rotulos.sort(key=len, reverse=True)
+        self.rotulos = rotulos
+        # Varredura única equivalente ao re.search(..., re.I) original, usada quando
+        # o texto tem caracteres em que lower() e re.I divergem
+        self.padrao = re.compile(
+            "(?=(?:" + "|".join(f"({re.escape(r)})" for r in rotulos) + "))", re.I
+        )
+        # Rótulos que são prefixo de outro começam na mesma posição que ele
+        self.prefixos = [
+            [j for j, outro in enumerate(rotulos) if j != i and r.startswith(outro)]
+            for i, r in enumerate(rotulos)
+        ]
+
+    def localizar(self, text: str, minusculo: str) -> dict:
+        """Posição final da primeira ocorrência de cada rótulo (chave em minúsculas)."""
+        if minusculo is not None:
+            # str.find para na primeira ocorrência e roda em C; medido mais rápido
+            # que a alternância combinada do sre, cujas iniciais são letras comuns
+            fins = {}
+            for rotulo in self.rotulos:
+                inicio = minusculo.find(rotulo)
+                if inicio >= 0:
+                    fins[rotulo] = inicio + len(rotulo)
+            return fins
+
+        fins = {}
+        for m in self.padrao.finditer(text):
+            i = m.lastindex - 1
+            for j in [i] + self.prefixos[i]:
+                if self.rotulos[j] not in fins:
+                    fins[self.rotulos[j]] = m.start() + len(self.rotulos[j])
+            if len(fins) == len(self.rotulos):
+                break
+        return fins
+
+    def extrair(self, text: str, minusculo: str) -> dict:
+        fins = self.localizar(text, minusculo)
+        return {
+            coluna: leitor(text, fins.get(rotulo.lower()))
+            for coluna, rotulo, leitor in self.itens
+        }
+
+
+def ler_primeiro_termo(text: str, pos: int) -> str:
+    if pos is None:
+        return SEM_VALOR
+    termo = PAT_SIM_NAO.search(text, pos)
+    if termo:
+        return termo.group(1).strip()
+    return SEM_VALOR
+
+
+def ler_segundo_termo(text: str, pos: int) -> str:
+    if pos is None:
+        return SEM_VALOR
+    termos = PAT_SIM_NAO.finditer(text, pos)
+    next(termos, None)
+    segundo = next(termos, None)
+    if segundo:
+        return segundo.group(1).strip()
+    return "---------"
+
+
+def ler_valor_especial(text: str, pos: int) -> str:
+    if pos is None:
+        return SEM_VALOR
+    termo = PAT_PALAVRA.search(text, pos)  # pega a primeira palavra após o item
+    if termo:
+        valor = termo.group(1).strip()
+        if valor.lower() in ["sim", "não", "nao"]:
+            return "Sim" if valor.lower() == "sim" else "Não"
+    return SEM_VALOR
@@ -1,142 +1,103 @@
 import re
 from utils.extract_sign import validar_assinatura
+from utils.extract_campos import (
+    SEM_VALOR,
+    TabelaItens,
+    ler_primeiro_termo,
+    ler_valor_especial,
+    texto_minusculo,
+)
 
-def extract_primeiro_termo(item_name: str, text: str) -> str:
-    match = re.search(re.escape(item_name), text, re.I)
-    if not match:
-        return "----------"
-    substring = text[match.end():]
-    termo = re.search(r"(Sim|Não)", substring, re.I)
-    if termo:
-        return termo.group(1).strip()
-    return "----------"
+# --- Padrões compilados uma vez na importação ---
+PAT_TIPO = re.compile(r"um[^\w]+(\S[\w\s-]+)", re.I)
+PAT_MODELO = re.compile(r"modelo[^\w]+(\S[\w\s-]+)", re.I)
+PAT_MARCA = re.compile(r"marca[^\w]+(\S[\w\s-]+)", re.I)
+PAT_SERIAL = re.compile(r"nº de série\s*[:\-\s]*([A-Za-z0-9\-]+)", re.I)
+PAT_NF = re.compile(r"NF\s*nº?\s*(\d+)", re.I)
+PAT_ATIVO = re.compile(r"NÚMERO DO ATIVO\s*(\d+)", re.I)
+PAT_CHAMADO = re.compile(r"NÚMERO DO CHAMADO\s*([A-Z0-9]+)", re.I)
+PAT_HOSTNAME = re.compile(r"HOSTNAME\s*([A-Z0-9]+)", re.I)
+# "matricula F1000000" ou "matrícula: F1000000", nos dois tipos de termo
+PAT_MATRICULA = re.compile(r"matr[ií]cul[ai]\s*:?\s*([A-Z0-9]+)", re.I)
+PAT_MONITOR = re.compile(
+    r"Monitor\s*\(Marca\/Modelo:\s*([^\)]*?)\s*Nro Série\s*:\s*([A-Za-z0-9\-]+)\)", re.I
+)
+PAT_MEMORIA = re.compile(r"MEMÓRIA\s*:\s*([\d]+\s*[Gg][Bb](?:\s*DDR[234])?)", re.I | re.S)
+PAT_DISCO = re.compile(r"DISCO RÍGIDO\s*:\s*([A-Za-z0-9.\s-]*[\d]+\s*[Gg][Bb])", re.I)
+# Mesmo padrão sem re.I, aplicado ao texto em minúsculas: o prefixo literal deixa o
+# sre saltar direto para cada "disco rígido" em vez de testar todas as posições
+PAT_DISCO_MINUSCULO = re.compile(r"disco rígido\s*:\s*([a-z0-9.\s-]*[\d]+\s*gb)")
 
-def extract_valor_especial(item_name: str, text: str) -> str:
-    match = re.search(re.escape(item_name), text, re.I)
-    if not match:
-        return "----------"
-    substring = text[match.end():]
-    termo = re.search(r"(\S+)", substring)  # pega a primeira palavra após o item
-    if termo:
-        valor = termo.group(1).strip()
-        if valor.lower() in ["sim", "não", "nao"]:
-            return "Sim" if valor.lower() == "sim" else "Não"
-    return "----------"
+# --- Periféricos: (coluna, rótulo no termo, leitor do valor) ---
+ITENS = TabelaItens([
+    ("MONITOR", "Monitor", ler_primeiro_termo),
+    ("MOUSE", "Mouse", ler_primeiro_termo),
+    ("TECLADO", "Teclado", ler_primeiro_termo),
+    ("HEADSET", "Headset", ler_primeiro_termo),
+    ("KIT BOAS-VINDAS", "Kit boas-vindas", ler_primeiro_termo),
+    ("WEBCAM", "Webcam", ler_primeiro_termo),
+    ("HUB USB", "Hub USB", ler_valor_especial),
+    ("SUPORTE ERGONÔMICO", "Suporte Ergonômico", ler_primeiro_termo),
+    ("CABO DE SEGURANÇA", "Cabo de Segurança", ler_primeiro_termo),
+    ("MOCHILA", "Maleta/Mochila para Notebook", ler_primeiro_termo),
+    ("DOCK STATION", "Dock Station", ler_primeiro_termo),
+    ("LACRE DE SEGURANÇA", "Lacre de Segurança", ler_primeiro_termo),
+    ("CABO RCA", "Cabo RCA / Cabo paralelo para unidade externa", ler_primeiro_termo),
+    ("BATERIA EXTRA", "Bateria Extra", ler_primeiro_termo),
+    ("CARREGADOR EXTRA", "Carregador Extra", ler_primeiro_termo),
+    ("CABO DE FORÇA DO MONITOR", "Cabo de força do monitor", ler_valor_especial),
+    ("FONTE", "Fonte", ler_valor_especial),
+    ("ADAPTADOR HDMI", "Adaptador HDMI", ler_primeiro_termo),
+])
+
+
+def _grupo(match, indice: int = 1) -> str:
+    return match.group(indice).strip() if match else ""
+
+def _discos(text: str, minusculo: str) -> list:
+    if minusculo is None:
+        return PAT_DISCO.findall(text)
+    return [text[m.start(1):m.end(1)] for m in PAT_DISCO_MINUSCULO.finditer(minusculo)]
 
 def extract_concessao_data(text: str) -> dict:
     assinatura_valida = validar_assinatura(text)
-        
-    notebook_tipo = notebook_model = notebook_brand = serial_number = ""
-    model_monitor = serial_monitor = ""
-    asset_number = nf_number = numero_chamado = hostname = memoria = disco_rigido = ""
+    minusculo = texto_minusculo(text)
 
-    # --- Informações principais ---
-    notebook_tipo_match = re.search(r"um[^\w]+(\S[\w\s-]+)", text, re.I)
-    notebook_model_match = re.search(r"modelo[^\w]+(\S[\w\s-]+)", text, re.I)
-    notebook_brand_match = re.search(r"marca[^\w]+(\S[\w\s-]+)", text, re.I)
-    serial_number_match = re.search(r"nº de série\s*[:\-\s]*([A-Za-z0-9\-]+)", text, re.I)
-    nf_number_match = re.search(r"NF\s*nº?\s*(\d+)", text, re.I)
-    asset_number_match = re.search(r"NÚMERO DO ATIVO\s*(\d+)", text, re.I)
-    numero_chamado_match = re.search(r"NÚMERO DO CHAMADO\s*([A-Z0-9]+)", text, re.I)
-    hostname_match = re.search(r"HOSTNAME\s*([A-Z0-9]+)", text, re.I)
-    monitor_match = re.search(
-    r"Monitor\s*\(Marca\/Modelo:\s*([^\)]*?)\s*Nro Série\s*:\s*([A-Za-z0-9\-]+)\)", 
-    text, re.I
-    )
-    if monitor_match:
-        model_monitor = monitor_match.group(1).strip()
-        serial_monitor = monitor_match.group(2).strip()
+    # --- Monitor ---
+    monitor_match = PAT_MONITOR.search(text)
+    model_monitor = _grupo(monitor_match, 1)
+    serial_monitor = _grupo(monitor_match, 2)
     if not model_monitor or model_monitor.strip() == "-":
-     model_monitor = "----------"        
+        model_monitor = SEM_VALOR
     if not serial_monitor or serial_monitor.strip() == "-":
-     serial_monitor = "----------"    
+        serial_monitor = SEM_VALOR
 
     # --- Memória RAM ---
-    memoria_match = re.search(r"MEMÓRIA\s*:\s*([\d]+\s*[Gg][Bb](?:\s*DDR[234])?)", text, re.I | re.S)
-    if memoria_match:
-        memoria = memoria_match.group(1).strip()
+    memoria = _grupo(PAT_MEMORIA.search(text))
 
     # --- Disco Rígido (todos os discos) ---
-    discos_match = re.findall(
-        r"DISCO RÍGIDO\s*:\s*([A-Za-z0-9.\s-]*[\d]+\s*[Gg][Bb])",
-        text,
-        re.I
-    )
-    disco_rigido = ", ".join(discos_match) if discos_match else "----------"
-
-    # --- Atribuindo valores principais ---
-    if notebook_tipo_match:
-        notebook_tipo = notebook_tipo_match.group(1).strip()
-    if notebook_model_match:
-        notebook_model = notebook_model_match.group(1).strip()
-    if notebook_brand_match:
-        notebook_brand = notebook_brand_match.group(1).strip()
-    if serial_number_match:
-        serial_number = serial_number_match.group(1).strip()
-    if nf_number_match:
-        nf_number = nf_number_match.group(1).strip()
-    if asset_number_match:
-        asset_number = asset_number_match.group(1).strip()
-    if numero_chamado_match:
-        numero_chamado = numero_chamado_match.group(1).strip()
-    if hostname_match:
-        hostname = hostname_match.group(1).strip()
-    if not model_monitor or model_monitor.strip() == "-":
-     model_monitor = "----------"    
-    if not serial_monitor or serial_monitor.strip() == "-":
-     serial_monitor = "----------"    
+    discos_match = _discos(text, minusculo)
+    disco_rigido = ", ".join(discos_match) if discos_match else SEM_VALOR
 
     # --- Periféricos ---
-    monitor = extract_primeiro_termo("Monitor", text)
-    mouse = extract_primeiro_termo("Mouse", text)
-    teclado = extract_primeiro_termo("Teclado", text)
-    headset = extract_primeiro_termo("Headset", text)
-    kit = extract_primeiro_termo("Kit boas-vindas", text)
-    webcam = extract_primeiro_termo("Webcam", text)
-    hub = extract_valor_especial("Hub USB", text)
-    suporte = extract_primeiro_termo("Suporte Ergonômico", text)
-    caboSeguranca = extract_primeiro_termo("Cabo de Segurança", text)
-    mochila = extract_primeiro_termo("Maleta/Mochila para Notebook", text)
-    dockstation = extract_primeiro_termo("Dock Station", text)
-    lacre = extract_primeiro_termo("Lacre de Segurança", text)
-    caboRCA = extract_primeiro_termo("Cabo RCA / Cabo paralelo para unidade externa", text)
-    bateria = extract_primeiro_termo("Bateria Extra", text)
-    carregadorExtra = extract_primeiro_termo("Carregador Extra", text)
-    caboMonitor = extract_valor_especial("Cabo de força do monitor", text)
-    fonte = extract_valor_especial("Fonte", text)
-    adaptadorHdmi = extract_primeiro_termo("Adaptador HDMI", text)
+    itens = ITENS.extrair(text, minusculo)
 
     return {
         "TERMO": "CONCESSÃO",
         "ASSINADO": assinatura_valida,
-        "TIPO": notebook_tipo,
-        "MODELO": notebook_model,
-        "MARCA": notebook_brand,
-        "SERIAL": serial_number,
-        "MONITOR": monitor,
+        "MATRÍCULA": _grupo(PAT_MATRICULA.search(text)).upper(),
+        "TIPO": _grupo(PAT_TIPO.search(text)),
+        "MODELO": _grupo(PAT_MODELO.search(text)),
+        "MARCA": _grupo(PAT_MARCA.search(text)),
+        "SERIAL": _grupo(PAT_SERIAL.search(text)),
+        "MONITOR": itens["MONITOR"],
         "MODELO MONITOR": model_monitor,
         "SERIAL MONITOR": serial_monitor,
-        "PATRIMÔNIO": asset_number,
-        "NF": nf_number,
-        "CHAMADO": numero_chamado,
-        "HOSTNAME": hostname,
+        "PATRIMÔNIO": _grupo(PAT_ATIVO.search(text)),
+        "NF": _grupo(PAT_NF.search(text)),
+        "CHAMADO": _grupo(PAT_CHAMADO.search(text)),
+        "HOSTNAME": _grupo(PAT_HOSTNAME.search(text)),
         "RAM": memoria,
         "MEMÓRIA": disco_rigido,
-        "MOUSE": mouse, 
-        "TECLADO": teclado,
-        "HEADSET": headset,
-        "KIT BOAS-VINDAS": kit,
-        "WEBCAM": webcam,    
-        "HUB USB": hub,
-        "SUPORTE ERGONÔMICO": suporte,
-        "CABO DE SEGURANÇA": caboSeguranca,
-        "MOCHILA": mochila,
-        "DOCK STATION": dockstation,
-        "LACRE DE SEGURANÇA": lacre,
-        "CABO RCA": caboRCA,
-        "BATERIA EXTRA": bateria,
-        "CARREGADOR EXTRA": carregadorExtra, 
-        "CABO DE FORÇA DO MONITOR": caboMonitor,
-        "FONTE": fonte,
-        "ADAPTADOR HDMI": adaptadorHdmi
+        **{coluna: valor for coluna, valor in itens.items() if coluna != "MONITOR"},
     }
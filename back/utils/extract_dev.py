@@ -1,107 +1,80 @@
 import re
 from utils.extract_sign import validar_assinatura
+from utils.extract_campos import SEM_VALOR, TabelaItens, ler_segundo_termo, texto_minusculo
+from utils.extract_con import PAT_MATRICULA
 
-def extract_segundo_termo(item_name: str, text: str) -> str:
+# --- Padrões compilados uma vez na importação ---
+PAT_TIPO = re.compile(r"tipo[^\w]+([A-Za-z0-9\s\-]+)", re.I)
+PAT_MODELO = re.compile(r"modelo[^\w]+([A-Za-z0-9\s\-]+)", re.I)
+PAT_MARCA = re.compile(r"marca[^\w]+([A-Za-z0-9\s\-]+)", re.I)
+PAT_SERIAL = re.compile(r"nº de série\s*[:\-\s]*([A-Za-z0-9]+)", re.I)
+PAT_MONITOR = re.compile(
+    r"Monitor\s*\(Marca\/Modelo:\s*([^\)]*?)\s*Nro Série\s*:\s*([A-Za-z0-9\-]+)\)", re.I
+)
 
-    match = re.search(re.escape(item_name), text, re.I)
-    if not match:
-        return "----------" 
+# --- Acessórios: (coluna, rótulo no termo, leitor do valor) ---
+ITENS = TabelaItens([
+    ("MONITOR", "Monitor", ler_segundo_termo),
+    ("MOUSE", "Mouse", ler_segundo_termo),
+    ("TECLADO", "Teclado", ler_segundo_termo),
+    ("HEADSET", "Headset", ler_segundo_termo),
+    ("KIT BOAS-VINDAS", "Kit boas-vindas", ler_segundo_termo),
+    ("WEBCAM", "Webcam", ler_segundo_termo),
+    ("HUB USB", "Hub USB", ler_segundo_termo),
+    ("SUPORTE ERGONÔMICO", "Suporte Ergonômico", ler_segundo_termo),
+    ("CABO DE SEGURANÇA", "Cabo de Segurança", ler_segundo_termo),
+    ("MOCHILA", "Maleta/Mochila para Notebook", ler_segundo_termo),
+    ("DOCK STATION", "Dock Station", ler_segundo_termo),
+    ("LACRE DE SEGURANÇA", "Lacre de Segurança", ler_segundo_termo),
+    ("CABO RCA", "Cabo RCA / Cabo paralelo para unidade externa", ler_segundo_termo),
+    ("BATERIA EXTRA", "Bateria Extra", ler_segundo_termo),
+    ("CARREGADOR EXTRA", "Carregador Extra", ler_segundo_termo),
+    ("CABO DE FORÇA DO MONITOR", "Cabo de Força do Monitor", ler_segundo_termo),
+    ("FONTE", "Fonte", ler_segundo_termo),
+    ("ADAPTADOR HDMI", "Adaptador HDMI", ler_segundo_termo),
+])
 
-    substring = text[match.end():]
 
-    termos = re.findall(r"(Sim|Não)", substring, re.I)
-    if len(termos) >= 2:
-        return termos[1].strip()  
-
-    return "---------"
+def _grupo(match, indice: int = 1) -> str:
+    return match.group(indice).strip() if match else ""
 
 def extract_devolucao_data(text: str) -> dict:
     assinatura_valida = validar_assinatura(text)
-    
-    # Inicialização de variáveis principais
-    notebook_tipo = notebook_model = notebook_brand = serial_number = ""
-    model_monitor = serial_monitor = ""
 
     # --- Dados do notebook ---
-    notebook_tipo_match = re.search(r"tipo[^\w]+([A-Za-z0-9\s\-]+)", text, re.I)
-    notebook_model_match = re.search(r"modelo[^\w]+([A-Za-z0-9\s\-]+)", text, re.I)
-    notebook_brand_match = re.search(r"marca[^\w]+([A-Za-z0-9\s\-]+)", text, re.I)
-    serial_number_match = re.search(r"nº de série\s*[:\-\s]*([A-Za-z0-9]+)", text, re.I)
-
-    if notebook_tipo_match:
-        notebook_tipo = notebook_tipo_match.group(1).strip()
-    if notebook_model_match:
-        notebook_model = notebook_model_match.group(1).strip()
-    if notebook_brand_match:
-        notebook_brand = notebook_brand_match.group(1).strip()
-    if serial_number_match:
-        serial_number = serial_number_match.group(1).replace(" ", "").strip()
+    serial_number_match = PAT_SERIAL.search(text)
+    serial_number = (
+        serial_number_match.group(1).replace(" ", "").strip() if serial_number_match else ""
+    )
 
     # --- Dados do monitor ---
-    monitor_match = re.search(
-    r"Monitor\s*\(Marca\/Modelo:\s*([^\)]*?)\s*Nro Série\s*:\s*([A-Za-z0-9\-]+)\)", 
-    text, re.I
-    )
-    if monitor_match:
-        model_monitor = monitor_match.group(1).strip()
-        serial_monitor = monitor_match.group(2).strip()
+    monitor_match = PAT_MONITOR.search(text)
+    model_monitor = _grupo(monitor_match, 1)
+    serial_monitor = _grupo(monitor_match, 2)
     if not model_monitor or model_monitor.strip() == "-":
-     model_monitor = "----------"        
+        model_monitor = SEM_VALOR
     if not serial_monitor or serial_monitor.strip() == "-":
-     serial_monitor = "----------"    
-           
+        serial_monitor = SEM_VALOR
 
     # --- Acessórios ---
-    monitor = extract_segundo_termo("Monitor", text)
-    mouse = extract_segundo_termo("Mouse", text)
-    teclado = extract_segundo_termo("Teclado", text)
-    headset = extract_segundo_termo("Headset", text)
-    kit = extract_segundo_termo("Kit boas-vindas", text)
-    webcam = extract_segundo_termo("Webcam", text)
-    hub = extract_segundo_termo("Hub USB", text)
-    suporte = extract_segundo_termo("Suporte Ergonômico", text)
-    caboSeguranca = extract_segundo_termo("Cabo de Segurança", text)
-    mochila = extract_segundo_termo("Maleta/Mochila para Notebook", text)
-    dockstation = extract_segundo_termo("Dock Station", text)
-    lacre = extract_segundo_termo("Lacre de Segurança", text)
-    caboRCA = extract_segundo_termo("Cabo RCA / Cabo paralelo para unidade externa", text)
-    bateria = extract_segundo_termo("Bateria Extra", text)
-    carregadorExtra = extract_segundo_termo("Carregador Extra", text)
-    caboMonitor = extract_segundo_termo("Cabo de Força do Monitor", text)
-    fonte = extract_segundo_termo("Fonte", text)
-    adaptadorHdmi = extract_segundo_termo("Adaptador HDMI", text)
+    itens = ITENS.extrair(text, texto_minusculo(text))
 
     return {
         "TERMO": "DEVOLUÇÃO",
         "ASSINADO": assinatura_valida,
-        "TIPO": notebook_tipo,
-        "MODELO": notebook_model,
-        "MARCA": notebook_brand,
+        "MATRÍCULA": _grupo(PAT_MATRICULA.search(text)).upper(),
+        "TIPO": _grupo(PAT_TIPO.search(text)),
+        "MODELO": _grupo(PAT_MODELO.search(text)),
+        "MARCA": _grupo(PAT_MARCA.search(text)),
         "SERIAL": serial_number,
-        "MONITOR": monitor,
+        "MONITOR": itens["MONITOR"],
         "MODELO MONITOR": model_monitor,
         "SERIAL MONITOR": serial_monitor,
-        "PATRIMÔNIO": "----------",
-        "NF": "----------",
-        "CHAMADO": "----------",
-        "HOSTNAME": "----------",
-        "RAM": "----------",
-        "MEMÓRIA": "----------",
-        "MOUSE": mouse, 
-        "TECLADO": teclado,
-        "HEADSET": headset,
-        "KIT BOAS-VINDAS": kit,
-        "WEBCAM": webcam,    
-        "HUB USB": hub,
-        "SUPORTE ERGONÔMICO": suporte,
-        "CABO DE SEGURANÇA": caboSeguranca,
-        "MOCHILA": mochila,
-        "DOCK STATION": dockstation,
-        "LACRE DE SEGURANÇA": lacre,
-        "CABO RCA": caboRCA,
-        "BATERIA EXTRA": bateria,
-        "CARREGADOR EXTRA": carregadorExtra, 
-        "CABO DE FORÇA DO MONITOR": caboMonitor,
-        "FONTE": fonte,
-        "ADAPTADOR HDMI": adaptadorHdmi
+        "PATRIMÔNIO": SEM_VALOR,
+        "NF": SEM_VALOR,
+        "CHAMADO": SEM_VALOR,
+        "HOSTNAME": SEM_VALOR,
+        "RAM": SEM_VALOR,
+        "MEMÓRIA": SEM_VALOR,
+        **{coluna: valor for coluna, valor in itens.items() if coluna != "MONITOR"},
     }
@@ -7,6 +7,7 @@ def extract_rat_data(text: str) -> dict:
     return {
         "TERMO": "RAT",
         "ASSINADO": assinatura_valida,
+        "MATRÍCULA": "----------",
         "STATUS TERMO": "OK" if assinatura_valida  else "ERRO",
         "TIPO": "----------",
         "MODELO": "----------",
@@ -1,13 +1,125 @@
-import fitz
+import hashlib
 import re
+from dataclasses import dataclass
+
+
+@dataclass
+class DocumentoPDF:
+    """
+    Texto de um PDF extraído uma única vez e compartilhado entre as etapas
+    de renomeação e de extração/classificação.
+    """
+
+    caminho: str
+    texto: str
+    texto_lower: str
+    paginas: int
+    sha256: str
+    paginas_lidas: int = None
+    # Índices das páginas lidas sem camada de texto (imagem digitalizada)
+    paginas_sem_texto: list = None
+    # Quantas delas tiveram o texto reconhecido por OCR
+    paginas_ocr: int = 0
+
 
 def extract_text_from_pdf(path: str) -> str:
+    return carregar_documento(path).texto
+
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def sha256_arquivo(path: str) -> str:
+    """SHA-256 do arquivo lido em blocos, sem carregá-lo inteiro na memória."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while bloco := f.read(TAMANHO_BLOCO):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+PAT_ESPACOS = re.compile(r"\s+")
+
+
+def _juntar_paginas(partes: list) -> str:
+    """
+    Junta páginas já normalizadas com o mesmo resultado de normalizar o texto inteiro:
+    um espaço no fim de uma página e outro no início da seguinte viram um só.
+    """
+    pedacos = []
+    termina_em_espaco = True  # também descarta o espaço inicial, como o strip()
+    for parte in partes:
+        if termina_em_espaco and parte.startswith(" "):
+            parte = parte[1:]
+        if parte:
+            pedacos.append(parte)
+            termina_em_espaco = parte.endswith(" ")
+    return "".join(pedacos).rstrip(" ")
+
+
+def texto_ocr(page, idioma: str, dpi: int) -> str:
+    """Texto da página reconhecido pelo Tesseract local, via suporte a OCR do PyMuPDF."""
+    textpage = page.get_textpage_ocr(language=idioma, dpi=dpi, full=True)
+    return page.get_text(textpage=textpage)
+
+
+def carregar_documento(path: str, sha256: str = None, max_paginas: int = None,
+                       tem_termo=None, ocr: tuple = None) -> DocumentoPDF:
+    """
+    Extrai o texto página a página, normalizando os espaços de cada uma.
+    Com `max_paginas`, para de ler depois de `max_paginas` páginas assim que algum
+    termo já tiver aparecido (`tem_termo(texto_da_pagina_em_minusculas)`); sem
+    `tem_termo`, o limite é fixo. Páginas depois do limite (anexos, digitalizações)
+    nem têm o texto extraído. O limite perde dados: termos ou campos que só
+    aparecem depois dele (inclusive o resto de um termo que cruza o limite) ficam
+    de fora; `paginas_lidas < paginas` indica o corte, que o pipeline grava em cada
+    registro. Sem `max_paginas`, todas as páginas são lidas.
+    Com `ocr=(idioma, dpi)`, só as páginas sem camada de texto passam pelo OCR; uma
+    falha do OCR numa página (ex.: Tesseract ausente) deixa a página vazia.
+    """
+    texto = ""
+    paginas = 0
+    lidas = 0
+    sem_texto = []
+    reconhecidas = 0
     try:
-        doc = fitz.open(path)
-        texto = ""
+        if sha256 is None:
+            sha256 = sha256_arquivo(path)
+        import fitz  # PyMuPDF: só os processos que extraem texto precisam dele
+
+        # Abre direto do caminho: o MuPDF lê o arquivo sob demanda, sem uma cópia em bytes
+        doc = fitz.open(path, filetype="pdf")
+        paginas = doc.page_count
+        partes = []
+        achou_termo = tem_termo is None
         for page in doc:
-            texto += page.get_text()
-        return re.sub(r"\s+", " ", texto).strip()
+            if max_paginas and lidas >= max_paginas and achou_termo:
+                break
+            parte = PAT_ESPACOS.sub(" ", page.get_text())
+            if not parte.strip():
+                sem_texto.append(lidas)
+                if ocr:
+                    try:
+                        parte = PAT_ESPACOS.sub(" ", texto_ocr(page, *ocr))
+                        reconhecidas += 1
+                    except Exception as e:
+                        print(f"Erro no OCR da página {lidas + 1} de {path}: {e}")
+            partes.append(parte)
+            lidas += 1
+            if max_paginas and not achou_termo:
+                achou_termo = tem_termo(parte.lower())
+        doc.close()
+        texto = _juntar_paginas(partes)
     except Exception as e:
         print(f"Erro ao abrir PDF {path}: {e}")
-        return ""
\ No newline at end of file
+
+    return DocumentoPDF(
+        caminho=path,
+        texto=texto,
+        texto_lower=texto.lower(),
+        paginas=paginas,
+        sha256=sha256,
+        paginas_lidas=lidas,
+        paginas_sem_texto=sem_texto,
+        paginas_ocr=reconhecidas,
+    )
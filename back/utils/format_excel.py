@@ -1,7 +1,9 @@
-from openpyxl import load_workbook
-from openpyxl.styles import Border, Side, Alignment, PatternFill, Font
-
+# openpyxl (e o numpy que ele importa) só é carregado quando uma planilha é gerada,
+# para não pesar na partida do servidor
 def format_excel(path: str):
+    from openpyxl import load_workbook
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
     wb = load_workbook(path)
     ws = wb.active
 
@@ -50,3 +52,102 @@ def format_excel(path: str):
         ws.column_dimensions[col_letter].width = adjusted_width
 
     wb.save(path)
+
+
+def escrever_excel(path: str, colunas: list, linhas: list):
+    """
+    Grava a planilha de uma vez em modo write-only, aplicando o mesmo estilo de
+    format_excel à medida que as linhas são emitidas (sem segunda passada).
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+
+    thin = Side(border_style="thin", color="000000")
+    thick = Side(border_style="thick", color="000000")
+    alinhamento = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    header_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+
+    max_row = len(linhas) + 1
+    max_col = len(colunas)
+    bordas = {}
+
+    def borda(r: int, c: int) -> Border:
+        chave = (r == 1, c == 1, c == max_col, r == max_row)
+        if chave not in bordas:
+            bordas[chave] = Border(
+                top=thick if chave[0] else thin,
+                left=thick if chave[1] else thin,
+                right=thick if chave[2] else thin,
+                bottom=thick if chave[3] else thin,
+            )
+        return bordas[chave]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    # Largura das colunas precisa ser definida antes de emitir as linhas
+    larguras = [len(str(nome)) for nome in colunas]
+    for linha in linhas:
+        for c, valor in enumerate(linha):
+            if valor:
+                larguras[c] = max(larguras[c], len(str(valor)))
+    for c, largura in enumerate(larguras, start=1):
+        ws.column_dimensions[get_column_letter(c)].width = largura + 5
+
+    cabecalho = []
+    for c, nome in enumerate(colunas, start=1):
+        cell = WriteOnlyCell(ws, value=nome)
+        cell.alignment = alinhamento
+        cell.border = borda(1, c)
+        cell.fill = header_fill
+        cell.font = header_font
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
+    for r, linha in enumerate(linhas, start=2):
+        cells = []
+        for c, valor in enumerate(linha, start=1):
+            cell = WriteOnlyCell(ws, value=valor)
+            cell.alignment = alinhamento
+            cell.border = borda(r, c)
+            cells.append(cell)
+        ws.append(cells)
+
+    wb.save(path)
+
+
+def escrever_excel_continuo(path: str, colunas: list, linhas):
+    """
+    Grava a planilha em modo write-only consumindo `linhas` (qualquer iterável) uma
+    única vez, sem guardá-las em memória. Só o cabeçalho é estilizado e a largura das
+    colunas vem do cabeçalho, já que não há segunda passada pelos dados.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for c, nome in enumerate(colunas, start=1):
+        ws.column_dimensions[get_column_letter(c)].width = max(len(str(nome)), 10) + 5
+
+    alinhamento = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    header_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    cabecalho = []
+    for nome in colunas:
+        cell = WriteOnlyCell(ws, value=nome)
+        cell.alignment = alinhamento
+        cell.fill = header_fill
+        cell.font = header_font
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
+    for linha in linhas:
+        ws.append(linha)
+
+    wb.save(path)
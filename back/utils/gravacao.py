@@ -0,0 +1,74 @@
+from utils.conflitos import CHAVES, IndiceConflitos
+from utils.resultados import ResultStore
+
+# Campos de cada registro que o índice de conflitos lê (sha256 identifica o documento)
+CAMPOS_INDICE = ["TERMO", "NOME", "sha256", *CHAVES]
+
+
+class GravadorResultados:
+    """
+    Grava no ResultStore os registros de cada arquivo depois de passá-los pelo índice
+    de conflitos, que preenche CONFLITO/PAR neles e corrige os de arquivos anteriores.
+    Um por processo (servidor ou linha de comando); o índice fica em memória e
+    acompanha, pelo id, o que outros processos gravaram. Gravações e contagens passam
+    pela trava do store, então podem vir de threads diferentes.
+    """
+
+    def __init__(self, store: ResultStore):
+        self.store = store
+        self.indice = IndiceConflitos()
+        # Maior id do store já passado pelo índice
+        self.ultimo_id = 0
+
+    def carregar(self):
+        """
+        Reconstrói o índice a partir do store e corrige as colunas CONFLITO/PAR que
+        mudaram (ex.: linhas importadas da planilha antiga).
+        """
+        gravados = {}
+        for id_linha, id_registro, dados in self.store.para_indexar(CAMPOS_INDICE + ["CONFLITO", "PAR"]):
+            self.indice.adicionar(id_registro, dados)
+            gravados[id_registro] = {"CONFLITO": dados["CONFLITO"] or "", "PAR": dados["PAR"] or ""}
+            self.ultimo_id = id_linha
+        alteracoes = []
+        for id_registro, achados in gravados.items():
+            atuais = self.indice.achados(id_registro)
+            if atuais != achados:
+                alteracoes.append((id_registro, atuais))
+        if alteracoes:
+            self.store.atualizar(alteracoes)
+
+    def sincronizar(self):
+        """Passa pelo índice os registros que outros processos gravaram desde a última leitura."""
+        for id_linha, id_registro, dados in self.store.para_indexar(CAMPOS_INDICE, self.ultimo_id):
+            self.indice.adicionar(id_registro, dados)
+            self.ultimo_id = id_linha
+
+    def _indexar(self, lote: str, arquivo: int, registros: list):
+        proprios = [(lote, arquivo, posicao) for posicao in range(len(registros))]
+        alterados = set()
+        for id_registro, dados in zip(proprios, registros):
+            alterados |= self.indice.adicionar(id_registro, dados)
+        for id_registro, dados in zip(proprios, registros):
+            dados.update(self.indice.achados(id_registro))
+        outros = alterados.difference(proprios)
+        if outros:
+            self.store.atualizar([(i, self.indice.achados(i)) for i in outros])
+
+    def gravar(self, lote: str, arquivo: int, registros: list):
+        """
+        Indexa os conflitos e grava os registros de um arquivo numa única transação
+        exclusiva do ResultStore. O índice recebe antes o que os outros processos
+        gravaram, e nenhum deles grava entre essa leitura e a escrita.
+        """
+        with self.store.escrita():
+            self.sincronizar()
+            self._indexar(lote, arquivo, registros)
+            self.store.gravar(lote, arquivo, registros)
+            self.ultimo_id = self.store.ultimo_id()
+
+    def contagens(self, lote: str) -> dict:
+        """Duplicados, devoluções sem concessão e pares do lote, para o chartData."""
+        with self.store.lock:
+            self.sincronizar()
+            return self.indice.contagens(lote)
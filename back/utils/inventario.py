@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import os
+import time
+
+# Nomes de coluna aceitos no export do inventário (comparados em minúsculas)
+CAMPOS = {
+    "hostname": ("hostname", "host"),
+    "serial": ("serial", "numero_serie", "número de série", "nº de série"),
+    "matricula": ("matricula", "matrícula", "colaborador"),
+}
+
+
+def _normalizar(valor) -> str:
+    return str(valor or "").strip().upper()
+
+
+def ler_linhas(conteudo: str, formato: str) -> list:
+    """Linhas (dicts) de um export em CSV (com cabeçalho) ou JSON (lista ou {"ativos": [...]})."""
+    if formato == "json":
+        dados = json.loads(conteudo)
+        return dados.get("ativos", []) if isinstance(dados, dict) else dados
+    # O Excel em português exporta CSV com ";"
+    dialeto = csv.Sniffer().sniff(conteudo[:4096], delimiters=",;\t")
+    return list(csv.DictReader(io.StringIO(conteudo), dialect=dialeto))
+
+
+class Inventario:
+    """
+    Retrato do inventário de ativos com índices em dicionários por hostname, serial
+    e matrícula: cada consulta da validação é um acesso O(1), sem rede.
+    """
+
+    def __init__(self, linhas: list):
+        self.por_hostname = {}
+        self.por_serial = {}
+        self.por_matricula = {}
+        for linha in linhas:
+            campos = {str(k).strip().lower(): v for k, v in linha.items()}
+            ativo = {
+                chave: next((_normalizar(campos[n]) for n in nomes if n in campos), "")
+                for chave, nomes in CAMPOS.items()
+            }
+            if ativo["hostname"]:
+                self.por_hostname[ativo["hostname"]] = ativo
+            if ativo["serial"]:
+                self.por_serial[ativo["serial"]] = ativo
+            if ativo["matricula"]:
+                self.por_matricula.setdefault(ativo["matricula"], []).append(ativo)
+
+    def __len__(self) -> int:
+        return len(self.por_serial)
+
+    def dono_hostname(self, hostname: str):
+        """Matrícula do dono do hostname ("" se o inventário não diz), ou None se não existe."""
+        ativo = self.por_hostname.get(_normalizar(hostname))
+        return ativo["matricula"] if ativo else None
+
+    def dono_serial(self, serial: str):
+        """Matrícula do dono do serial ("" se o inventário não diz), ou None se não existe."""
+        ativo = self.por_serial.get(_normalizar(serial))
+        return ativo["matricula"] if ativo else None
+
+    def ativos_de(self, matricula: str) -> list:
+        return self.por_matricula.get(_normalizar(matricula), [])
+
+
+# --- Fontes: qualquer objeto com ler() -> [dict] ---
+class FonteArquivo:
+    """Export do inventário em disco (.csv ou .json)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def ler(self) -> list:
+        formato = "json" if self.path.lower().endswith(".json") else "csv"
+        with open(self.path, encoding="utf-8-sig") as f:
+            return ler_linhas(f.read(), formato)
+
+
+class FonteHttp:
+    """
+    Endpoint HTTP que devolve o export (JSON ou CSV, pelo Content-Type ou pela
+    extensão). Para testes, basta apontar para um servidor local ou usar FonteArquivo.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0, cabecalhos: dict = None):
+        self.url = url
+        self.timeout = timeout
+        self.cabecalhos = cabecalhos or {}
+
+    def ler(self) -> list:
+        # Importado aqui: custa ~30 ms na partida e só serve a quem usa a fonte HTTP
+        import urllib.request
+
+        requisicao = urllib.request.Request(self.url, headers=self.cabecalhos)
+        with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+            tipo = resposta.headers.get_content_type()
+            conteudo = resposta.read().decode(resposta.headers.get_content_charset() or "utf-8")
+        formato = "json" if "json" in tipo or self.url.lower().endswith(".json") else "csv"
+        return ler_linhas(conteudo, formato)
+
+
+class FonteMemoria:
+    def __init__(self, linhas: list):
+        self.linhas = linhas
+
+    def ler(self) -> list:
+        return list(self.linhas)
+
+
+def criar_fonte(origem: str):
+    """URL http(s) vira FonteHttp; qualquer outra coisa é o caminho de um export."""
+    if origem.lower().startswith(("http://", "https://")):
+        return FonteHttp(origem)
+    return FonteArquivo(origem)
+
+
+class InventarioLocal:
+    """
+    Mantém um Inventario carregado da fonte e o recarrega a cada `ttl` segundos.
+    Com `cache_path`, o último retrato baixado fica num JSON local compartilhado
+    pelos processos: quem encontra o arquivo com menos de `ttl` segundos o lê em vez
+    de ir à fonte, e uma fonte fora do ar mantém o último retrato em uso (ou o do
+    cache, mesmo vencido). Sem retrato nenhum, `atual()` devolve None.
+    """
+
+    def __init__(self, fonte, ttl: float = 3600.0, cache_path: str = None):
+        self.fonte = fonte
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.inventario = None
+        self.carregado_em = None
+
+    def atual(self):
+        if self.carregado_em is None or time.monotonic() - self.carregado_em >= self.ttl:
+            self.recarregar()
+        return self.inventario
+
+    def _cache_valido(self) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self.cache_path) < self.ttl
+        except (OSError, TypeError):
+            return False
+
+    def _ler_cache(self) -> list:
+        with open(self.cache_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _gravar_cache(self, linhas: list):
+        temporario = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(linhas, f, ensure_ascii=False)
+        os.replace(temporario, self.cache_path)
+
+    def recarregar(self):
+        # Mesmo em caso de erro, a próxima tentativa só acontece depois do ttl
+        self.carregado_em = time.monotonic()
+        try:
+            if self.cache_path and self._cache_valido():
+                linhas = self._ler_cache()
+            else:
+                linhas = self.fonte.ler()
+                if self.cache_path:
+                    self._gravar_cache(linhas)
+        except Exception as e:
+            print(f"Erro ao carregar o inventário: {e}")
+            if self.inventario is not None or not self.cache_path:
+                return
+            try:
+                linhas = self._ler_cache()
+            except (OSError, ValueError):
+                return
+        self.inventario = Inventario(linhas)
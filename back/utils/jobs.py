@@ -0,0 +1,281 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from utils.metricas import RelatorioTempos
+
+
+def novo_chart_data() -> dict:
+    """chartData zerado, o mesmo para o upload, os jobs e as estatísticas."""
+    return {
+        "ok": 0,
+        "erro": 0,
+        "concessao": 0,
+        "devolucao": 0,
+        "rat": 0,
+        "desconhecido": 0,
+    }
+
+
+class JobStore:
+    """
+    Estado dos lotes em SQLite: cada job guarda a lista de arquivos e o resultado
+    de cada um à medida que termina, para que um servidor reiniciado retome o lote
+    a partir do último arquivo concluído.
+    É também a fila compartilhada entre os processos do servidor: um job é executado
+    por quem o reivindica (`dono`) e renova `visto_em`; um job cujo dono parou de
+    renovar pode ser reivindicado por outro processo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # A conexão é usada pelo event loop e por threads (asyncio.to_thread)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                diretorio TEXT,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                criado_em TEXT NOT NULL,
+                atualizado_em TEXT NOT NULL,
+                dono TEXT,
+                visto_em REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_arquivos (
+                job_id TEXT NOT NULL,
+                ordem INTEGER NOT NULL,
+                nome TEXT NOT NULL,
+                caminho TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pendente',
+                exportado INTEGER NOT NULL DEFAULT 0,
+                registros TEXT,
+                resultados TEXT,
+                chart TEXT,
+                cache TEXT,
+                tempos TEXT,
+                sha256 TEXT,
+                destino TEXT,
+                PRIMARY KEY (job_id, ordem)
+            );
+            """
+        )
+        # Migrações numa transação exclusiva, para processos que sobem juntos
+        self.conn.execute("BEGIN IMMEDIATE")
+        # Bancos criados antes do relatório de tempos
+        colunas = {linha[1] for linha in self.conn.execute("PRAGMA table_info(job_arquivos)")}
+        if "tempos" not in colunas:
+            self.conn.execute("ALTER TABLE job_arquivos ADD COLUMN tempos TEXT")
+        # Bancos criados antes do registro do destino (retomada de arquivos já movidos)
+        if "destino" not in colunas:
+            self.conn.execute("ALTER TABLE job_arquivos ADD COLUMN sha256 TEXT")
+            self.conn.execute("ALTER TABLE job_arquivos ADD COLUMN destino TEXT")
+        # Bancos criados antes da fila compartilhada
+        colunas = {linha[1] for linha in self.conn.execute("PRAGMA table_info(jobs)")}
+        if "dono" not in colunas:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN dono TEXT")
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN visto_em REAL")
+        self.conn.commit()
+
+    def _ler(self, sql: str, parametros: tuple = ()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, parametros).fetchall()
+
+    def _agora(self) -> str:
+        return datetime.now().isoformat(timespec="seconds")
+
+    def criar(self, entradas: list, diretorio: str = None) -> str:
+        job_id = uuid.uuid4().hex
+        agora = self._agora()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, diretorio, status, total, criado_em, atualizado_em) "
+                "VALUES (?, ?, 'pendente', ?, ?, ?)",
+                (job_id, diretorio, len(entradas), agora, agora),
+            )
+            self.conn.executemany(
+                "INSERT INTO job_arquivos (job_id, ordem, nome, caminho) VALUES (?, ?, ?, ?)",
+                [(job_id, i, nome, path) for i, (nome, path) in enumerate(entradas)],
+            )
+        return job_id
+
+    def atualizar_status(self, job_id: str, status: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, atualizado_em = ? WHERE id = ?",
+                (status, self._agora(), job_id),
+            )
+
+    def registrar_arquivo(self, job_id: str, ordem: int, status: str,
+                          registros: list, resultados: list, chart: dict,
+                          cache: str = None, tempos: dict = None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE job_arquivos
+                SET status = ?, registros = ?, resultados = ?, chart = ?, cache = ?, tempos = ?
+                WHERE job_id = ? AND ordem = ? AND status = 'pendente'
+                """,
+                (status, json.dumps(registros), json.dumps(resultados),
+                 json.dumps(chart), cache, json.dumps(tempos) if tempos else None,
+                 job_id, ordem),
+            )
+            self.conn.execute(
+                "UPDATE jobs SET atualizado_em = ? WHERE id = ?",
+                (self._agora(), job_id),
+            )
+
+    def registrar_destino(self, job_id: str, ordem: int, sha256: str, destino: str):
+        """
+        Gravado pelo worker antes de mover o PDF: se o servidor parar entre a mudança
+        e o registro do resultado, a retomada acha o arquivo na pasta de destino.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE job_arquivos SET sha256 = ?, destino = ? WHERE job_id = ? AND ordem = ?",
+                (sha256, destino, job_id, ordem),
+            )
+
+    def marcar_exportados(self, job_id: str, ordens: list):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE job_arquivos SET exportado = 1 WHERE job_id = ? AND ordem = ?",
+                [(job_id, ordem) for ordem in ordens],
+            )
+
+    def arquivos_pendentes(self, job_id: str) -> list:
+        """[(ordem, nome, caminho, sha256, destino)]; sha256/destino só de quem já foi movido."""
+        return self._ler(
+            "SELECT ordem, nome, caminho, sha256, destino FROM job_arquivos "
+            "WHERE job_id = ? AND status = 'pendente' ORDER BY ordem",
+            (job_id,),
+        )
+
+    def nao_exportados(self, job_id: str) -> list:
+        """Arquivos já concluídos cujos registros ainda não chegaram ao store de resultados."""
+        linhas = self._ler(
+            "SELECT ordem, registros FROM job_arquivos "
+            "WHERE job_id = ? AND status != 'pendente' AND exportado = 0 ORDER BY ordem",
+            (job_id,),
+        )
+        return [(ordem, json.loads(registros or "[]")) for ordem, registros in linhas]
+
+    def ativos(self) -> list:
+        """[(job_id, dono, visto_em)] dos jobs pendentes ou em execução."""
+        return self._ler(
+            "SELECT id, dono, visto_em FROM jobs "
+            "WHERE status IN ('pendente', 'executando') ORDER BY criado_em"
+        )
+
+    def reivindicar(self, job_id: str, dono: str, anterior: tuple = None) -> bool:
+        """
+        Torna `dono` o executor do job, se ninguém mais for: o job está sem dono, já é
+        de `dono`, ou ainda está com o (dono, visto_em) `anterior` que quem chamou viu
+        expirar. A troca é atômica; devolve se deu certo.
+        """
+        condicao = "dono IS NULL OR dono = ?"
+        parametros = [dono, time.time(), job_id, dono]
+        if anterior:
+            condicao += " OR (dono IS ? AND visto_em IS ?)"
+            parametros.extend(anterior)
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE jobs SET dono = ?, visto_em = ? "
+                f"WHERE id = ? AND status IN ('pendente', 'executando') AND ({condicao})",
+                parametros,
+            )
+        return cur.rowcount == 1
+
+    def renovar(self, dono: str, job_ids: list):
+        agora = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET visto_em = ? WHERE id = ? AND dono = ?",
+                [(agora, job_id, dono) for job_id in job_ids],
+            )
+
+    def liberar(self, dono: str):
+        """Devolve à fila os jobs de `dono` (parada do processo), para outro continuar."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET dono = NULL WHERE dono = ?", (dono,))
+
+    def status(self, job_id: str) -> str:
+        linhas = self._ler("SELECT status FROM jobs WHERE id = ?", (job_id,))
+        return linhas[0][0] if linhas else None
+
+    def progresso(self, job_id: str) -> dict:
+        """Contadores do job lidos do banco, para acompanhar um job de outro processo."""
+        linhas = self._ler(
+            """
+            SELECT j.status, j.total, COALESCE(SUM(a.status != 'pendente'), 0),
+                   COALESCE(SUM(json_array_length(a.registros)), 0),
+                   COALESCE(SUM(json_extract(a.chart, '$.ok')), 0),
+                   COALESCE(SUM(json_extract(a.chart, '$.erro')), 0)
+            FROM jobs j LEFT JOIN job_arquivos a ON a.job_id = j.id
+            WHERE j.id = ? GROUP BY j.id
+            """,
+            (job_id,),
+        )
+        if not linhas:
+            return None
+        status, total, feitos, registros, ok, erro = linhas[0]
+        return {
+            "jobId": job_id,
+            "status": status,
+            "progress": int(feitos / total * 100) if total else 100,
+            "arquivos": feitos,
+            "total": total,
+            "registros": registros,
+            "ok": ok,
+            "erro": erro,
+        }
+
+    def obter(self, job_id: str) -> dict:
+        with self.lock:
+            job = self.conn.execute(
+                "SELECT status, diretorio, total, criado_em, atualizado_em FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            arquivos = self.conn.execute(
+                "SELECT resultados, chart, cache, tempos FROM job_arquivos "
+                "WHERE job_id = ? AND status != 'pendente' ORDER BY ordem",
+                (job_id,),
+            ).fetchall()
+        if not job:
+            return None
+        status, diretorio, total, criado_em, atualizado_em = job
+
+        resultados = []
+        chart_data = novo_chart_data()
+        cache_lote = {"hits": 0, "misses": 0}
+        relatorio = RelatorioTempos()
+        processados = 0
+        for resultados_arquivo, chart, cache, tempos in arquivos:
+            processados += 1
+            if tempos:
+                relatorio.adicionar(json.loads(tempos))
+            if cache:
+                cache_lote["hits" if cache == "hit" else "misses"] += 1
+            resultados.extend(json.loads(resultados_arquivo or "[]"))
+            for chave, valor in json.loads(chart or "{}").items():
+                chart_data[chave] = chart_data.get(chave, 0) + valor
+
+        return {
+            "jobId": job_id,
+            "status": status,
+            "diretorio": diretorio,
+            "total": total,
+            "processados": processados,
+            "criadoEm": criado_em,
+            "atualizadoEm": atualizado_em,
+            "resultados": resultados,
+            "chartData": chart_data,
+            "cache": cache_lote,
+            # Sem duração: o job pode ter sido retomado depois de uma parada
+            "tempos": relatorio.resumo(duracao=False),
+        }
@@ -0,0 +1,198 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Limites (em segundos) dos buckets dos histogramas de tempo
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+@contextmanager
+def cronometrar(tempos: dict, etapa: str):
+    """Soma em tempos[etapa] o tempo gasto no bloco (perf_counter, em segundos)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tempos[etapa] = tempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+
+def _rotulos(nomes: tuple, valores: tuple) -> str:
+    if not nomes:
+        return ""
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, valor: float = 1, *rotulos):
+        with self.lock:
+            self.series[rotulos] = self.series.get(rotulos, 0) + valor
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for valores, total in sorted(self.series.items()):
+            linhas.append(f"{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}")
+        return linhas
+
+
+class Medidor:
+    """Gauge; com `funcao`, o valor é lido na hora da exportação."""
+
+    def __init__(self, nome: str, ajuda: str, funcao=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        self.valor = 0
+
+    def inc(self, valor: float = 1):
+        self.valor += valor
+
+    def dec(self, valor: float = 1):
+        self.valor -= valor
+
+    def exportar(self) -> list:
+        valor = self.funcao() if self.funcao else self.valor
+        return [
+            f"# HELP {self.nome} {self.ajuda}",
+            f"# TYPE {self.nome} gauge",
+            f"{self.nome} {_numero(valor)}",
+        ]
+
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = tuple(buckets)
+        # rótulos -> [contagem por bucket (não cumulativa) + excedente, soma, quantidade]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observar(self, valor: float, *rotulos):
+        with self.lock:
+            serie = self.series.get(rotulos)
+            if serie is None:
+                serie = self.series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][bisect_left(self.buckets, valor)] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for valores, (contagens, soma, quantidade) in sorted(self.series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + ("+Inf",), contagens):
+                acumulado += contagem
+                rotulos = _rotulos(self.rotulos + ("le",), valores + (limite,))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _rotulos(self.rotulos, valores)
+            linhas.append(f"{self.nome}_sum{rotulos} {_numero(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {quantidade}")
+        return linhas
+
+
+class MetricasAuditoria:
+    """
+    Métricas do processo do servidor, no formato texto do Prometheus (/metrics).
+    Os workers do pool só medem e devolvem os tempos junto com o resultado; o
+    registro acontece aqui, no processo principal.
+    """
+
+    def __init__(self, jobs_ativos=None):
+        self.etapas = Histograma(
+            "auditoria_etapa_segundos", "Tempo por etapa do pipeline, por arquivo.", ("etapa",)
+        )
+        self.arquivos = Contador(
+            "auditoria_arquivos_total", "Arquivos processados, por status.", ("status",)
+        )
+        self.registros = Contador(
+            "auditoria_registros_total", "Registros extraídos, por TERMO e STATUS TERMO.",
+            ("termo", "status"),
+        )
+        self.bytes = Contador("auditoria_bytes_ingeridos_total", "Bytes de PDF processados.")
+        self.leitura_parcial = Contador(
+            "auditoria_pdfs_lidos_em_parte_total",
+            "PDFs com páginas não lidas por causa de AUDITORIA_MAX_PAGINAS.",
+        )
+        self.cache = Contador(
+            "auditoria_cache_total", "Consultas ao cache de extração.", ("resultado",)
+        )
+        self.fila = Medidor(
+            "auditoria_fila_arquivos", "Arquivos enviados ao pool e ainda não concluídos."
+        )
+        self.jobs = Medidor(
+            "auditoria_jobs_ativos", "Jobs em execução.",
+            (lambda: len(jobs_ativos)) if jobs_ativos is not None else None,
+        )
+        self.exportacoes = Histograma(
+            "auditoria_exportacao_segundos", "Tempo para gerar exportações.", ("formato",)
+        )
+
+    def registrar_arquivo(self, resultado: dict, erro: Exception):
+        if erro is not None:
+            self.arquivos.inc(1, "erro")
+            return
+        self.arquivos.inc(1, "concluido")
+        self.bytes.inc(resultado.get("bytes", 0))
+        if resultado.get("paginas_nao_lidas"):
+            self.leitura_parcial.inc()
+        self.cache.inc(1, resultado["cache"])
+        for etapa, segundos in resultado.get("tempos", {}).items():
+            self.etapas.observar(segundos, etapa)
+        for dados in resultado["registros"]:
+            self.registros.inc(1, dados.get("TERMO", ""), dados.get("STATUS TERMO", ""))
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in (self.etapas, self.arquivos, self.registros, self.bytes,
+                        self.leitura_parcial, self.cache, self.fila, self.jobs,
+                        self.exportacoes):
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+class RelatorioTempos:
+    """Tempos somados por etapa de um lote, incluídos na resposta do lote."""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.arquivos = 0
+        self.etapas = {}
+
+    def adicionar(self, tempos: dict):
+        self.arquivos += 1
+        for etapa, segundos in tempos.items():
+            total, maximo, n = self.etapas.get(etapa, (0.0, 0.0, 0))
+            self.etapas[etapa] = (total + segundos, max(maximo, segundos), n + 1)
+
+    def resumo(self, duracao: bool = True) -> dict:
+        relatorio = {
+            "arquivos": self.arquivos,
+            "etapas": {
+                etapa: {
+                    "total": round(total, 4),
+                    "media": round(total / n, 4),
+                    "max": round(maximo, 4),
+                }
+                for etapa, (total, maximo, n) in self.etapas.items()
+            },
+        }
+        if duracao:
+            relatorio["duracao"] = round(time.monotonic() - self.inicio, 4)
+        return relatorio
@@ -0,0 +1,292 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.cache import ResultCache
+from utils.extract_text import carregar_documento, sha256_arquivo
+from utils.inventario import FonteHttp, InventarioLocal, criar_fonte
+from utils.jobs import JobStore
+from utils.metricas import cronometrar
+from utils.process_pdf import VERSAO_EXTRATORES, classificar, extrair_registros, tem_termo
+from utils.regras import RegrasArquivo
+from utils.renomear_excel import mover_sem_colisao, nome_destino_pdf
+from utils.validar_termo import motivo_reprovacao
+
+LIMITE_CACHE = int(os.environ.get("AUDITORIA_CACHE_MB", "512")) * 1024 * 1024
+# Páginas lidas por PDF depois que um termo aparece (0 = todas, o padrão). O limite
+# perde dados: termos e campos das páginas seguintes a ele ficam de fora. Cada
+# registro de um PDF cortado leva PÁGINAS NÃO LIDAS, que a validação reprova, e o
+# /metrics conta esses PDFs. Só vale para acervos em que o termo está sempre no
+# início e o resto são anexos; o cache separa os resultados por limite.
+MAX_PAGINAS = int(os.environ.get("AUDITORIA_MAX_PAGINAS", "0"))
+VERSAO_CACHE = (
+    f"{VERSAO_EXTRATORES}-parcial{MAX_PAGINAS}" if MAX_PAGINAS else VERSAO_EXTRATORES
+)
+
+# OCR (Tesseract local) para PDFs digitalizados sem camada de texto, em pool próprio
+OCR_ATIVO = os.environ.get("AUDITORIA_OCR", "0") == "1"
+OCR_WORKERS = int(os.environ.get("AUDITORIA_OCR_WORKERS", "1"))
+OCR_IDIOMA = os.environ.get("AUDITORIA_OCR_IDIOMA", "por")
+OCR_DPI = int(os.environ.get("AUDITORIA_OCR_DPI", "300"))
+
+# Inventário de ativos (export .csv/.json ou URL http) para conferir serial e hostname;
+# sem ele, essas regras não são aplicadas. Um retrato por processo, renovado a cada TTL.
+INVENTARIO = os.environ.get("AUDITORIA_INVENTARIO", "")
+INVENTARIO_TTL = float(os.environ.get("AUDITORIA_INVENTARIO_TTL", "3600"))
+INVENTARIO_CACHE = os.environ.get(
+    "AUDITORIA_INVENTARIO_CACHE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "inventario.json"),
+)
+
+# Regras de validação (JSON versionado), relidas quando o arquivo muda
+REGRAS = os.environ.get(
+    "AUDITORIA_REGRAS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "regras.json"),
+)
+
+# Uma conexão por processo do pool, aberta no primeiro uso
+_caches = {}
+_job_stores = {}
+_inventario = None
+_regras = None
+
+
+# Processos do servidor (uvicorn --workers lê a mesma variável); os núcleos são
+# divididos entre os pools de cada um
+PROCESSOS_WEB = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+
+def aquecer_worker():
+    """
+    Inicializador dos processos do pool: carrega o PyMuPDF, as regras e o inventário
+    antes do primeiro PDF.
+    """
+    import fitz  # noqa: F401
+
+    obter_regras()
+    obter_inventario()
+
+
+def _contexto():
+    """
+    forkserver onde existe: os workers nascem de um processo limpo e não herdam os
+    descritores do servidor (a trava da vigia, sockets, conexões SQLite), que com
+    fork ficariam presos em workers órfãos se o servidor morresse.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
+
+
+def workers_padrao() -> int:
+    return int(os.environ.get("AUDITORIA_WORKERS", "0")) or max(
+        1, (os.cpu_count() or 1) // PROCESSOS_WEB
+    )
+
+
+def criar_pool(workers: int = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=workers or workers_padrao(), mp_context=_contexto(),
+        initializer=aquecer_worker,
+    )
+
+
+def criar_pool_ocr() -> ProcessPoolExecutor:
+    """
+    Pool separado e pequeno para o OCR: um lote de digitalizações não ocupa os
+    workers do caminho rápido (camada de texto). None com o OCR desligado.
+    """
+    if not OCR_ATIVO:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=max(1, OCR_WORKERS), mp_context=_contexto(), initializer=aquecer_worker
+    )
+
+
+class PoolsProcessamento:
+    """
+    Os pools do processo: "pdf" e "ocr" (None com o OCR desligado). Um worker que
+    morre (falta de memória, falha no PyMuPDF) quebra o pool inteiro; o pool quebrado
+    é trocado por um novo e só os arquivos que estavam nele voltam como erro.
+    Usado pelo servidor e pela linha de comando, sempre de uma thread só.
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers
+        self.pools = {"pdf": criar_pool(workers), "ocr": criar_pool_ocr()}
+
+    def recriar(self, qual: str, quebrado: ProcessPoolExecutor):
+        """
+        Os vários arquivos que falham com o mesmo pool só o recriam uma vez: depois
+        da troca, `quebrado` não é mais o atual.
+        """
+        if self.pools[qual] is not quebrado:
+            return
+        quebrado.shutdown(wait=False, cancel_futures=True)
+        self.pools[qual] = criar_pool(self.workers) if qual == "pdf" else criar_pool_ocr()
+
+    def submeter(self, qual: str, funcao, *args, **kwargs) -> tuple:
+        """(futuro, pool que o recebeu): o pool vai junto para `erro` saber qual quebrou."""
+        executor = self.pools[qual]
+        try:
+            return executor.submit(funcao, *args, **kwargs), executor
+        except BrokenProcessPool:
+            # O pool quebrou desde a última conclusão (worker morto ocioso)
+            self.recriar(qual, executor)
+            executor = self.pools[qual]
+            return executor.submit(funcao, *args, **kwargs), executor
+
+    def erro(self, qual: str, executor: ProcessPoolExecutor, erro: Exception) -> Exception:
+        """Erro de um futuro concluído; um pool quebrado é recriado e vira erro do arquivo."""
+        if isinstance(erro, BrokenProcessPool):
+            self.recriar(qual, executor)
+            return RuntimeError("O processo que lia o PDF foi encerrado abruptamente")
+        return erro
+
+    def encerrar(self):
+        for executor in self.pools.values():
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+
+def obter_inventario():
+    """Inventario atual do processo, ou None sem AUDITORIA_INVENTARIO."""
+    global _inventario
+    if not INVENTARIO:
+        return None
+    if _inventario is None:
+        # Um export local já é o próprio cache; uma URL é baixada para INVENTARIO_CACHE
+        fonte = criar_fonte(INVENTARIO)
+        cache_path = INVENTARIO_CACHE if isinstance(fonte, FonteHttp) else None
+        _inventario = InventarioLocal(fonte, INVENTARIO_TTL, cache_path)
+    return _inventario.atual()
+
+
+def obter_regras():
+    """Versão atual das Regras no processo (relida se o arquivo de regras mudou)."""
+    global _regras
+    if _regras is None:
+        _regras = RegrasArquivo(REGRAS)
+    return _regras.atual()
+
+
+def obter_cache(cache_path: str) -> ResultCache:
+    if cache_path not in _caches:
+        _caches[cache_path] = ResultCache(cache_path, VERSAO_CACHE, LIMITE_CACHE)
+    return _caches[cache_path]
+
+
+def registrar_destino(registro_job: tuple, sha256: str, nome_destino: str):
+    """Anota no job (banco, job_id, ordem) o SHA-256 e o nome do PDF antes de movê-lo."""
+    banco, job_id, ordem = registro_job
+    if banco not in _job_stores:
+        _job_stores[banco] = JobStore(banco)
+    _job_stores[banco].registrar_destino(job_id, ordem, sha256, nome_destino)
+
+
+def processar_arquivo(path: str, pasta_destino: str, cache_path: str = None,
+                      sha256: str = None, ocr: bool = False, registro_job: tuple = None) -> dict:
+    """
+    Executa extrair → mover para a pasta de destino já com o nome final → validar
+    para um PDF. O nome nunca sobrescreve outro termo (ver mover_sem_colisao), então
+    lotes simultâneos podem mover para a mesma pasta.
+    Roda dentro dos processos do pool; não escreve em planilha nem fala com websocket,
+    só devolve o caminho final e os registros já com STATUS TERMO e MOTIVO.
+    Com cache, um PDF já visto (mesmo SHA-256) não é aberto nem reextraído; só a
+    validação é refeita, porque as regras podem ter mudado desde a extração.
+    O SHA-256 pode vir pronto de quem gravou o arquivo (ex.: upload em streaming).
+    Devolve também o tempo de cada etapa, o tamanho do arquivo e o instante (time.time)
+    em que o worker começou, para o processo principal medir a espera na fila.
+    Com o OCR ligado, um PDF com páginas sem camada de texto em que nenhum termo foi
+    achado volta com "precisa_ocr", sem ser movido, para ser reenviado ao pool de OCR
+    com `ocr=True`; o resultado com OCR vai para o cache como qualquer outro.
+    Num job persistido, `registro_job` (banco, job_id, ordem) recebe o SHA-256 e o
+    nome de destino antes da mudança (ver localizar_movido).
+    """
+    inicio = time.time()
+    tempos = {}
+    tamanho = os.path.getsize(path)
+    if sha256 is None:
+        with cronometrar(tempos, "hash"):
+            sha256 = sha256_arquivo(path)
+
+    cache = None
+    em_cache = None
+    if cache_path:
+        try:
+            with cronometrar(tempos, "cache"):
+                cache = obter_cache(cache_path)
+                em_cache = cache.obter(sha256)
+        except Exception as e:
+            print(f"Erro ao consultar cache de {path}: {e}")
+
+    if em_cache:
+        with cronometrar(tempos, "renomear"):
+            if registro_job:
+                registrar_destino(registro_job, sha256, em_cache["nome_destino"])
+            novo_caminho_final = mover_sem_colisao(
+                path, pasta_destino, em_cache["nome_destino"], sha256
+            )
+        registros = em_cache["registros"]
+    else:
+        ocr_opcoes = (OCR_IDIOMA, OCR_DPI) if ocr else None
+        with cronometrar(tempos, "ocr" if ocr else "extracao_texto"):
+            documento = carregar_documento(path, sha256, MAX_PAGINAS, tem_termo, ocr_opcoes)
+        if (OCR_ATIVO and not ocr and documento.paginas_sem_texto
+                and not tem_termo(documento.texto_lower)):
+            return {
+                "caminho": path,
+                "registros": [],
+                "cache": "miss",
+                "tempos": tempos,
+                "bytes": tamanho,
+                "inicio": inicio,
+                "precisa_ocr": True,
+                "sha256": sha256,
+            }
+        with cronometrar(tempos, "renomear"):
+            nome_destino = nome_destino_pdf(documento)
+            # Direto para a pasta de destino: o nome final nunca aparece na pasta de
+            # entrada (que pode estar sendo vigiada)
+            if registro_job:
+                registrar_destino(registro_job, sha256, nome_destino)
+            novo_caminho_final = mover_sem_colisao(path, pasta_destino, nome_destino, sha256)
+            documento.caminho = novo_caminho_final
+
+        with cronometrar(tempos, "classificacao"):
+            termos = classificar(documento)
+        with cronometrar(tempos, "extracao_campos"):
+            registros = extrair_registros(documento, termos)
+            for dados in registros:
+                dados["PÁGINAS NÃO LIDAS"] = documento.paginas - documento.paginas_lidas
+        # OCR que falhou em alguma página não é guardado: o PDF é tentado de novo
+        ocr_incompleto = ocr and documento.paginas_ocr < len(documento.paginas_sem_texto)
+        if cache and not ocr_incompleto:
+            try:
+                with cronometrar(tempos, "cache"):
+                    cache.gravar(sha256, nome_destino, registros)
+            except Exception as e:
+                print(f"Erro ao gravar cache de {path}: {e}")
+
+    with cronometrar(tempos, "validacao"):
+        regras = obter_regras()
+        inventario = obter_inventario()
+        for dados in registros:
+            dados["NOME"] = os.path.basename(novo_caminho_final)
+            # Identidade do documento para o índice de conflitos (não vai para a planilha)
+            dados["sha256"] = sha256
+            dados["MOTIVO"] = motivo_reprovacao(dados, inventario, regras)
+            dados["STATUS TERMO"] = "ERRO" if dados["MOTIVO"] else "OK"
+
+    return {
+        "caminho": novo_caminho_final,
+        "registros": registros,
+        "cache": "hit" if em_cache else "miss",
+        "tempos": tempos,
+        "bytes": tamanho,
+        "inicio": inicio,
+        "paginas_nao_lidas": max(
+            (dados.get("PÁGINAS NÃO LIDAS") or 0 for dados in registros), default=0
+        ),
+    }
@@ -1,63 +1,91 @@
 import re
-from utils.extract_text import extract_text_from_pdf    
+from utils.extract_text import DocumentoPDF, carregar_documento
 from utils.extract_con import extract_concessao_data
 from utils.extract_dev import extract_devolucao_data
 from utils.extract_rat import extract_rat_data
-import unidecode
-
-PAT_CON = re.compile(r"(termo\s*de\s*concess(?:a|ã)o|entrego\s*para\s*uso)", re.I)
-PAT_DEV = re.compile(r"(termo\s*de\s*devolu(?:c|ç)(?:a|ã)o|devolu(?:c|ç)(?:a|ã)o\s*de\s*equipamento)", re.I)
-PAT_RAT = re.compile(r"relatorio de ativacao tecnica", re.I)
-
-def process_pdf(path: str) -> list:
-    texto = extract_text_from_pdf(path)
-    texto_lower = texto.lower()
-    texto_normalizado = unidecode.unidecode(texto_lower)
-
-    m_con = PAT_CON.search(texto_lower)
-    m_dev = PAT_DEV.search(texto_lower)
-
-    registros = []
-
-    # --- Concessão e Devolução ---
-    if m_con and m_dev:
-        if m_con.start() < m_dev.start():
-            trecho_con = texto[m_con.start():m_dev.start()]
-            trecho_dev = texto[m_dev.start():]
-        else:
-            trecho_dev = texto[m_dev.start():m_con.start()]
-            trecho_con = texto[m_con.start():]
-
-        registro_con = extract_concessao_data(trecho_con)
-        registro_con["TERMO"] = "CONCESSÃO"
-        registros.append(registro_con)
-
-        registro_dev = extract_devolucao_data(trecho_dev)
-        registro_dev["TERMO"] = "DEVOLUÇÃO"
-        registros.append(registro_dev)
-
-    elif m_con:
-        registro_con = extract_concessao_data(texto[m_con.start():])
-        registro_con["TERMO"] = "CONCESSÃO"
-        registros.append(registro_con)
-
-    elif m_dev:
-        registro_dev = extract_devolucao_data(texto[m_dev.start():])
-        registro_dev["TERMO"] = "DEVOLUÇÃO"
-        registros.append(registro_dev)
-
-    # --- RAT independente ---
-    for m_rat in PAT_RAT.finditer(texto_normalizado):
-        registro_rat = extract_rat_data(texto[m_rat.start():])
-        # Garante que seja lista
-        if isinstance(registro_rat, dict):
-            registro_rat = [registro_rat]
-        for r in registro_rat:
-            r["TERMO"] = "RAT"
-            registros.append(r)
+
+# Incrementar sempre que a extração/classificação mudar, para invalidar o cache de resultados
+VERSAO_EXTRATORES = "3"
+
+# Cabeçalhos de todos os tipos de termo numa única expressão, para achar as fronteiras
+# numa passada só. A busca é no texto em minúsculas, cujas posições são as do texto
+# original; por isso o RAT aceita as letras com e sem acento em vez de usar unidecode.
+PAT_SEGMENTOS = re.compile(
+    r"(?P<titulo_con>termo\s*de\s*concess(?:a|ã)o)"
+    r"|(?P<frase_con>entrego\s*para\s*uso)"
+    r"|(?P<titulo_dev>termo\s*de\s*devolu(?:c|ç)(?:a|ã)o)"
+    r"|(?P<frase_dev>devolu(?:c|ç)(?:a|ã)o\s*de\s*equipamento)"
+    r"|(?P<titulo_rat>relat(?:o|ó)rio de ativa(?:c|ç)(?:a|ã)o t(?:e|é)cnica)",
+    re.I,
+)
+TERMO_DO_GRUPO = {
+    "titulo_con": "CONCESSÃO",
+    "frase_con": "CONCESSÃO",
+    "titulo_dev": "DEVOLUÇÃO",
+    "frase_dev": "DEVOLUÇÃO",
+    "titulo_rat": "RAT",
+}
+
+EXTRATORES = {
+    "CONCESSÃO": extract_concessao_data,
+    "DEVOLUÇÃO": extract_devolucao_data,
+    "RAT": extract_rat_data,
+}
+
+def tem_termo(texto_lower: str) -> bool:
+    """Se o trecho (em minúsculas) tem o cabeçalho de algum termo conhecido."""
+    return PAT_SEGMENTOS.search(texto_lower) is not None
+
+def classificar(documento: DocumentoPDF) -> list:
+    """
+    Segmenta o documento em termos: [(TERMO, início, fim)] em ordem, sem sobreposição,
+    cada um indo do seu cabeçalho até o cabeçalho seguinte (ou o fim do texto).
+    A frase de um termo ("entrego para uso", "devolução de equipamento") depois do
+    título do mesmo tipo faz parte dele; sem título antes, ela abre um termo novo.
+    """
+    inicios = []
+    aberto_por_titulo = False
+    for m in PAT_SEGMENTOS.finditer(documento.texto_lower):
+        termo = TERMO_DO_GRUPO[m.lastgroup]
+        titulo = m.lastgroup.startswith("titulo")
+        if not titulo and aberto_por_titulo and inicios[-1][0] == termo:
+            continue
+        inicios.append((termo, m.start()))
+        aberto_por_titulo = titulo
+
+    fim_texto = len(documento.texto)
+    return [
+        (termo, inicio, inicios[i + 1][1] if i + 1 < len(inicios) else fim_texto)
+        for i, (termo, inicio) in enumerate(inicios)
+    ]
+
+def extrair_segmento(termo: str, trecho: str) -> list:
+    """Registros de um único termo a partir do seu trecho de texto."""
+    extraido = EXTRATORES[termo](trecho)
+    # O extrator de RAT pode devolver um registro ou uma lista
+    registros = extraido if isinstance(extraido, list) else [extraido]
+    for r in registros:
+        r["TERMO"] = termo
+    return registros
+
+def extrair_registros(documento: DocumentoPDF, segmentos: list, mapear=map) -> list:
+    """
+    Um registro por termo segmentado, na ordem do documento. Cada segmento é fatiado
+    uma vez e extraído sem depender dos outros, então `mapear` pode ser o `map` de um
+    executor para extrair os termos de um pacote grande em paralelo.
+    """
+    texto = documento.texto
+    termos = [termo for termo, _, _ in segmentos]
+    trechos = [texto[inicio:fim] for _, inicio, fim in segmentos]
+    registros = [r for extraidos in mapear(extrair_segmento, termos, trechos) for r in extraidos]
 
     # --- Se não houver nenhum tipo identificado ---
     if not registros:
         registros.append({"TERMO": "DESCONHECIDO"})
 
     return registros
+
+def process_pdf(path: str, documento: DocumentoPDF = None) -> list:
+    if documento is None:
+        documento = carregar_documento(path)
+    return extrair_registros(documento, classificar(documento))
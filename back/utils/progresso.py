@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+# Canal que recebe os eventos de todos os jobs (clientes que não informam job)
+TODOS = "*"
+
+
+class RastreadorProgresso:
+    """Acumula os contadores de um lote e monta o evento de progresso enviado aos clientes."""
+
+    def __init__(self, job_id: str, total: int, feitos: int = 0):
+        self.job_id = job_id
+        self.total = total
+        self.feitos = feitos
+        self.feitos_inicio = feitos
+        self.registros = 0
+        self.ok = 0
+        self.erro = 0
+        self.inicio = time.monotonic()
+
+    def arquivo_concluido(self, chart: dict, registros: int):
+        self.feitos += 1
+        self.registros += registros
+        self.ok += chart.get("ok", 0)
+        self.erro += chart.get("erro", 0)
+
+    def evento(self) -> dict:
+        decorrido = time.monotonic() - self.inicio
+        feitos_agora = self.feitos - self.feitos_inicio
+        vazao = feitos_agora / decorrido if decorrido > 0 else 0.0
+        restantes = self.total - self.feitos
+        return {
+            "jobId": self.job_id,
+            "progress": int(self.feitos / self.total * 100) if self.total else 100,
+            "arquivos": self.feitos,
+            "total": self.total,
+            "registros": self.registros,
+            "ok": self.ok,
+            "erro": self.erro,
+            "arquivosPorSegundo": round(vazao, 2),
+            "eta": round(restantes / vazao, 1) if vazao > 0 else None,
+        }
+
+
+class HubProgresso:
+    """
+    Distribui eventos de progresso por canal (um por job) sem bloquear o processamento.
+    Cada cliente tem uma fila limitada; eventos de um canal são agregados e enviados
+    no máximo `max_por_segundo` vezes por segundo (sempre o mais recente), e um cliente
+    cuja fila enche é descartado em vez de segurar o lote.
+    """
+
+    def __init__(self, max_por_segundo: float = 10, tamanho_fila: int = 16):
+        self.intervalo = 1 / max_por_segundo
+        self.tamanho_fila = tamanho_fila
+        self.assinantes = {}
+        self.pendentes = {}
+        self.ultimo_envio = {}
+        self.agendados = set()
+
+    def assinar(self, canal: str) -> asyncio.Queue:
+        fila = asyncio.Queue(maxsize=self.tamanho_fila)
+        self.assinantes.setdefault(canal, set()).add(fila)
+        return fila
+
+    def cancelar(self, canal: str, fila: asyncio.Queue):
+        filas = self.assinantes.get(canal)
+        if filas:
+            filas.discard(fila)
+            if not filas:
+                del self.assinantes[canal]
+
+    def publicar(self, canal: str, evento: dict, final: bool = False):
+        self.pendentes[canal] = evento
+        espera = self.ultimo_envio.get(canal, 0) + self.intervalo - time.monotonic()
+        if final:
+            self._entregar(canal)
+            self.ultimo_envio.pop(canal, None)
+        elif espera <= 0:
+            self._entregar(canal)
+        elif canal not in self.agendados:
+            self.agendados.add(canal)
+            asyncio.get_running_loop().call_later(espera, self._entregar, canal)
+
+    def _entregar(self, canal: str):
+        self.agendados.discard(canal)
+        evento = self.pendentes.pop(canal, None)
+        if evento is None:
+            return
+        self.ultimo_envio[canal] = time.monotonic()
+        for destino in (canal, TODOS):
+            for fila in list(self.assinantes.get(destino, ())):
+                try:
+                    fila.put_nowait(evento)
+                except asyncio.QueueFull:
+                    self._descartar(destino, fila)
+
+    def _descartar(self, canal: str, fila: asyncio.Queue):
+        # Esvazia a fila e deixa só o aviso de encerramento para o websocket
+        self.cancelar(canal, fila)
+        while not fila.empty():
+            fila.get_nowait()
+        fila.put_nowait(None)
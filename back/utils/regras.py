@@ -0,0 +1,115 @@
+import functools
+import hashlib
+import json
+import os
+import re
+
+# Regras embutidas: valem quando o arquivo de regras não existe
+PADRAO = {
+    "versao": 1,
+    "modelos_isentos_nf": [
+        "OPTIPLEX 7070", "LATITUDE 7400", "LATITUDE 5400", "LATITUDE 5420",
+        "7070", "7400", "5400", "5420",
+    ],
+    "tipos_validos": ["DESKTOP", "MINIDESK", "MINIDESKTOP", "NOTEBOOK"],
+    "marcas_validas": ["DELL", "LENOVO", "HP", "ACER", "ASUS", "SAMSUNG", "POSITIVO", "APPLE"],
+    "chamados_rollout": ["ROLLOUT", "ROLOUT"],
+    "prefixos_chamado": ["REQ", "INC"],
+}
+
+
+def _conjunto(valores) -> frozenset:
+    return frozenset(str(v).strip().upper() for v in valores)
+
+
+class Regras:
+    """
+    Uma versão das regras de validação, compilada uma vez: listas viram frozensets em
+    maiúsculas e os prefixos de chamado viram as regex, então cada consulta da
+    validação é um acesso a conjunto. `identificador` é a versão declarada mais um
+    resumo do conteúdo: editar o arquivo sem mudar a versão também conta como mudança.
+    """
+
+    def __init__(self, config: dict):
+        faltando = [chave for chave in PADRAO if chave not in config]
+        if faltando:
+            raise ValueError(f"Regras sem {', '.join(faltando)}")
+        self.versao = str(config["versao"])
+        resumo = hashlib.sha256(
+            json.dumps({k: config[k] for k in PADRAO}, sort_keys=True).encode()
+        ).hexdigest()[:12]
+        self.identificador = f"{self.versao}-{resumo}"
+
+        self.modelos_isentos_nf = _conjunto(config["modelos_isentos_nf"])
+        self.tipos_validos = _conjunto(config["tipos_validos"])
+        self.marcas_validas = _conjunto(config["marcas_validas"])
+        self.chamados_rollout = _conjunto(config["chamados_rollout"])
+        prefixos = "|".join(re.escape(p) for p in sorted(_conjunto(config["prefixos_chamado"])))
+        self.pat_chamado_zerado = re.compile(rf"^({prefixos})0*$")
+        self.pat_chamado_valido = re.compile(rf"^({prefixos})\d+$")
+        # Chamados se repetem muito (rollouts em massa): cada valor é avaliado uma vez
+        self.chamado_valido = functools.lru_cache(maxsize=4096)(self._chamado_valido)
+
+    def isento_nf(self, modelo: str) -> bool:
+        return modelo.upper() in self.modelos_isentos_nf
+
+    def tipo_valido(self, tipo: str) -> bool:
+        return tipo.upper() in self.tipos_validos
+
+    def marca_valida(self, marca: str) -> bool:
+        return marca.upper() in self.marcas_validas
+
+    def _chamado_valido(self, chamado: str) -> bool:
+        chamado = chamado.upper()
+        if chamado in self.chamados_rollout:
+            return True
+        return bool(self.pat_chamado_valido.match(chamado)) and not self.pat_chamado_zerado.match(chamado)
+
+    def resumo(self) -> dict:
+        return {
+            "versao": self.versao,
+            "identificador": self.identificador,
+            "modelosIsentosNf": sorted(self.modelos_isentos_nf),
+            "tiposValidos": sorted(self.tipos_validos),
+            "marcasValidas": sorted(self.marcas_validas),
+            "chamadosRollout": sorted(self.chamados_rollout),
+        }
+
+
+REGRAS_PADRAO = Regras(PADRAO)
+
+
+def carregar_regras(path: str) -> Regras:
+    with open(path, encoding="utf-8") as f:
+        return Regras(json.load(f))
+
+
+class RegrasArquivo:
+    """
+    Regras lidas de um JSON e recarregadas quando o arquivo muda (mtime e tamanho,
+    um stat por consulta): quem edita o arquivo não precisa reiniciar nada, e cada
+    processo do pool passa a usar a versão nova no PDF seguinte. Sem o arquivo valem
+    as REGRAS_PADRAO; um arquivo inválido é ignorado e a versão anterior continua.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.regras = REGRAS_PADRAO
+        self.assinatura = None
+
+    def atual(self) -> Regras:
+        try:
+            estado = os.stat(self.path)
+            assinatura = (estado.st_mtime_ns, estado.st_size)
+        except OSError:
+            assinatura = None
+        if assinatura != self.assinatura:
+            self.assinatura = assinatura
+            if assinatura is None:
+                self.regras = REGRAS_PADRAO
+            else:
+                try:
+                    self.regras = carregar_regras(self.path)
+                except (OSError, ValueError, TypeError) as e:
+                    print(f"Erro ao carregar as regras de {self.path}: {e}")
+        return self.regras
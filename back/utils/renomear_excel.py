@@ -1,17 +1,16 @@
+import errno
 import os
 import re
-from utils.extract_text import extract_text_from_pdf  # função que retorna o texto do PDF
+import shutil
+from utils.extract_text import DocumentoPDF, carregar_documento, sha256_arquivo
 
-def renomear_pdf(caminho_antigo: str) -> str:
+def nome_destino_pdf(documento: DocumentoPDF) -> str:
     """
-    Renomeia o PDF de acordo com o tipo de termo, nome, matrícula e serial do ativo.
+    Monta o nome do PDF de acordo com o tipo de termo, nome, matrícula e serial do ativo.
     Captura automaticamente os dados essenciais do texto.
-    Retorna o novo caminho do arquivo.
     """
-
-    # --- Extrair texto do PDF ---
-    texto = extract_text_from_pdf(caminho_antigo)
-    texto_lower = texto.lower()
+    texto = documento.texto
+    texto_lower = documento.texto_lower
 
     # --- Tipo de termo ---
     if "recebendo para o uso" in texto_lower:
@@ -49,14 +48,104 @@ def renomear_pdf(caminho_antigo: str) -> str:
     prefixo = "TR" if tipo.lower() == "concessao" else "TD" if tipo.lower() == "devolucao" else "UNK"
 
     # --- Montar novo nome com espaços ---
-    novo_nome = f"{prefixo} {nome} {matricula} {serial}.pdf"
-    novo_caminho = os.path.join(os.path.dirname(caminho_antigo), novo_nome)
+    return f"{prefixo} {nome} {matricula} {serial}.pdf"
+
+
+def _com_sufixo(nome: str, n: int) -> str:
+    if n == 1:
+        return nome
+    base, ext = os.path.splitext(nome)
+    return f"{base} ({n}){ext}"
+
+
+def _mesmo_conteudo(caminho: str, tamanho: int, sha256: str) -> bool:
+    try:
+        return os.path.getsize(caminho) == tamanho and sha256_arquivo(caminho) == sha256
+    except OSError:
+        return False
+
+
+def mover_sem_colisao(origem: str, pasta_destino: str, nome: str, sha256: str = None) -> str:
+    """
+    Move `origem` para `pasta_destino` com o nome `nome` sem nunca sobrescrever outro
+    arquivo, mesmo com vários processos movendo ao mesmo tempo. O nome é reservado
+    com O_EXCL (atômico) e o arquivo substitui a reserva com os.replace. Se o nome já
+    existir: com o SHA-256 informado e o mesmo conteúdo, é o mesmo PDF e a origem é
+    descartada; senão tenta "nome (2).pdf", "nome (3).pdf"...
+    Retorna o caminho final.
+    """
+    tamanho = os.path.getsize(origem) if sha256 else None
+    n = 1
+    while True:
+        destino = os.path.join(pasta_destino, _com_sufixo(nome, n))
+        if os.path.abspath(destino) == os.path.abspath(origem):
+            return origem
+        try:
+            os.close(os.open(destino, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            if sha256 and _mesmo_conteudo(destino, tamanho, sha256):
+                os.remove(origem)
+                return destino
+            n += 1
+
+    try:
+        os.replace(origem, destino)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            os.remove(destino)
+            raise
+        # Outro sistema de arquivos: copia para um temporário ao lado da reserva,
+        # para o nome final só aparecer com o arquivo completo
+        temporario = destino + ".parcial"
+        try:
+            shutil.copy2(origem, temporario)
+            os.replace(temporario, destino)
+        except BaseException:
+            for caminho in (temporario, destino):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            raise
+        os.remove(origem)
+    return destino
+
+
+def localizar_movido(pasta_destino: str, nome: str, sha256: str) -> str:
+    """
+    Caminho com que mover_sem_colisao deixou em `pasta_destino` o PDF de conteúdo
+    `sha256` movido com o nome `nome` ("nome.pdf", "nome (2).pdf"...), ou None.
+    """
+    n = 1
+    while os.path.exists(destino := os.path.join(pasta_destino, _com_sufixo(nome, n))):
+        try:
+            if sha256_arquivo(destino) == sha256:
+                return destino
+        except OSError:
+            pass
+        n += 1
+    return None
+
+
+def renomear_pdf(caminho_antigo: str, documento: DocumentoPDF = None) -> str:
+    """
+    Renomeia o PDF, na mesma pasta, com o nome montado por nome_destino_pdf, sem
+    sobrescrever outro arquivo (um nome já usado ganha sufixo " (2)", " (3)"...).
+    Se o documento já tiver sido extraído, reutiliza o texto em vez de abrir o PDF de novo.
+    Retorna o novo caminho do arquivo.
+    """
+
+    # --- Extrair texto do PDF ---
+    if documento is None:
+        documento = carregar_documento(caminho_antigo)
+
+    novo_nome = nome_destino_pdf(documento)
 
     # --- Renomear arquivo ---
     try:
-        os.rename(caminho_antigo, novo_caminho)
+        novo_caminho = mover_sem_colisao(caminho_antigo, os.path.dirname(caminho_antigo), novo_nome)
     except Exception as e:
         print(f"Erro ao renomear {caminho_antigo}: {e}")
         novo_caminho = caminho_antigo  # mantém o nome original em caso de erro
 
+    documento.caminho = novo_caminho
     return novo_caminho
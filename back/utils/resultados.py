@@ -0,0 +1,393 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+# Colunas com índice próprio, além do lote
+COLUNAS_INDEXADAS = ("SERIAL", "HOSTNAME", "PATRIMÔNIO", "CHAMADO", "TERMO")
+# Gravadas como 0/1 pelo SQLite e devolvidas como bool, como na planilha
+COLUNAS_BOOLEANAS = ("ASSINADO",)
+# Dimensões dos agregados: nome -> valor de uma linha ({r} é NEW, OLD ou registros).
+# Cada uma é contada por dia; "dia" sozinho dá a série total.
+DIMENSOES = {
+    "dia": "''",
+    "lote": "{r}.lote",
+    "termo": """COALESCE({r}."TERMO", '')""",
+    "marca": """UPPER(TRIM(COALESCE({r}."MARCA", '')))""",
+    "modelo": """UPPER(TRIM(COALESCE({r}."MODELO", '')))""",
+    "motivo": """COALESCE({r}."MOTIVO", '')""",
+}
+# Colunas que, ao mudar num UPDATE, mudam os agregados
+COLUNAS_AGREGADAS = ("lote", "criado_em", "TERMO", "STATUS TERMO", "MARCA", "MODELO", "MOTIVO")
+
+
+def _coluna(nome: str) -> str:
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _somar_agregados(r: str, sinal: str) -> str:
+    """Comandos que somam (sinal "+") ou subtraem ("-") a linha `r` dos agregados."""
+    return "".join(
+        f"""
+        INSERT INTO agregados (dimensao, dia, valor, total, ok)
+        VALUES ('{dimensao}', substr({r}.criado_em, 1, 10), {valor.format(r=r)},
+                {sinal}1, {sinal}({r}."STATUS TERMO" IS 'OK'))
+        ON CONFLICT (dimensao, dia, valor)
+        DO UPDATE SET total = total + excluded.total, ok = ok + excluded.ok;"""
+        for dimensao, valor in DIMENSOES.items()
+    )
+
+
+# Gatilhos que mantêm os agregados na mesma transação de cada escrita em registros,
+# venha ela de qualquer processo
+GATILHOS_AGREGADOS = {
+    "agregados_insert": f"""
+        CREATE TRIGGER agregados_insert AFTER INSERT ON registros BEGIN
+        {_somar_agregados("NEW", "+")}
+        END""",
+    "agregados_update": f"""
+        CREATE TRIGGER agregados_update
+        AFTER UPDATE OF {", ".join(_coluna(c) for c in COLUNAS_AGREGADAS)} ON registros BEGIN
+        {_somar_agregados("OLD", "-")}
+        {_somar_agregados("NEW", "+")}
+        END""",
+    "agregados_delete": f"""
+        CREATE TRIGGER agregados_delete AFTER DELETE ON registros BEGIN
+        {_somar_agregados("OLD", "-")}
+        END""",
+}
+
+
+class ResultStore:
+    """
+    Registros auditados em SQLite (WAL), um por linha, com as colunas da planilha.
+    É a fonte da verdade dos resultados: cada arquivo processado vira um INSERT,
+    sem reler nada, e a planilha Excel é só uma exportação gerada sob demanda.
+    (lote, arquivo, posicao) é único, então regravar um arquivo já gravado não duplica.
+    Fora das colunas da planilha, cada linha guarda o `sha256` do PDF de origem.
+    Vários processos do servidor podem gravar no mesmo arquivo: cada escrita é uma
+    transação BEGIN IMMEDIATE, que o SQLite serializa entre processos. No processo,
+    a conexão `conn` é compartilhada pelo event loop e pelas threads: todo uso dela
+    passa por `lock`; as leituras longas (consultas, estatísticas) abrem conexão própria.
+    A tabela `agregados` guarda as contagens por dia e DIMENSOES, mantidas por
+    gatilhos a cada INSERT/UPDATE/DELETE, para as estatísticas não relerem os registros.
+    """
+
+    def __init__(self, path: str, colunas: list):
+        self.path = path
+        self.colunas = list(colunas)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Esquema e migração numa transação exclusiva: processos que sobem juntos
+        # não tentam adicionar a mesma coluna duas vezes
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS registros (
+                id INTEGER PRIMARY KEY,
+                lote TEXT NOT NULL,
+                arquivo INTEGER NOT NULL,
+                posicao INTEGER NOT NULL,
+                criado_em TEXT NOT NULL,
+                sha256 TEXT
+            )
+            """
+        )
+        existentes = {linha[1] for linha in self.conn.execute("PRAGMA table_info(registros)")}
+        # Bancos criados antes do sha256: as linhas antigas ficam sem identidade
+        if "sha256" not in existentes:
+            self.conn.execute("ALTER TABLE registros ADD COLUMN sha256 TEXT")
+        # Colunas novas em COLUNAS entram na tabela existente sem migração manual
+        for coluna in self.colunas:
+            if coluna not in existentes:
+                self.conn.execute(f"ALTER TABLE registros ADD COLUMN {_coluna(coluna)}")
+
+        self.conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_registros_origem "
+            "ON registros (lote, arquivo, posicao)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_registros_criado_em ON registros (criado_em)"
+        )
+        for coluna in COLUNAS_INDEXADAS:
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_coluna('idx_registros_' + coluna.lower())} "
+                f"ON registros ({_coluna(coluna)})"
+            )
+        self._preparar_agregados()
+        # Estado do histórico como um todo (ex.: versão das regras aplicada a ele)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+        self.sql_insert = (
+            "INSERT OR IGNORE INTO registros (lote, arquivo, posicao, criado_em, sha256, "
+            + ", ".join(_coluna(c) for c in self.colunas)
+            + ") VALUES (?, ?, ?, ?, ?, "
+            + ", ".join("?" for _ in self.colunas)
+            + ")"
+        )
+
+    def _preparar_agregados(self):
+        """
+        Cria a tabela de agregados e os gatilhos. Se os gatilhos não existem ou mudaram
+        (banco anterior aos agregados, DIMENSOES alteradas), recalcula a tabela a partir
+        dos registros: é a única vez em que eles são relidos.
+        """
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agregados (
+                dimensao TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                ok INTEGER NOT NULL,
+                PRIMARY KEY (dimensao, dia, valor)
+            ) WITHOUT ROWID
+            """
+        )
+        atuais = dict(self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'agregados_%'"
+        ))
+        esperados = {nome: " ".join(sql.split()) for nome, sql in GATILHOS_AGREGADOS.items()}
+        if {nome: " ".join(sql.split()) for nome, sql in atuais.items()} == esperados:
+            return
+        for nome in atuais:
+            self.conn.execute(f"DROP TRIGGER {_coluna(nome)}")
+        self.conn.execute("DELETE FROM agregados")
+        for dimensao, valor in DIMENSOES.items():
+            self.conn.execute(
+                f"""
+                INSERT INTO agregados (dimensao, dia, valor, total, ok)
+                SELECT '{dimensao}', substr(criado_em, 1, 10), {valor.format(r="registros")},
+                       COUNT(*), SUM("STATUS TERMO" IS 'OK')
+                FROM registros GROUP BY 2, 3
+                """
+            )
+        for sql in esperados.values():
+            self.conn.execute(sql)
+
+    @contextmanager
+    def escrita(self):
+        """
+        Transação de escrita exclusiva (BEGIN IMMEDIATE): enquanto ela dura, nenhum
+        outro processo grava, então o que foi lido dentro dela continua atual.
+        Reentrante: gravar/atualizar dentro dela entram na mesma transação.
+        """
+        with self.lock:
+            if self.conn.in_transaction:
+                yield
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+    def gravar(self, lote: str, arquivo: int, registros: list):
+        """Grava os registros de um arquivo do lote numa única transação."""
+        agora = datetime.now().isoformat(timespec="seconds")
+        linhas = [
+            (lote, arquivo, posicao, agora, dados.get("sha256"),
+             *[dados.get(c) for c in self.colunas])
+            for posicao, dados in enumerate(registros)
+        ]
+        with self.escrita():
+            self.conn.executemany(self.sql_insert, linhas)
+
+    def ler_meta(self, chave: str):
+        with self.lock:
+            linha = self.conn.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def gravar_meta(self, chave: str, valor: str):
+        with self.escrita():
+            self.conn.execute(
+                "INSERT INTO meta (chave, valor) VALUES (?, ?) "
+                "ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor",
+                (chave, valor),
+            )
+
+    def proximo_arquivo(self, lote: str) -> int:
+        """Primeiro índice de arquivo livre no lote, para continuar um lote já gravado."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COALESCE(MAX(arquivo) + 1, 0) FROM registros WHERE lote = ?", (lote,)
+            ).fetchone()[0]
+
+    def ultimo_id(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM registros").fetchone()[0]
+
+    def vazio(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM registros LIMIT 1").fetchone() is None
+
+    def consultar(self, lote: str = None, inicio: str = None, fim: str = None,
+                  status: list = None, termo: list = None, marca: list = None,
+                  colunas: list = None):
+        """
+        Itera as linhas na ordem de gravação, só com `colunas` (padrão: todas, na ordem
+        de COLUNAS). Filtros: lote, intervalo de datas (AAAA-MM-DD, fim inclusivo),
+        STATUS TERMO, TERMO e MARCA (listas de valores aceitos, sem diferenciar caixa).
+        """
+        colunas = colunas or self.colunas
+        condicoes = []
+        parametros = []
+        if lote:
+            condicoes.append("lote = ?")
+            parametros.append(lote)
+        if inicio:
+            condicoes.append("criado_em >= ?")
+            parametros.append(inicio)
+        if fim:
+            # Data sem hora inclui o dia inteiro
+            if len(fim) == 10:
+                fim = (date.fromisoformat(fim) + timedelta(days=1)).isoformat()
+                condicoes.append("criado_em < ?")
+            else:
+                condicoes.append("criado_em <= ?")
+            parametros.append(fim)
+        # STATUS TERMO e TERMO já são gravados em maiúsculas e podem usar o índice;
+        # MARCA vem como está no termo
+        for coluna, valores in (("STATUS TERMO", status), ("TERMO", termo), ("MARCA", marca)):
+            if valores:
+                campo = f"UPPER({_coluna(coluna)})" if coluna == "MARCA" else _coluna(coluna)
+                condicoes.append(f"{campo} IN ({', '.join('?' for _ in valores)})")
+                parametros.extend(v.upper() for v in valores)
+
+        sql = "SELECT " + ", ".join(_coluna(c) for c in colunas) + " FROM registros"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY id"
+
+        booleanas = [i for i, c in enumerate(colunas) if c in COLUNAS_BOOLEANAS]
+        # Conexão própria de leitura: com WAL a exportação vê um retrato consistente
+        # e não bloqueia os INSERTs do processamento
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            for linha in conn.execute(sql, parametros):
+                if booleanas:
+                    linha = list(linha)
+                    for i in booleanas:
+                        if linha[i] is not None:
+                            linha[i] = bool(linha[i])
+                yield linha
+        finally:
+            conn.close()
+
+    def estatisticas(self, inicio: str = None, fim: str = None,
+                     dimensoes: list = None, limite: int = 20) -> dict:
+        """
+        Totais de registros (total/ok/erro) lidos dos agregados, sem tocar nos
+        registros: a série por dia e, para cada dimensão pedida (padrão: todas), os
+        `limite` valores com mais registros. Intervalo de dias AAAA-MM-DD, inclusivo.
+        """
+        dimensoes = [d for d in dimensoes or DIMENSOES if d != "dia"]
+        condicao = "dia >= ? AND dia <= ?"
+        parametros = [inicio or "", fim or "9999-12-31"]
+
+        def contagem(total, ok):
+            return {"total": total, "ok": ok, "erro": total - ok}
+
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            por_dia = [
+                {"dia": dia, **contagem(total, ok)}
+                for dia, total, ok in conn.execute(
+                    "SELECT dia, SUM(total), SUM(ok) FROM agregados "
+                    f"WHERE dimensao = 'dia' AND {condicao} "
+                    "GROUP BY dia HAVING SUM(total) > 0 ORDER BY dia",
+                    parametros,
+                )
+            ]
+            por_dimensao = {}
+            for dimensao in dimensoes:
+                por_dimensao[dimensao] = [
+                    {"valor": valor, **contagem(total, ok)}
+                    for valor, total, ok in conn.execute(
+                        "SELECT valor, SUM(total) AS t, SUM(ok) FROM agregados "
+                        f"WHERE dimensao = ? AND {condicao} AND valor != '' "
+                        "GROUP BY valor HAVING t > 0 ORDER BY t DESC, valor LIMIT ?",
+                        [dimensao, *parametros, limite],
+                    )
+                ]
+        finally:
+            conn.close()
+
+        total = sum(d["total"] for d in por_dia)
+        ok = sum(d["ok"] for d in por_dia)
+        return {"total": contagem(total, ok), "porDia": por_dia, "por": por_dimensao}
+
+    def para_indexar(self, colunas: list, desde_id: int = 0):
+        """
+        Itera (id, (lote, arquivo, posicao), {coluna: valor}) dos registros com id maior
+        que `desde_id` (padrão: todos), na ordem de gravação.
+        """
+        sql = (
+            "SELECT id, lote, arquivo, posicao, "
+            + ", ".join(_coluna(c) for c in colunas)
+            + " FROM registros WHERE id > ? ORDER BY id"
+        )
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            for id_linha, lote, arquivo, posicao, *valores in conn.execute(sql, (desde_id,)):
+                yield id_linha, (lote, arquivo, posicao), dict(zip(colunas, valores))
+        finally:
+            conn.close()
+
+    def em_blocos(self, colunas: list, tamanho: int):
+        """
+        Itera listas de até `tamanho` tuplas (lote, arquivo, posicao, *colunas), na
+        ordem de gravação: leitura do histórico inteiro sem montar um dict por linha.
+        """
+        sql = (
+            "SELECT lote, arquivo, posicao, "
+            + ", ".join(_coluna(c) for c in colunas)
+            + " FROM registros ORDER BY id"
+        )
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            cursor = conn.execute(sql)
+            while bloco := cursor.fetchmany(tamanho):
+                yield bloco
+        finally:
+            conn.close()
+
+    def atualizar(self, alteracoes: list):
+        """Aplica [((lote, arquivo, posicao), {coluna: valor})] a registros já gravados."""
+        por_colunas = {}
+        for (lote, arquivo, posicao), campos in alteracoes:
+            colunas = tuple(campos)
+            por_colunas.setdefault(colunas, []).append(
+                (*campos.values(), lote, arquivo, posicao)
+            )
+        with self.escrita():
+            for colunas, linhas in por_colunas.items():
+                self.conn.executemany(
+                    "UPDATE registros SET "
+                    + ", ".join(f"{_coluna(c)} = ?" for c in colunas)
+                    + " WHERE lote = ? AND arquivo = ? AND posicao = ?",
+                    linhas,
+                )
+
+    def importar_excel(self, path: str, lote: str = "legado") -> int:
+        """Carrega uma planilha de resultado antiga no store; devolve quantas linhas entraram."""
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        try:
+            linhas = wb.active.iter_rows(values_only=True)
+            cabecalho = next(linhas, None) or ()
+            registros = [
+                dict(zip(cabecalho, linha)) for linha in linhas if any(v is not None for v in linha)
+            ]
+        finally:
+            wb.close()
+        self.gravar(lote, 0, registros)
+        return len(registros)
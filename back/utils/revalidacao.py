@@ -0,0 +1,52 @@
+import time
+from utils.resultados import ResultStore
+from utils.validar_termo import CAMPOS_VALIDACAO, validar_termos_df
+
+# Registros validados e regravados por vez: limita a memória do DataFrame e a
+# duração de cada transação de escrita
+TAMANHO_BLOCO = 50_000
+# Chave da tabela meta do ResultStore com a versão das regras aplicada ao histórico
+CHAVE_VERSAO = "versao_regras"
+ORIGEM = ["lote", "arquivo", "posicao"]
+
+
+def revalidar(store: ResultStore, regras, inventario=None, bloco: int = TAMANHO_BLOCO) -> dict:
+    """
+    Reaplica as `regras` (e o `inventario`, se houver) a todo o histórico usando só
+    os campos gravados: nenhum PDF é aberto nem reextraído. Uma passada pelos
+    registros, em blocos validados de uma vez por validar_termos_df; só os que
+    mudaram de STATUS TERMO ou MOTIVO são regravados, e os gatilhos acertam os
+    agregados na mesma transação. Ao fim, grava a versão aplicada no store.
+    """
+    # Só a revalidação paga a importação do pandas
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    colunas = [c for c in CAMPOS_VALIDACAO if c in store.colunas] + ["STATUS TERMO", "MOTIVO"]
+    registros = 0
+    alterados = 0
+    for linhas in store.em_blocos(colunas, bloco):
+        df = pd.DataFrame(linhas, columns=ORIGEM + colunas)
+        validado = validar_termos_df(df, inventario, regras)
+        status = validado["STATUS TERMO"].to_numpy(dtype=object)
+        motivo = validado["MOTIVO"].to_numpy(dtype=object)
+        # Comparação vetorizada: só os registros que mudaram voltam para o Python
+        mudou = (status != df["STATUS TERMO"].to_numpy(dtype=object)) | (
+            motivo != df["MOTIVO"].fillna("").to_numpy(dtype=object)
+        )
+        alteracoes = [
+            (linhas[i][:3], {"STATUS TERMO": status[i], "MOTIVO": motivo[i]})
+            for i in mudou.nonzero()[0]
+        ]
+        if alteracoes:
+            store.atualizar(alteracoes)
+        registros += len(linhas)
+        alterados += len(alteracoes)
+
+    store.gravar_meta(CHAVE_VERSAO, regras.identificador)
+    return {
+        "versao": regras.identificador,
+        "registros": registros,
+        "alterados": alterados,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
@@ -0,0 +1,27 @@
+import hashlib
+import os
+import uuid
+from fastapi import UploadFile
+from utils.extract_text import TAMANHO_BLOCO
+
+
+async def gravar_upload(pdf: UploadFile, pasta: str) -> tuple:
+    """
+    Copia o upload em blocos para a pasta de spool, calculando o SHA-256 no caminho,
+    de modo que o PDF nunca fica inteiro na memória. Retorna (caminho, sha256).
+    """
+    nome = os.path.basename(pdf.filename or "arquivo.pdf")
+    caminho = os.path.join(pasta, f"temp_{uuid.uuid4().hex}_{nome}")
+    h = hashlib.sha256()
+    try:
+        with open(caminho, "wb") as f:
+            while bloco := await pdf.read(TAMANHO_BLOCO):
+                h.update(bloco)
+                f.write(bloco)
+    except Exception:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        raise
+    finally:
+        await pdf.close()
+    return caminho, h.hexdigest()
@@ -1,75 +1,225 @@
 import re
-from utils.validar_hostname import validar_hostname   
+from utils.regras import REGRAS_PADRAO
+from utils.validar_hostname import PADRAO_ESCRITORIO, PADRAO_LOJA, validar_hostname
+
+# Modelos isentos de NF, tipos, marcas e chamados aceitos vêm das Regras (utils.regras)
+PAT_NF_ZERADA = re.compile(r"0+")
+PAT_TRACOS = re.compile(r"-+")
+
+TERMOS_COM_ATIVO = ("CONCESSÃO", "DEVOLUÇÃO")
+
+# --- Motivos de reprovação, na ordem em que as regras são avaliadas ---
+MOTIVO_LEITURA_PARCIAL = "PDF lido em parte (AUDITORIA_MAX_PAGINAS)"
+MOTIVO_NF = "NF ausente ou zerada"
+MOTIVO_ASSINATURA = "Termo não assinado"
+MOTIVO_MONITOR = "Monitor sem número de série"
+MOTIVO_TIPO = "Tipo de ativo inválido"
+MOTIVO_MARCA = "Marca inválida"
+MOTIVO_HOSTNAME = "Hostname inválido"
+MOTIVO_CHAMADO = "Chamado inválido"
+# Só com inventário configurado
+MOTIVO_FORA_INVENTARIO = "Ativo fora do inventário"
+MOTIVO_OUTRO_COLABORADOR = "Ativo de outro colaborador"
+
+
+# Colunas gravadas que a validação lê: a revalidação do histórico só consulta estas
+CAMPOS_VALIDACAO = [
+    "TERMO", "MODELO", "NF", "ASSINADO", "MODELO MONITOR", "SERIAL MONITOR",
+    "TIPO", "MARCA", "HOSTNAME", "CHAMADO", "MATRÍCULA", "SERIAL", "PÁGINAS NÃO LIDAS",
+]
+
+# --- Regras de um campo só, compartilhadas pela validação por registro e em lote ---
+def _leitura_parcial(nao_lidas: str) -> bool:
+    # Vazio nos registros anteriores à coluna; "3.0" quando o DataFrame vira float
+    try:
+        return float(nao_lidas) > 0
+    except ValueError:
+        return False
 
-def validar_termo(dados: dict) -> bool:
 
-    # --- Lista de modelos que dispensam validação de NF ---
-    modelos_excecao_nf = [
-        "OPTIPLEX 7070", "LATITUDE 7400", "LATITUDE 5400", "LATITUDE 5420",
-        "7070", "7400", "5400", "5420"
-    ]
+def _nf_ausente(nf: str) -> bool:
+    return not nf or bool(PAT_NF_ZERADA.fullmatch(nf))
+
+
+def _monitor_informado(modelo_monitor: str) -> bool:
+    return bool(modelo_monitor) and not PAT_TRACOS.fullmatch(modelo_monitor)
+
+
+def _serial_ausente(serial_monitor: str) -> bool:
+    return not serial_monitor or bool(PAT_TRACOS.fullmatch(serial_monitor))
+
+
+def _de_outro(dono, matricula: str) -> bool:
+    # Só acusa quando o inventário e o termo dizem, os dois, quem é o colaborador
+    return bool(dono) and bool(matricula) and dono != matricula
+
+
+def _motivo_inventario(inventario, termo: str, dados: dict) -> str:
+    matricula = str(dados.get("MATRÍCULA", "")).strip().upper()
+    donos = [inventario.dono_serial(str(dados.get("SERIAL", "")))]
+    if termo == "CONCESSÃO":
+        donos.append(inventario.dono_hostname(str(dados.get("HOSTNAME", ""))))
+    if any(dono is None for dono in donos):
+        return MOTIVO_FORA_INVENTARIO
+    if any(_de_outro(dono, matricula) for dono in donos):
+        return MOTIVO_OUTRO_COLABORADOR
+    return ""
+
+
+def motivo_reprovacao(dados: dict, inventario=None, regras=None) -> str:
+    """
+    Primeira regra que o termo não cumpre, ou "" se o termo está OK. `regras` é a
+    versão das Regras em uso (padrão: REGRAS_PADRAO). Com um `inventario`
+    (utils.inventario.Inventario), serial e hostname do ativo também precisam estar
+    nele e pertencer à matrícula do termo.
+    """
+    regras = regras or REGRAS_PADRAO
 
-    # --- Tipos de ativo ---
-    tipos_validos = ["DESKTOP", "MINIDESK", "MINIDESKTOP", "NOTEBOOK"]
+    termo = dados.get("TERMO")
 
-    # --- Marcas ---
-    marcas_validas = ["DELL", "LENOVO", "HP", "ACER", "ASUS", "SAMSUNG", "POSITIVO", "APPLE"]
+    # --- Leitura cortada pelo limite de páginas: o registro pode estar incompleto ---
+    if _leitura_parcial(str(dados.get("PÁGINAS NÃO LIDAS") or "")):
+        return MOTIVO_LEITURA_PARCIAL
 
-    modelo = str(dados.get("MODELO", "")).strip().upper()
-    tipo = str(dados.get("TIPO", "")).strip().upper()
-    marca = str(dados.get("MARCA", "")).strip().upper()
-    
     # --- Valida NF ---
+    modelo = str(dados.get("MODELO", "")).strip()
     nf = str(dados.get("NF", "")).strip()
-    if modelo not in modelos_excecao_nf:
-        if not nf or re.fullmatch(r"0+", nf):
-            return False
+    if not regras.isento_nf(modelo) and _nf_ausente(nf):
+        return MOTIVO_NF
 
     # --- Verifica assinatura ---
     if not dados.get("ASSINADO", False):
-        return False
+        return MOTIVO_ASSINATURA
 
     # --- Verifica monitor ---
     modelo_monitor = str(dados.get("MODELO MONITOR", "")).strip()
     serial_monitor = str(dados.get("SERIAL MONITOR", "")).strip()
-
-    if modelo_monitor and not re.fullmatch(r"-+", modelo_monitor):
-        if not serial_monitor or re.fullmatch(r"-+", serial_monitor):
-            return False
-
-    # --- Verifica tipo ---
-    if dados.get("TERMO") == "CONCESSÃO" or dados.get("TERMO") == "DEVOLUÇÃO":
-        if  tipo not in tipos_validos:
-            return False
-
-    # --- Verifica marca ---
-    if dados.get("TERMO") == "CONCESSÃO" or dados.get("TERMO") == "DEVOLUÇÃO":
-        if marca not in marcas_validas:
-            return False
-
-    # --- Verifica hostname ---
-    if dados.get("TERMO") == "CONCESSÃO":
+    if _monitor_informado(modelo_monitor) and _serial_ausente(serial_monitor):
+        return MOTIVO_MONITOR
+
+    # --- Verifica tipo e marca ---
+    if termo in TERMOS_COM_ATIVO:
+        if not regras.tipo_valido(str(dados.get("TIPO", "")).strip()):
+            return MOTIVO_TIPO
+        if not regras.marca_valida(str(dados.get("MARCA", "")).strip()):
+            return MOTIVO_MARCA
+
+    if termo == "CONCESSÃO":
+        # --- Verifica hostname ---
         hostname = str(dados.get("HOSTNAME", "")).strip()
         matricula = str(dados.get("MATRICULA", "")).strip()
         if not validar_hostname(hostname, matricula if matricula else None):
-            return False
-
-    # --- Verifica chamados ---
-    if dados.get("TERMO") == "CONCESSÃO":
-        chamado = str(dados.get("CHAMADO", "")).strip().upper()
-
-        if not chamado:
-            return False
-
-        if chamado in ["ROLLOUT", "ROLOUT"]:
-            return True
-
-        if re.match(r"^(REQ|INC)0*$", chamado):
-            return False
-
-        if re.match(r"^(REQ|INC)\d+$", chamado):
-            return True
+            return MOTIVO_HOSTNAME
+
+        # --- Verifica chamados ---
+        if not regras.chamado_valido(str(dados.get("CHAMADO", "")).strip()):
+            return MOTIVO_CHAMADO
+
+    # --- Confere com o inventário ---
+    if inventario is not None and termo in TERMOS_COM_ATIVO:
+        return _motivo_inventario(inventario, termo, dados)
+
+    return ""
+
+
+def validar_termo(dados: dict, inventario=None, regras=None) -> bool:
+    return not motivo_reprovacao(dados, inventario, regras)
+
+
+def _texto(valor) -> str:
+    # Célula vazia do DataFrame (None/NaN) conta como campo ausente
+    if valor is None or valor != valor:
+        return ""
+    return str(valor).strip()
+
+
+def validar_termos_df(df, inventario=None, regras=None):
+    """
+    Valida um DataFrame de registros extraídos de uma vez. Cada regra de um campo é
+    avaliada uma vez por valor distinto da coluna (pd.factorize) e as regras são
+    combinadas com operações vetorizadas do numpy. Devolve uma cópia com as colunas
+    STATUS TERMO ("OK"/"ERRO") e MOTIVO (primeira regra não cumprida).
+    As `regras` e o `inventario`, se houver, são os mesmos de motivo_reprovacao.
+    """
+    regras = regras or REGRAS_PADRAO
+    # Só quem valida em lote paga a importação do pandas/numpy
+    import numpy as np
+    import pandas as pd
+
+    def por_valor(coluna: str, regra, tipo=bool):
+        if coluna not in df:
+            return np.full(len(df), regra(""), dtype=tipo)
+        codigos, unicos = pd.factorize(df[coluna], use_na_sentinel=True)
+        # O índice -1 (célula vazia) cai no último elemento, avaliado com ""
+        valores = np.array([regra(_texto(v)) for v in unicos] + [regra("")], dtype=tipo)
+        return valores[codigos]
+
+    termo = df["TERMO"].to_numpy(dtype=object) if "TERMO" in df else np.full(len(df), None)
+    com_ativo = np.isin(termo, TERMOS_COM_ATIVO)
+    concessao = termo == "CONCESSÃO"
+
+    if "ASSINADO" in df:
+        assinado = df["ASSINADO"].map(lambda v: bool(v) and v == v).to_numpy(dtype=bool)
+    else:
+        assinado = np.zeros(len(df), dtype=bool)
+
+    # --- Hostname: matrícula extraída (ou None) e padrão de loja por hostname distinto ---
+    def info_hostname(hostname: str):
+        m = PADRAO_ESCRITORIO.match(hostname.upper()) if hostname else None
+        return m.group(4) if m else None
+
+    def hostname_loja(hostname: str) -> bool:
+        return bool(hostname) and bool(PADRAO_LOJA.match(hostname.upper()))
+
+    matricula_hostname = por_valor("HOSTNAME", info_hostname, object)
+    matricula = por_valor("MATRICULA", lambda v: v, object)
+    hostname_ok = np.where(
+        matricula_hostname != None,  # noqa: E711 (comparação elemento a elemento)
+        (matricula == "") | (matricula_hostname == matricula),
+        por_valor("HOSTNAME", hostname_loja),
+    )
+
+    condicoes = [
+        (por_valor("PÁGINAS NÃO LIDAS", _leitura_parcial), MOTIVO_LEITURA_PARCIAL),
+        (~por_valor("MODELO", regras.isento_nf) & por_valor("NF", _nf_ausente), MOTIVO_NF),
+        (~assinado, MOTIVO_ASSINATURA),
+        (
+            por_valor("MODELO MONITOR", _monitor_informado)
+            & por_valor("SERIAL MONITOR", _serial_ausente),
+            MOTIVO_MONITOR,
+        ),
+        (com_ativo & ~por_valor("TIPO", regras.tipo_valido), MOTIVO_TIPO),
+        (com_ativo & ~por_valor("MARCA", regras.marca_valida), MOTIVO_MARCA),
+        (concessao & ~hostname_ok, MOTIVO_HOSTNAME),
+        (concessao & ~por_valor("CHAMADO", regras.chamado_valido), MOTIVO_CHAMADO),
+    ]
 
-        return False
-    
-    return True
+    # --- Inventário: dono de cada serial e hostname distinto ---
+    if inventario is not None:
+        matricula_termo = por_valor("MATRÍCULA", str.upper, object)
+        dono_serial = por_valor("SERIAL", inventario.dono_serial, object)
+        dono_hostname = por_valor("HOSTNAME", inventario.dono_hostname, object)
+        de_outro = np.vectorize(_de_outro, otypes=[bool])
+        condicoes += [
+            (
+                com_ativo & ((dono_serial == None) | (concessao & (dono_hostname == None))),  # noqa: E711
+                MOTIVO_FORA_INVENTARIO,
+            ),
+            (
+                com_ativo & (
+                    de_outro(dono_serial, matricula_termo)
+                    | (concessao & de_outro(dono_hostname, matricula_termo))
+                ),
+                MOTIVO_OUTRO_COLABORADOR,
+            ),
+        ]
+    motivo = np.select(
+        [condicao for condicao, _ in condicoes],
+        [nome for _, nome in condicoes],
+        default="",
+    )
+
+    resultado = df.copy()
+    resultado["MOTIVO"] = motivo
+    resultado["STATUS TERMO"] = np.where(motivo == "", "OK", "ERRO")
+    return resultado
@@ -0,0 +1,265 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+
+# --- inotify (Linux) via libc; sem ele as pastas são varridas periodicamente ---
+IN_CLOSE_WRITE = 0x00000008
+IN_CREATE = 0x00000100
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+EVENTO = struct.Struct("iIII")
+
+
+def _libc_inotify():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # noqa: B018 (só confirma que a função existe)
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+class Inotify:
+    """
+    Descritor inotify não bloqueante; `ler()` devolve os caminhos criados, fechados
+    ou movidos para a pasta. A criação já basta para o arquivo virar candidato: dali
+    em diante ele é acompanhado por stat, mesmo que o fechamento nunca seja notificado
+    (outro processo com o descritor herdado ainda aberto, por exemplo).
+    """
+
+    def __init__(self, libc):
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self.pastas = {}
+
+    def adicionar(self, pasta: str):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(pasta), IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou em {pasta}")
+        self.pastas[wd] = pasta
+
+    def ler(self) -> list:
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        caminhos = []
+        pos = 0
+        while pos + EVENTO.size <= len(dados):
+            wd, _, _, tamanho = EVENTO.unpack_from(dados, pos)
+            pos += EVENTO.size
+            nome = dados[pos:pos + tamanho].rstrip(b"\0")
+            pos += tamanho
+            if wd in self.pastas and nome:
+                caminhos.append(os.path.join(self.pastas[wd], os.fsdecode(nome)))
+        return caminhos
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class ManifestoPastas:
+    """
+    (mtime, tamanho) de cada PDF já enviado ao pipeline, em SQLite, para que uma
+    varredura ou um reinício do servidor não reenviem o que não mudou. Guarda também
+    as pastas vigiadas adicionadas em tempo de execução.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS manifesto (
+                caminho TEXT PRIMARY KEY,
+                pasta TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                tamanho INTEGER NOT NULL,
+                enviado_em TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_manifesto_pasta ON manifesto (pasta);
+            CREATE TABLE IF NOT EXISTS pastas_vigiadas (pasta TEXT PRIMARY KEY);
+            """
+        )
+        self.conn.commit()
+
+    def conhecidos(self, pasta: str) -> dict:
+        with self.lock:
+            linhas = self.conn.execute(
+                "SELECT caminho, mtime_ns, tamanho FROM manifesto WHERE pasta = ?", (pasta,)
+            ).fetchall()
+        return {caminho: (mtime_ns, tamanho) for caminho, mtime_ns, tamanho in linhas}
+
+    def registrar(self, pasta: str, arquivos: dict):
+        agora = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO manifesto VALUES (?, ?, ?, ?, ?)",
+                [(c, pasta, m, t, agora) for c, (m, t) in arquivos.items()],
+            )
+
+    def podar(self, pasta: str, presentes: set):
+        """Esquece arquivos que saíram da pasta (o pipeline move os PDFs processados)."""
+        sumidos = [(c,) for c in self.conhecidos(pasta) if c not in presentes]
+        if sumidos:
+            with self.lock, self.conn:
+                self.conn.executemany("DELETE FROM manifesto WHERE caminho = ?", sumidos)
+
+    def pastas(self) -> list:
+        with self.lock:
+            return [pasta for (pasta,) in self.conn.execute("SELECT pasta FROM pastas_vigiadas")]
+
+    def adicionar_pasta(self, pasta: str):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO pastas_vigiadas VALUES (?)", (pasta,))
+
+
+def _assinatura(caminho: str):
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class VigiaPastas:
+    """
+    Vigia pastas de entrada e entrega à corrotina `ao_detectar(pasta, [caminhos])` só os PDFs
+    novos ou alterados desde o último envio. Um arquivo só é entregue depois de ficar
+    `estabilidade` segundos com o mesmo mtime e tamanho (o scanner ainda pode estar
+    gravando). Com inotify, os eventos de fechamento/movimentação apontam os candidatos
+    e a pasta só é varrida inteira na partida e a cada `intervalo_varredura`; sem
+    inotify, a varredura acontece a cada `intervalo`.
+    """
+
+    def __init__(self, manifesto: ManifestoPastas, ao_detectar, intervalo: float = 2.0,
+                 estabilidade: float = 3.0, intervalo_varredura: float = 300.0,
+                 usar_inotify: bool = True):
+        self.manifesto = manifesto
+        self.ao_detectar = ao_detectar
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.intervalo_varredura = intervalo_varredura
+        self.pastas = []
+        # caminho -> (pasta, assinatura, instante em que a assinatura foi vista pela 1ª vez)
+        self.candidatos = {}
+        libc = _libc_inotify() if usar_inotify else None
+        self.inotify = None
+        if libc is not None:
+            try:
+                self.inotify = Inotify(libc)
+            except OSError as e:
+                print(f"inotify indisponível, usando varredura: {e}")
+        self.ultima_varredura = 0.0
+        self.acordar = None
+
+    @property
+    def modo(self) -> str:
+        return "inotify" if self.inotify else "varredura"
+
+    def adicionar(self, pasta: str):
+        pasta = os.path.abspath(pasta)
+        if pasta in self.pastas:
+            return
+        if self.inotify:
+            try:
+                self.inotify.adicionar(pasta)
+            except OSError as e:
+                print(f"Erro ao vigiar {pasta} com inotify: {e}")
+        self.pastas.append(pasta)
+        # Força uma varredura completa da pasta nova no próximo ciclo
+        self.ultima_varredura = 0.0
+        if self.acordar:
+            self.acordar.set()
+
+    def _observar(self, pasta: str, caminho: str, conhecidos: dict):
+        if not caminho.lower().endswith(".pdf"):
+            return
+        assinatura = _assinatura(caminho)
+        if assinatura is None or conhecidos.get(caminho) == assinatura:
+            return
+        atual = self.candidatos.get(caminho)
+        if atual is None or atual[1] != assinatura:
+            self.candidatos[caminho] = (pasta, assinatura, time.monotonic())
+
+    def _varrer(self):
+        for pasta in self.pastas:
+            try:
+                with os.scandir(pasta) as entradas:
+                    presentes = {e.path for e in entradas if e.is_file()}
+            except OSError as e:
+                print(f"Erro ao varrer {pasta}: {e}")
+                continue
+            self.manifesto.podar(pasta, presentes)
+            conhecidos = self.manifesto.conhecidos(pasta)
+            for caminho in presentes:
+                self._observar(pasta, caminho, conhecidos)
+
+    def ciclo(self) -> dict:
+        """
+        Uma passada: coleta candidatos e devolve {pasta: {caminho: assinatura}} dos
+        que ficaram estáveis. Roda numa thread; a entrega fica com `executar`.
+        """
+        agora = time.monotonic()
+        if self.inotify:
+            # Sempre esvazia o descritor, senão o add_reader continua disparando
+            conhecidos = {}
+            for caminho in self.inotify.ler():
+                pasta = os.path.dirname(caminho)
+                if pasta not in conhecidos:
+                    conhecidos[pasta] = self.manifesto.conhecidos(pasta)
+                self._observar(pasta, caminho, conhecidos[pasta])
+        if not self.inotify or agora - self.ultima_varredura >= self.intervalo_varredura:
+            self._varrer()
+            self.ultima_varredura = agora
+
+        prontos = {}
+        for caminho, (pasta, assinatura, desde) in list(self.candidatos.items()):
+            atual = _assinatura(caminho)
+            if atual is None:
+                del self.candidatos[caminho]
+            elif atual != assinatura:
+                self.candidatos[caminho] = (pasta, atual, agora)
+            elif agora - desde >= self.estabilidade:
+                del self.candidatos[caminho]
+                prontos.setdefault(pasta, {})[caminho] = atual
+
+        return prontos
+
+    async def executar(self):
+        self.acordar = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        if self.inotify:
+            loop.add_reader(self.inotify.fd, self.acordar.set)
+        try:
+            while True:
+                try:
+                    prontos = await asyncio.to_thread(self.ciclo)
+                    for pasta, arquivos in prontos.items():
+                        await self.ao_detectar(pasta, sorted(arquivos))
+                        # Só depois que o lote foi criado: uma queda antes disso
+                        # faz os arquivos serem reenviados, não perdidos
+                        await asyncio.to_thread(self.manifesto.registrar, pasta, arquivos)
+                except Exception as e:
+                    print(f"Erro na vigia de pastas: {e}")
+                self.acordar.clear()
+                # Candidatos pendentes precisam ser reavaliados mesmo sem eventos novos
+                try:
+                    await asyncio.wait_for(self.acordar.wait(), self.intervalo)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.inotify:
+                loop.remove_reader(self.inotify.fd)
+                self.inotify.fechar()
@@ -36,33 +36,26 @@ export default function App() {
   const [darkMode, setDarkMode] = useState(true);
   const wsRef = useRef(null);
 
-  // --- WebSocket ---
-  useEffect(() => {
-    const connectWS = () => {
-      const ws = new WebSocket("ws://127.0.0.1:8000/ws/progresso");
+  // --- WebSocket (um canal por lote) ---
+  const conectarProgresso = (jobId) =>
+    new Promise((resolve) => {
+      const ws = new WebSocket(`ws://127.0.0.1:8000/ws/progresso?job=${jobId}`);
       wsRef.current = ws;
 
-      ws.onopen = () => console.log("WebSocket conectado");
+      ws.onopen = () => resolve(ws);
 
       ws.onmessage = (event) => {
         const data = JSON.parse(event.data);
         if (data.progress !== undefined) setProgresso(data.progress);
       };
 
-      ws.onclose = () => {
-        console.log("WebSocket desconectado. Tentando reconectar...");
-        setTimeout(connectWS, 3000);
-      };
-
       ws.onerror = (err) => {
         console.error("WebSocket erro:", err);
-        ws.close();
+        resolve(ws); // segue com o upload mesmo sem progresso
       };
-    };
+    });
 
-    connectWS();
-    return () => wsRef.current?.close();
-  }, []);
+  useEffect(() => () => wsRef.current?.close(), []);
 
   const handleFileChange = (e) => setFiles(Array.from(e.target.files));
 
@@ -71,8 +64,11 @@ export default function App() {
     setProcessing(true);
     setProgresso(0);
 
+    const jobId = crypto.randomUUID();
+    const ws = await conectarProgresso(jobId);
+
     try {
-      const data = await uploadPdfs(files);
+      const data = await uploadPdfs(files, jobId);
       setResultados(data.resultados || []);
       setExcelUrl(data.excelUrl || "");
 
@@ -107,6 +103,7 @@ export default function App() {
       console.error(error);
       alert("Erro ao processar PDFs");
     } finally {
+      ws.close();
       setProcessing(false);
     }
   };
@@ -1,10 +1,11 @@
 import axios from "axios"
 
-export const uploadPdfs = async files => {
+export const uploadPdfs = async (files, jobId) => {
   const formData = new FormData()
   for (let i = 0; i < files.length; i++) {
     formData.append("pdfs", files[i])
   }
+  if (jobId) formData.append("job_id", jobId)
 
   const response = await axios.post("http://localhost:8000/upload", formData, {
     headers: { "Content-Type": "multipart/form-data" },